@@ -0,0 +1,55 @@
+"""Compare the mido and bytes encoders of generate_midi_file_from_chord_sequence.
+
+Usage: python -m benchmarks.bench_encoder [--chords N] [--repeat N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from simplejam.midi.keys import C_major
+from simplejam.midi.midifile import ENCODERS, generate_midi_file_from_chord_sequence
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the MIDI encoders")
+    parser.add_argument("--chords", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def run() -> None:
+    args = parse_args()
+    triads = list(C_major.DiatonicTriads.values())
+    chord_sequence = [triads[i % len(triads)] for i in range(args.chords)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for encoder in ENCODERS:
+            output_file = os.path.join(tmp_dir, f"{encoder}.mid")
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                # save() reports every write, keep the benchmark output readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_midi_file_from_chord_sequence(
+                        output_file, chord_sequence, encoder=encoder
+                    )
+                best = min(best, time.perf_counter() - start)
+            with open(output_file, "rb") as f:
+                results[encoder] = (best, f.read())
+
+    mido_time, mido_bytes = results["mido"]
+    bytes_time, bytes_bytes = results["bytes"]
+    print(f"chords: {args.chords}, best of {args.repeat}")
+    print(f"mido : {mido_time * 1000:9.2f} ms")
+    print(f"bytes: {bytes_time * 1000:9.2f} ms ({mido_time / bytes_time:.1f}x)")
+    print(f"byte-identical: {mido_bytes == bytes_bytes}")
+
+
+if __name__ == "__main__":
+    run()
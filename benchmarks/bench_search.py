@@ -0,0 +1,102 @@
+"""Time progression search queries against checking every key.
+
+Usage: python -m benchmarks.bench_search [--queries N] [--length N] [--seed N]
+"""
+
+import argparse
+import random
+import time
+
+from simplejam.midi.keys.scales import (
+    DEGREES,
+    KEY_COUNT,
+    SEVENTHS,
+    TRIADS,
+    key_name,
+)
+from simplejam.midi.logic.search import (
+    EXACT_SCORE,
+    PARTIAL_SCORE,
+    pitch_class_mask,
+    search_progression,
+)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark progression search")
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--length", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def brute_force_scores(chords):
+    """Score every key by resolving all of its chords, without the index."""
+    masks = [pitch_class_mask(chord) for chord in chords]
+    scores = {}
+    for key in range(KEY_COUNT):
+        score = 0.0
+        for mask in masks:
+            chord_score = 0.0
+            for degree in range(DEGREES - 1):
+                triad = pitch_class_mask(TRIADS[key * DEGREES + degree])
+                seventh = pitch_class_mask(SEVENTHS[key * DEGREES + degree])
+                if mask in (triad, seventh):
+                    chord_score = EXACT_SCORE
+                    break
+                if mask & triad == triad:
+                    chord_score = PARTIAL_SCORE
+            score += chord_score
+        if score:
+            scores[key_name(key)] = score / len(masks)
+    return scores
+
+
+def random_queries(count, length, seed):
+    """Progressions of random diatonic chords, with a random chord mixed in."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        key = rng.randrange(KEY_COUNT)
+        table = rng.choice((TRIADS, SEVENTHS))
+        chords = [table[key * DEGREES + rng.randrange(7)] for _ in range(length)]
+        if rng.random() < 0.25:
+            chords[rng.randrange(length)] = tuple(rng.sample(range(48, 84), 3))
+        queries.append(chords)
+    return queries
+
+
+def run() -> None:
+    args = parse_args()
+    queries = random_queries(args.queries, args.length, args.seed)
+
+    start = time.perf_counter()
+    for chords in queries:
+        search_progression(chords, limit=args.limit)
+    index_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [brute_force_scores(chords) for chords in queries]
+    brute_time = time.perf_counter() - start
+
+    results = [search_progression(chords, limit=KEY_COUNT) for chords in queries]
+    same = all(
+        {match.key: match.fit for match in result} == scores
+        for result, scores in zip(results, expected)
+    )
+    print(
+        f"queries: {args.queries}, chords per query: {args.length}, "
+        f"top {args.limit} keys"
+    )
+    print(f"index      : {index_time / args.queries * 1e6:9.1f} us/query")
+    print(
+        f"brute force: {brute_time / args.queries * 1e6:9.1f} us/query "
+        f"({brute_time / index_time:.1f}x)"
+    )
+    print(f"same scores: {same}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,45 @@
+"""Time the software synthesizer and report its real-time factor.
+
+Usage: python -m benchmarks.bench_synth [--chords N] [--voice NAME]
+"""
+
+import argparse
+
+from simplejam.midi.keys import C_major
+from simplejam.midi.synth import DEFAULT_BLOCK_SIZE, VOICES, synthesize_chord_sequence
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the synthesizer")
+    parser.add_argument("--chords", type=int, default=64)
+    parser.add_argument("--tempo", type=int, default=120)
+    parser.add_argument("--voice", choices=list(VOICES), default="organ")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    return parser.parse_args()
+
+
+def run() -> None:
+    args = parse_args()
+    triads = list(C_major.DiatonicTriads.values())
+    chord_sequence = [triads[i % len(triads)] for i in range(args.chords)]
+
+    for rhythm in (None, "syncopated", "arpeggio"):
+        result = synthesize_chord_sequence(
+            None,
+            chord_sequence,
+            tempo=args.tempo,
+            rhythm=rhythm,
+            voice=args.voice,
+            block_size=args.block_size,
+        )
+        print(
+            f"{rhythm or 'block chords':13}: {result.duration:7.1f} s audio "
+            f"in {result.elapsed * 1000:8.1f} ms, "
+            f"real-time factor {result.real_time_factor:.4f}, "
+            f"{result.renders_per_core:5.0f} renders per core"
+        )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,65 @@
+"""Time the NumPy timeline against the bytes encoder.
+
+Usage: python -m benchmarks.bench_timeline [--chords N] [--repeat N]
+"""
+
+import argparse
+import time
+
+from simplejam.midi.keys import C_major
+from simplejam.midi.midifile import generate_midi_file_from_chord_sequence
+from simplejam.midi.timeline import (
+    chord_timeline,
+    encode_timeline,
+    humanize,
+    sort_timeline,
+    transpose,
+)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the NumPy timeline")
+    parser.add_argument("--chords", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def best_of(repeat, func, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run() -> None:
+    args = parse_args()
+    triads = list(C_major.DiatonicTriads.values())
+    chord_sequence = [triads[i % len(triads)] for i in range(args.chords)]
+
+    bytes_time, expected = best_of(
+        args.repeat,
+        lambda: generate_midi_file_from_chord_sequence(
+            None, chord_sequence, encoder="bytes"
+        ),
+    )
+    build_time, events = best_of(
+        args.repeat, lambda: sort_timeline(chord_timeline(chord_sequence, 1920))
+    )
+    transform_time, _ = best_of(
+        args.repeat, lambda: humanize(transpose(events, 2), seed=0)
+    )
+    encode_time, data = best_of(args.repeat, encode_timeline, events)
+
+    print(f"chords: {args.chords}, events: {len(events)}, best of {args.repeat}")
+    print(f"bytes encoder      : {bytes_time * 1000:9.2f} ms")
+    print(f"timeline build     : {build_time * 1000:9.2f} ms")
+    print(f"transpose+humanize : {transform_time * 1000:9.2f} ms")
+    print(f"timeline encode    : {encode_time * 1000:9.2f} ms")
+    print(f"byte-identical: {bytes(expected) == data}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,95 @@
+"""pytest-benchmark fixtures: throughput and tracemalloc peak memory.
+
+Timings are saved and compared by pytest-benchmark itself, see make bench.
+Peak memory is measured on one extra run of each workload under tracemalloc
+and compared against the peaks saved with --memory-save, failing the test
+when it grew by more than --memory-compare-fail percent.
+"""
+
+import json
+import os
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import pytest
+
+MEMORY_BASELINE = os.path.join(".benchmarks", "memory.json")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("simplejam benchmarks")
+    group.addoption(
+        "--memory-save",
+        action="store_true",
+        help="Save the peak memory of every benchmark as the new baseline",
+    )
+    group.addoption(
+        "--memory-compare-fail",
+        type=float,
+        default=None,
+        metavar="PERCENT",
+        help="Fail benchmarks whose peak memory grew by more than PERCENT",
+    )
+    group.addoption("--memory-baseline", default=MEMORY_BASELINE, metavar="FILE")
+
+
+def _load_baseline(path: str) -> Dict[str, int]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@pytest.fixture(scope="session")
+def memory_baseline(request):
+    path = request.config.getoption("--memory-baseline")
+    peaks: Dict[str, int] = {}
+    yield _load_baseline(path), peaks
+    if request.config.getoption("--memory-save") and peaks:
+        baseline = _load_baseline(path)
+        baseline.update(peaks)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Return the peak bytes allocated by Python while func runs."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def measure(benchmark, request, memory_baseline):
+    """Benchmark func processing items, then record and check its peak memory.
+
+    rounds and iterations are passed to benchmark.pedantic, so slow workloads
+    can be timed a few times only.
+    """
+    baseline, peaks = memory_baseline
+    threshold = request.config.getoption("--memory-compare-fail")
+
+    def run(func, items: int, unit: str, rounds: int = 5, iterations: int = 1):
+        result = benchmark.pedantic(
+            func, rounds=rounds, iterations=iterations, warmup_rounds=1
+        )
+        peak = peak_memory(func)
+        name = request.node.name
+        peaks[name] = peak
+        benchmark.extra_info[f"{unit}_per_second"] = items / benchmark.stats.stats.mean
+        benchmark.extra_info["peak_memory_bytes"] = peak
+
+        if threshold is not None and name in baseline:
+            limit = baseline[name] * (1 + threshold / 100)
+            assert peak <= limit, (
+                f"peak memory {peak} B exceeds the baseline {baseline[name]} B "
+                f"by more than {threshold}%"
+            )
+        return result
+
+    return run
@@ -0,0 +1,204 @@
+"""Benchmarks of generation, voicing, encoding, saving and playback scheduling.
+
+Run with make bench, see benchmarks/conftest.py for the memory checks.
+"""
+
+import os
+from functools import lru_cache
+
+import pytest
+
+from simplejam.midi.chord import Chord
+from simplejam.midi.incremental import render_incremental
+from simplejam.midi.logic.generators import generate_number_chord_sequence
+from simplejam.midi.logic.markov import MarkovGenerator
+from simplejam.midi.logic.voicing import voice_chords
+from simplejam.midi.midifile import (
+    SingleTrackMidiFile,
+    generate_midi_file_from_chord_sequence,
+    stream_midi_file_from_chord_sequence,
+)
+from simplejam.midi.playback import NullOutput, Player, Timeline
+from simplejam.schemas import KeyChordProgression
+
+NUMERALS = ("I", "II", "III", "IV", "V", "VI", "VII")
+
+# size -> (rounds, iterations), so each benchmark takes about a second
+ROUNDS = {10: (20, 100), 10_000: (5, 1), 1_000_000: (2, 1)}
+
+SIZES = [
+    pytest.param(10, id="10_chords"),
+    pytest.param(10_000, id="10k_chords"),
+    pytest.param(1_000_000, id="1M_chords"),
+]
+
+
+@lru_cache(maxsize=None)
+def progression(size):
+    return KeyChordProgression(
+        key="C", number_chord_sequence=tuple(NUMERALS[i % 7] for i in range(size))
+    )
+
+
+@lru_cache(maxsize=None)
+def chords(size):
+    return tuple(generate_number_chord_sequence([progression(size)], cache=None))
+
+
+@lru_cache(maxsize=None)
+def compact_chords(size):
+    return tuple(Chord(chord) for chord in chords(size))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_generate_number_chord_sequence(measure, size):
+    progressions = [progression(size)]
+
+    result = measure(
+        lambda: generate_number_chord_sequence(progressions, cache=None),
+        size,
+        "chords",
+        *ROUNDS[size],
+    )
+
+    assert len(result) == size
+
+
+@pytest.mark.parametrize("size", SIZES[:2])
+def test_voice_chords(measure, size):
+    chord_sequence = list(chords(size))
+
+    result = measure(lambda: voice_chords(chord_sequence), size, "chords", *ROUNDS[size])
+
+    assert len(result) == size
+
+
+@pytest.mark.parametrize("encoder,size", [
+    pytest.param("bytes", 10, id="bytes-10_chords"),
+    pytest.param("bytes", 10_000, id="bytes-10k_chords"),
+    pytest.param("bytes", 1_000_000, id="bytes-1M_chords"),
+    pytest.param("mido", 10, id="mido-10_chords"),
+    pytest.param("mido", 10_000, id="mido-10k_chords"),
+])
+def test_generate_midi_file(measure, encoder, size):
+    chord_sequence = list(chords(size))
+
+    data = measure(
+        lambda: generate_midi_file_from_chord_sequence(
+            None, chord_sequence, encoder=encoder
+        ),
+        size,
+        "chords",
+        *ROUNDS[size],
+    )
+
+    assert bytes(data[:4]) == b"MThd"
+
+
+@pytest.mark.parametrize("rhythm", [
+    pytest.param(None, id="block"),
+    pytest.param("beats", id="beats"),
+])
+@pytest.mark.parametrize("compact", [
+    pytest.param(False, id="scale_notes"),
+    pytest.param(True, id="chords"),
+])
+@pytest.mark.parametrize("size", SIZES)
+def test_generate_midi_file_chord_types(measure, size, compact, rhythm):
+    """Render the same chords given as tuples of scale notes and as Chords."""
+    chord_sequence = list(compact_chords(size) if compact else chords(size))
+
+    data = measure(
+        lambda: generate_midi_file_from_chord_sequence(
+            None, chord_sequence, encoder="bytes", rhythm=rhythm
+        ),
+        size,
+        "chords",
+        *ROUNDS[size],
+    )
+
+    assert bytes(data[:4]) == b"MThd"
+
+
+@pytest.mark.parametrize("size", SIZES[1:])
+def test_stream_markov_progression(measure, tmp_path, size):
+    """Peak memory stays flat however many chords are generated."""
+    generator = MarkovGenerator()
+    output_file = str(tmp_path / "markov.mid")
+
+    measure(
+        lambda: stream_midi_file_from_chord_sequence(
+            output_file, generator.chords(seed=0, length=size)
+        ),
+        size,
+        "chords",
+        *ROUNDS[size],
+    )
+
+    assert os.path.getsize(output_file) > size
+
+
+@pytest.mark.parametrize("size", SIZES[1:])
+@pytest.mark.parametrize("resize", [False, True], ids=["same_size", "resize"])
+def test_patch_one_chord(measure, tmp_path, size, resize):
+    """Edits in place cost the same whatever the length of the song.
+
+    A resize moves the bytes of every bar after it.
+    """
+    chord_sequence = compact_chords(size)
+    midi = render_incremental(
+        str(tmp_path / "song.mid"), chord_sequence, rhythm="syncopated"
+    )
+    bar = size // 2
+    edits = [
+        Chord([60, 64, 67, 71]) if resize else chord_sequence[bar + 1],
+        chord_sequence[bar],
+    ]
+
+    def patch():
+        edits.reverse()
+        return midi.patch({bar: edits[0]})
+
+    result = measure(patch, 1, "edits", rounds=20)
+
+    assert result.encoded == 1
+
+
+@pytest.mark.parametrize("encoder", ["bytes", "mido"])
+def test_save_many_small_files(measure, tmp_path, encoder):
+    chord_sequence = list(chords(8))
+    files = []
+    for i in range(200):
+        midi_file = SingleTrackMidiFile(str(tmp_path / f"{i}.mid"), encoder=encoder)
+        midi_file.set_tempo(60 + i % 60)
+        for chord in chord_sequence:
+            midi_file.add_chord([note.value for note in chord], 1920)
+        files.append(midi_file)
+
+    def save_all():
+        for midi_file in files:
+            midi_file.save()
+
+    measure(save_all, len(files), "files", rounds=5)
+
+    assert len(os.listdir(tmp_path)) == len(files)
+
+
+@pytest.mark.parametrize("events", [
+    pytest.param(1_000, id="1k_events"),
+    pytest.param(100_000, id="100k_events"),
+])
+def test_playback_scheduling(measure, events):
+    # Every event is due at once, so this times the dispatch cost per event.
+    message = bytes((0x90, 60, 100))
+    timeline = Timeline(tuple((0.0, message) for _ in range(events)), 0.0)
+    output = NullOutput()
+
+    def play():
+        with Player(output) as player:
+            player.play(timeline)
+            return player.stats()
+
+    stats = measure(play, events, "events", rounds=5)
+
+    assert stats.events == events
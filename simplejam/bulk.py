@@ -0,0 +1,198 @@
+"""Render a stream of RenderSpec records, one JSON object per line.
+
+Lines are read lazily and validated a batch at a time with a single pydantic
+TypeAdapter call. A batch that fails is validated again line by line, so one
+bad record only fails itself. Valid specs are rendered in chunks, either
+inline or in a process pool with a bounded number of chunks in flight, so
+memory use does not grow with the length of the input. Results come back in
+input order.
+"""
+
+import json
+import os
+import time
+from collections import deque
+from itertools import islice
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from pydantic import TypeAdapter, ValidationError
+
+from simplejam.instrumentation import instruments
+from simplejam.midi.logic.generators import generate_number_chord_sequence
+from simplejam.midi.logic.voicing import voice_chords
+from simplejam.midi.midifile import (
+    TimeSignature,
+    generate_midi_file_from_chord_sequence,
+)
+from simplejam.schemas import RenderSpec
+
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_CHUNKSIZE = 64
+
+SPECS_ADAPTER = TypeAdapter(List[RenderSpec])
+SPEC_ADAPTER = TypeAdapter(RenderSpec)
+
+# (line number, output file, spec or validation error)
+Record = Tuple[int, str, "RenderSpec | str"]
+
+
+class RecordResult(NamedTuple):
+    """Outcome of one input line."""
+
+    line: int
+    output_file: str
+    elapsed: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def summary(self) -> str:
+        """Return the result as a single JSON line."""
+        summary = {"line": self.line, "output_file": self.output_file}
+        if self.error is None:
+            summary["elapsed_ms"] = round(self.elapsed * 1000, 3)
+        else:
+            summary["error"] = self.error
+        return json.dumps(summary)
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _error_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'record'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+def validate_lines(
+    lines: Iterable[Tuple[int, str]],
+) -> List[Tuple[int, "RenderSpec | str"]]:
+    """Return the spec, or the validation error, of each (line number, text)."""
+    lines = list(lines)
+    try:
+        specs = SPECS_ADAPTER.validate_json(
+            "[" + ",".join(text for _, text in lines) + "]"
+        )
+    except ValidationError:
+        pass
+    else:
+        # A line holding several comma separated objects splices in extra specs.
+        if len(specs) == len(lines):
+            return [(number, spec) for (number, _), spec in zip(lines, specs)]
+
+    results: List[Tuple[int, "RenderSpec | str"]] = []
+    for number, text in lines:
+        try:
+            results.append((number, SPEC_ADAPTER.validate_json(text)))
+        except ValidationError as e:
+            results.append((number, _error_message(e)))
+    return results
+
+
+def read_records(
+    lines: Iterable[str], output_dir: str, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[Record]:
+    """Yield a Record for every non-blank line, validating batch_size at a time."""
+    numbered = (
+        (number, text) for number, text in enumerate(lines, start=1) if text.strip()
+    )
+    for batch in _batches(numbered, batch_size):
+        for number, spec in validate_lines(batch):
+            name = f"progression_{number:07d}.mid"
+            if isinstance(spec, RenderSpec) and spec.output_file:
+                name = spec.output_file
+            yield number, os.path.join(output_dir, name), spec
+
+
+def _render_record(record: Record, encoder: str) -> RecordResult:
+    number, output_file, spec = record
+    if isinstance(spec, str):
+        return RecordResult(number, output_file, 0.0, spec)
+
+    start = time.perf_counter()
+    try:
+        chord_sequence = generate_number_chord_sequence([spec])
+        if spec.voice_leading:
+            chord_sequence = voice_chords(chord_sequence)
+        # Replaced atomically, concurrent renders of output_file are coalesced
+        generate_midi_file_from_chord_sequence(
+            output_file,
+            chord_sequence,
+            tempo=spec.tempo,
+            time_signature=TimeSignature(*spec.time_signature),
+            encoder=encoder,
+        )
+    except Exception as e:
+        return RecordResult(
+            number, output_file, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+        )
+    return RecordResult(number, output_file, time.perf_counter() - start)
+
+
+def _render_chunk(
+    records: List[Record], encoder: str, instrument: bool = False
+) -> Tuple[List[RecordResult], Optional[Dict[str, Any]]]:
+    """Render records. With instrument, in a worker process, the metrics of
+    the chunk are returned too, to be merged by the parent."""
+    if instrument:
+        instruments.enable()
+        instruments.reset()
+    results = [_render_record(record, encoder) for record in records]
+    return results, instruments.snapshot() if instrument else None
+
+
+def render_lines(
+    lines: Iterable[str],
+    output_dir: str,
+    workers: int = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    encoder: str = "bytes",
+) -> Iterator[RecordResult]:
+    """Render the spec on every non-blank line, yielding results in input order.
+
+    With more than one worker, chunks of chunksize records are rendered in a
+    process pool and at most two chunks per worker are in flight. When
+    instrumentation is enabled, the metrics of the workers are merged in.
+    """
+    chunks = _batches(read_records(lines, output_dir, batch_size), chunksize)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _render_chunk(chunk, encoder)[0]
+        return
+
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    def collect(future: Future) -> List[RecordResult]:
+        results, snapshot = future.result()
+        if snapshot is not None:
+            instruments.merge(snapshot)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(
+                executor.submit(_render_chunk, chunk, encoder, instruments.enabled)
+            )
+            if len(pending) >= 2 * workers:
+                yield from collect(pending.popleft())
+        while pending:
+            yield from collect(pending.popleft())
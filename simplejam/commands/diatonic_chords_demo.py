@@ -1,6 +1,7 @@
 """Demonstration of generating diatonic chords in MIDI files for C major and D major keys."""
 
 import os
+from simplejam import config
 from simplejam.midi.keys import C_major, D_major
 from simplejam.midi.midifile import (
     TimeSignature,
@@ -11,7 +12,7 @@ from simplejam.midi.midifile import (
 def run() -> None:
     generate_midi_file_from_chord_sequence(
         os.path.join(
-            "/Users/telviscalhoun/work/SimpleJamService/output",
+            config.OUTPUT_FILES_DIRECTORY,
             "c_major.mid",
         ),
         chord_sequence=list(C_major.DiatonicTriads.values()),
@@ -21,7 +22,7 @@ def run() -> None:
 
     generate_midi_file_from_chord_sequence(
         os.path.join(
-            "/Users/telviscalhoun/work/SimpleJamService/output",
+            config.OUTPUT_FILES_DIRECTORY,
             "d_major.mid",
         ),
         chord_sequence=list(D_major.DiatonicTriads.values()),
@@ -1,6 +1,30 @@
-from environs import env
+"""Settings read from the environment and the .env file, if it exists.
 
-env.read_env()  # read .env file, if it exists
+Settings are resolved on first access, so importing this module is cheap and
+does not fail when they are unset. Reading an unset setting raises
+AttributeError.
+"""
+
+from typing import Any
 
 # Read OUTPUT_FILES_DIRECTORY from .env file
-OUTPUT_FILES_DIRECTORY = env("OUTPUT_FILES_DIRECTORY")
+OUTPUT_FILES_DIRECTORY: str
+
+_SETTINGS = ("OUTPUT_FILES_DIRECTORY",)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    from environs import EnvError, env
+
+    env.read_env()  # read .env file, if it exists
+    try:
+        value = globals()[name] = env(name)
+    except EnvError as e:
+        # AttributeError, so hasattr() and getattr() with a default work.
+        raise AttributeError(
+            f"{name} is not set, set it in the environment or the .env file."
+        ) from e
+    return value
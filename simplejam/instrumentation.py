@@ -0,0 +1,212 @@
+"""Stage timers and counters for the render pipeline.
+
+Instrumentation is off by default. While off, timer() returns a shared no-op
+context manager and count() returns at once. Code run for every file checks
+instruments.enabled once instead and only then reads the clock, so disabled
+hooks cost an attribute lookup. Once enabled, every stage records its call
+count, total and maximum time, and counters add up events and bytes.
+
+The collected numbers are exported as a JSON report or in the Prometheus
+text format. Console scripts take --metrics FILE to write them and
+--profile FILE to dump cProfile stats of the run, see add_arguments.
+"""
+
+import argparse
+import json
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Prefix of the exported Prometheus metric names
+METRIC_PREFIX = "simplejam"
+
+# rate name -> (counter, stage it is measured against)
+RATES = {
+    "events_per_second": ("events", "build_events"),
+    "bytes_per_second": ("bytes_written", "save"),
+}
+
+
+class _NullTimer:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("instruments", "name", "start")
+
+    def __init__(self, instruments: "Instrumentation", name: str) -> None:
+        self.instruments = instruments
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.instruments.record(self.name, time.perf_counter() - self.start)
+
+
+class Instrumentation:
+    """Registry of stage timers and counters."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        # stage name -> [calls, total seconds, max seconds]
+        self.timers: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        self.timers.clear()
+        self.counters.clear()
+
+    def timer(self, name: str) -> Any:
+        """Return a context manager timing the stage name, when enabled."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add one call of the stage name that took seconds."""
+        stats = self.timers.get(name)
+        if stats is None:
+            self.timers[name] = [1, seconds, seconds]
+            return
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Add value to the counter name, when enabled."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the raw timers and counters, to merge into another process."""
+        return {
+            "timers": {name: list(stats) for name, stats in self.timers.items()},
+            "counters": dict(self.counters),
+        }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """Add the timers and counters of a snapshot to this registry."""
+        for name, (calls, total, longest) in snapshot["timers"].items():
+            stats = self.timers.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += calls
+            stats[1] += total
+            stats[2] = max(stats[2], longest)
+        for name, value in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self) -> Dict[str, Any]:
+        """Return the stages, counters and rates as a JSON serializable dict."""
+        rates = {}
+        for rate, (counter, stage) in RATES.items():
+            if counter in self.counters and self.timers.get(stage, [0, 0.0])[1]:
+                rates[rate] = self.counters[counter] / self.timers[stage][1]
+        return {
+            "stages": {
+                name: {
+                    "calls": int(calls),
+                    "total_seconds": total,
+                    "mean_seconds": total / calls,
+                    "max_seconds": longest,
+                }
+                for name, (calls, total, longest) in sorted(self.timers.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "rates": rates,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Return the report in the Prometheus text exposition format."""
+        report = self.report()
+        stage_metric = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [f"# TYPE {stage_metric} summary"]
+        for name, stats in report["stages"].items():
+            lines.append(f'{stage_metric}_count{{stage="{name}"}} {stats["calls"]}')
+            lines.append(
+                f'{stage_metric}_sum{{stage="{name}"}} {stats["total_seconds"]!r}'
+            )
+        lines.append(f"# TYPE {stage_metric}_max gauge")
+        for name, stats in report["stages"].items():
+            lines.append(
+                f'{stage_metric}_max{{stage="{name}"}} {stats["max_seconds"]!r}'
+            )
+        for name, value in report["counters"].items():
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value!r}"]
+        for name, value in report["rates"].items():
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value!r}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write the report to path, Prometheus text for .prom files, else JSON."""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+# The registry used by the instrumented code
+instruments = Instrumentation()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the --profile and --metrics options to a console script parser."""
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Dump cProfile stats of the run to FILE and print the top calls",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="Write stage timers and counters to FILE, "
+        "in the Prometheus text format if it ends in .prom, JSON otherwise",
+    )
+
+
+@contextmanager
+def instrumented_run(
+    profile: Optional[str] = None, metrics: Optional[str] = None
+) -> Iterator[None]:
+    """Profile the block into profile and write its metrics to metrics.
+
+    Both are optional, with neither the block runs as is.
+    """
+    if metrics:
+        instruments.enable()
+    profiler = None
+    if profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profile and profiler is not None:
+            import pstats
+
+            profiler.disable()
+            profiler.dump_stats(profile)
+            stats = pstats.Stats(profiler, stream=sys.stderr)
+            stats.sort_stats("cumulative").print_stats(20)
+        if metrics:
+            instruments.write(metrics)
@@ -0,0 +1,37 @@
+"""Deferred imports, so console scripts start without loading heavy packages.
+
+A module declares its deferred names with lazy_imports and assigns the
+returned __getattr__, which imports them the first time they are looked up
+as attributes, e.g. by unittest.mock.patch. Code inside the module calls the
+returned load function before using the names as globals. Names already set,
+for instance patched in tests, are kept.
+"""
+
+from importlib import import_module
+from typing import Any, Callable, Dict, Tuple
+
+
+def lazy_imports(
+    module_globals: Dict[str, Any], imports: Dict[str, str]
+) -> Tuple[Callable[[], None], Callable[[str], Any]]:
+    """Return the load function and module __getattr__ for deferred imports.
+
+    imports maps global names to "module" or "module:attribute".
+    """
+
+    def load() -> None:
+        for name, target in imports.items():
+            if name not in module_globals:
+                module_name, _, attribute = target.partition(":")
+                value = import_module(module_name)
+                module_globals[name] = getattr(value, attribute) if attribute else value
+
+    def __getattr__(name: str) -> Any:
+        if name in imports:
+            load()
+            return module_globals[name]
+        raise AttributeError(
+            f"module {module_globals['__name__']!r} has no attribute {name!r}"
+        )
+
+    return load, __getattr__
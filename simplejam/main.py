@@ -0,0 +1,152 @@
+"""Entry point of the simplejam console script.
+
+simplejam serve   Serve MIDI renders over HTTP, the default command.
+simplejam render  Render RenderSpec records read as JSON lines from a file or
+                  stdin, printing a JSON summary line per record.
+"""
+
+import argparse
+import os
+import sys
+import time
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, List, Optional
+
+from simplejam.instrumentation import add_arguments as add_instrumentation_arguments
+from simplejam.instrumentation import instrumented_run
+from simplejam.lazy import lazy_imports
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from simplejam.service import JamService
+
+# The service pulls in asyncio, pydantic and the renderers, only import it to
+# serve, not to parse --help.
+_load_service, __getattr__ = lazy_imports(
+    globals(),
+    {"asyncio": "asyncio", "JamService": "simplejam.service:JamService"},
+)
+
+COMMANDS = ("serve", "render")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Without a command, the arguments are those of serve.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv = ["serve"] + argv
+
+    parser = argparse.ArgumentParser(
+        prog="simplejam", description="Render chord progressions to MIDI files"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    add_instrumentation_arguments(common)
+
+    serve = commands.add_parser(
+        "serve", parents=[common], help="Serve MIDI renders over HTTP"
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--workers", type=int, default=None)
+    serve.add_argument("--max-concurrency", type=int, default=8)
+    serve.add_argument("--max-pending", type=int, default=64)
+
+    render = commands.add_parser(
+        "render", parents=[common], help="Render progressions read as JSON lines"
+    )
+    render.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        help="JSONL file of RenderSpec records, - for stdin (default)",
+    )
+    render.add_argument(
+        "--output-dir",
+        help="Directory for the MIDI files, defaults to OUTPUT_FILES_DIRECTORY",
+    )
+    render.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Render processes, 1 renders in this process",
+    )
+    render.add_argument("--batch-size", type=int, default=1024)
+    render.add_argument("--chunksize", type=int, default=64)
+    render.add_argument("--encoder", choices=("mido", "bytes"), default="bytes")
+    return parser.parse_args(argv)
+
+
+def serve(args: argparse.Namespace) -> None:
+    _load_service()
+    service = JamService(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_concurrency=args.max_concurrency,
+        max_pending=args.max_pending,
+    )
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def render(args: argparse.Namespace) -> int:
+    """Render every record, return the number of records that failed."""
+    from simplejam.bulk import render_lines
+
+    output_dir = args.output_dir
+    if output_dir is None:
+        from simplejam import config
+
+        output_dir = getattr(config, "OUTPUT_FILES_DIRECTORY", None)
+        if output_dir is None:
+            raise SystemExit(
+                "simplejam render: --output-dir is required when "
+                "OUTPUT_FILES_DIRECTORY is not set."
+            )
+    os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    rendered = failed = 0
+    source = (
+        nullcontext(sys.stdin)
+        if args.input == "-"
+        else open(args.input, encoding="utf-8")
+    )
+    with source as lines:
+        for result in render_lines(
+            lines,
+            output_dir,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            chunksize=args.chunksize,
+            encoder=args.encoder,
+        ):
+            print(result.summary())
+            rendered += result.ok
+            failed += not result.ok
+
+    print(
+        f"Rendered {rendered} files, {failed} failed, "
+        f"in {time.perf_counter() - start:.2f} s",
+        file=sys.stderr,
+    )
+    return failed
+
+
+def main() -> None:
+    args = parse_args()
+    with instrumented_run(args.profile, args.metrics):
+        if args.command == "render":
+            failed = render(args)
+        else:
+            serve(args)
+            failed = 0
+    if failed:
+        raise SystemExit(1)
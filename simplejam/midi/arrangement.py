@@ -0,0 +1,195 @@
+"""Backing track arrangements: chords, bass and drums from one chord sequence.
+
+Every part is a generator of Events in tick order. Parts made of several
+voices, like the drum kit, are combined with heapq.merge, so rendering stays
+linear in the number of events however many voices or tracks are added.
+"""
+
+import heapq
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from simplejam.midi.chord import chord_notes
+from simplejam.midi.midifile import MultiTrackMidiFile, TimeSignature
+from simplejam.midi.smf import NOTE_OFF, NOTE_ON, Event
+
+# At the same tick note_off events sort first, so a note held into the next
+# bar is released before it is struck again.
+OFF_PRIORITY = 0
+ON_PRIORITY = 1
+
+CHORD_CHANNEL = 0
+BASS_CHANNEL = 1
+DRUM_CHANNEL = 9  # General MIDI percussion
+
+PIANO_PROGRAM = 0
+BASS_PROGRAM = 33  # Electric Bass (finger)
+
+KICK = 36
+SNARE = 38
+CLOSED_HI_HAT = 42
+
+
+class DrumVoice(NamedTuple):
+    """A drum hit on every `every`-th subdivision of each beat, from `offset`."""
+
+    note: int
+    subdivision: int = 1
+    every: int = 1
+    offset: int = 0
+    velocity: int = 100
+
+
+BASS_PATTERNS = ("root", "root_fifth")
+DRUM_PATTERNS: Dict[str, Sequence[DrumVoice]] = {
+    "rock": (
+        DrumVoice(KICK, every=2),
+        DrumVoice(SNARE, every=2, offset=1),
+        DrumVoice(CLOSED_HI_HAT, subdivision=2, velocity=70),
+    ),
+    "four_on_the_floor": (
+        DrumVoice(KICK),
+        DrumVoice(SNARE, every=2, offset=1),
+        DrumVoice(CLOSED_HI_HAT, subdivision=2, every=2, offset=1, velocity=70),
+    ),
+}
+
+
+def _note(tick: int, status: int, note: int, velocity: int) -> Event:
+    priority = OFF_PRIORITY if status & 0xF0 == NOTE_OFF else ON_PRIORITY
+    return (tick, priority, status, note, velocity)
+
+
+def chord_events(
+    chords: Sequence[Sequence[int]],
+    bar_ticks: int,
+    velocity: int = 90,
+    channel: int = CHORD_CHANNEL,
+) -> Iterator[Event]:
+    """Yield a block chord held for one bar per chord."""
+    for i, notes in enumerate(chords):
+        start = i * bar_ticks
+        for note in notes:
+            yield _note(start, NOTE_ON | channel, note, velocity)
+        for note in notes:
+            yield _note(start + bar_ticks, NOTE_OFF | channel, note, velocity)
+
+
+def bass_events(
+    chords: Sequence[Sequence[int]],
+    bar_ticks: int,
+    beat_ticks: int,
+    pattern: str = "root",
+    velocity: int = 100,
+    channel: int = BASS_CHANNEL,
+) -> Iterator[Event]:
+    """Yield a bass line two octaves below the lowest note of each chord.
+
+    "root" holds the root for the whole bar, "root_fifth" plays the root for
+    the first half of the bar (rounded up to whole beats) and then the fifth.
+    Roots that would fall below note 0 are moved up by octaves instead, and
+    empty chords are rests.
+    """
+    if pattern not in BASS_PATTERNS:
+        raise ValueError(
+            f"Invalid bass pattern '{pattern}'. Available patterns: {list(BASS_PATTERNS)}"
+        )
+
+    beats = bar_ticks // beat_ticks
+    split = (beats + 1) // 2 * beat_ticks
+    for i, notes in enumerate(chords):
+        if not notes:
+            continue
+        start = i * bar_ticks
+        root = min(notes) - 24
+        if root < 0:
+            root %= 12
+        segments: Tuple[Tuple[int, int, int], ...]
+        if pattern == "root":
+            segments = ((root, start, start + bar_ticks),)
+        else:
+            segments = (
+                (root, start, start + split),
+                (root + 7, start + split, start + bar_ticks),
+            )
+        for note, on_tick, off_tick in segments:
+            yield _note(on_tick, NOTE_ON | channel, note, velocity)
+            yield _note(off_tick, NOTE_OFF | channel, note, velocity)
+
+
+def _drum_voice(
+    voice: DrumVoice, n_bars: int, bar_ticks: int, beat_ticks: int, channel: int
+) -> Iterator[Event]:
+    step = beat_ticks // voice.subdivision
+    hit_ticks = step // 2
+    for tick in range(voice.offset * step, n_bars * bar_ticks, voice.every * step):
+        yield _note(tick, NOTE_ON | channel, voice.note, voice.velocity)
+        yield _note(tick + hit_ticks, NOTE_OFF | channel, voice.note, voice.velocity)
+
+
+def drum_events(
+    n_bars: int,
+    bar_ticks: int,
+    beat_ticks: int,
+    pattern: str = "rock",
+    channel: int = DRUM_CHANNEL,
+) -> Iterator[Event]:
+    """Yield a drum pattern for n_bars, merging one stream per kit piece."""
+    if pattern not in DRUM_PATTERNS:
+        raise ValueError(
+            f"Invalid drum pattern '{pattern}'. Available patterns: {list(DRUM_PATTERNS)}"
+        )
+    return merge_events(
+        _drum_voice(voice, n_bars, bar_ticks, beat_ticks, channel)
+        for voice in DRUM_PATTERNS[pattern]
+    )
+
+
+def merge_events(streams: Iterable[Iterable[Event]]) -> Iterator[Event]:
+    """Merge event streams that are each in tick order into one stream."""
+    return heapq.merge(*streams)
+
+
+def generate_arrangement_from_chord_sequence(
+    output_file: Optional[str],
+    chord_sequence: Iterable[Any],
+    tempo: int = 60,
+    time_signature: TimeSignature = TimeSignature(4, 4),
+    bass: Optional[str] = "root",
+    drums: Optional[str] = "rock",
+) -> Optional[memoryview]:
+    """Generate a type 1 MIDI file with chord, bass and drum tracks.
+
+    Each chord lasts one bar of time_signature. Pass None for bass or drums to
+    leave that part out. Like generate_midi_file_from_chord_sequence, the file
+    is returned as a memoryview when output_file is None.
+    """
+    chords = [chord_notes(chord) for chord in chord_sequence]
+
+    mf = MultiTrackMidiFile(output_file)
+    mf.set_tempo(tempo)
+    mf.set_time_signature(time_signature)
+
+    beat_ticks = mf.ticks_per_beat * 4 // time_signature.denominator
+    bar_ticks = beat_ticks * time_signature.numerator
+
+    mf.add_track(chord_events(chords, bar_ticks), PIANO_PROGRAM, CHORD_CHANNEL)
+    if bass is not None:
+        mf.add_track(
+            bass_events(chords, bar_ticks, beat_ticks, bass), BASS_PROGRAM, BASS_CHANNEL
+        )
+    if drums is not None:
+        mf.add_track(drum_events(len(chords), bar_ticks, beat_ticks, drums))
+
+    if output_file is None:
+        return memoryview(mf.to_bytes())
+    mf.save()
+    return None
@@ -0,0 +1,52 @@
+"""Atomic file output: readers see the old file or the new one, never a part.
+
+Files are written to a temporary file next to their destination, then moved
+over it with os.replace, which is atomic within a filesystem. Temporary
+names are unique per process and thread, so concurrent writers of the same
+path don't write into each other's files: the last replace wins.
+"""
+
+import os
+import threading
+from contextlib import contextmanager, suppress
+from typing import BinaryIO, Iterator
+
+
+def temp_path(path: str) -> str:
+    """Return a temporary path next to path, unique to this thread."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def fsync_directory(path: str) -> None:
+    """Flush the directory entry of path, so a rename survives a crash."""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_output(path: str, fsync: bool = False) -> Iterator[BinaryIO]:
+    """Open a temporary file that replaces path once the block completes.
+
+    If the block raises, path is left untouched and the temporary file is
+    removed. With fsync, the data and the rename are flushed to disk before
+    returning, otherwise that is left to the operating system.
+    """
+    tmp_file = temp_path(path)
+    try:
+        with open(tmp_file, "wb") as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(tmp_file)
+        raise
+    if fsync:
+        fsync_directory(path)
@@ -0,0 +1,240 @@
+"""Content-addressed cache of rendered MIDI files."""
+
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional
+
+from simplejam.midi.atomic import atomic_output, temp_path
+from simplejam.midi.chord import chord_notes
+
+INDEX_FILE = "index.json"
+JOURNAL_FILE = "index.log"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Journal lines allowed past the number of entries before flushing the index
+JOURNAL_SLACK = 256
+
+
+def render_key(
+    chord_sequence: Iterable[Any],
+    tempo: int,
+    numerator: int,
+    denominator: int,
+    variant: str = "",
+) -> str:
+    """Return the hash identifying the file rendered from these inputs.
+
+    variant identifies any other setting that changes the output, such as the
+    rhythm. Keys without a variant are unchanged by it.
+    """
+    header = f"{tempo}:{numerator}/{denominator}:"
+    if variant:
+        header += f"{variant}:"
+    digest = hashlib.sha256(header.encode())
+    for chord in chord_sequence:
+        # Note numbers are < 128, so 0xFF can't be confused with a note.
+        digest.update(bytes(chord_notes(chord)))
+        digest.update(b"\xff")
+    return digest.hexdigest()
+
+
+class OutputCache:
+    """On-disk cache of rendered files keyed by render_key.
+
+    Cached files are linked (or copied, across filesystems) to the requested
+    output path, so callers must replace output files rather than write into
+    them in place. The cache holds at most max_bytes and evicts the least
+    recently used files first. Its index is a single small JSON file that is
+    loaded once when the cache is created. Stores and evictions are appended
+    to a journal next to it, which is folded back into the index by flush()
+    once it outgrows the index, so each store costs a constant amount of I/O.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        # digest -> size in bytes, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        # Digests fetched since the last journal write, their recency is
+        # journaled with the next store.
+        self._touched: Dict[str, None] = {}
+        self._journal_lines = 0
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.mid")
+
+    def _load_index(self) -> None:
+        entries: OrderedDict[str, int] = OrderedDict()
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE)) as f:
+                entries.update(json.load(f))
+        except (FileNotFoundError, ValueError):
+            pass
+
+        try:
+            with open(os.path.join(self.directory, JOURNAL_FILE)) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            op, (name, _, length) = line[:1], line[1:].partition(" ")
+            if op == "+" and length.isdigit():
+                entries.pop(name, None)
+                entries[name] = int(length)
+            elif op == "~" and name in entries:
+                entries.move_to_end(name)
+            elif op == "-":
+                entries.pop(name, None)
+            # Anything else is a line cut short by a crash
+        self._journal_lines = len(lines)
+
+        for digest, size in entries.items():
+            if os.path.exists(self._path(digest)):
+                self._entries[digest] = size
+                self.total_bytes += size
+
+    def flush(self) -> None:
+        """Write the index atomically and empty the journal."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        index_file = os.path.join(self.directory, INDEX_FILE)
+        with atomic_output(index_file) as f:
+            f.write(json.dumps(list(self._entries.items())).encode())
+        # Replaying the old journal over the new index changes nothing, so a
+        # crash before it is emptied is harmless.
+        with atomic_output(os.path.join(self.directory, JOURNAL_FILE)):
+            pass
+        self._touched.clear()
+        self._journal_lines = 0
+
+    def _journal(self, lines: List[str]) -> None:
+        with open(os.path.join(self.directory, JOURNAL_FILE), "a") as f:
+            f.write("".join(f"{line}\n" for line in lines))
+        self._journal_lines += len(lines)
+        if self._journal_lines > len(self._entries) + JOURNAL_SLACK:
+            self._flush()
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def fetch(self, digest: str, output_file: str) -> bool:
+        """Place the cached file for digest at output_file, if there is one."""
+        with self._lock:
+            if digest not in self._entries:
+                self.misses += 1
+                return False
+            self._entries.move_to_end(digest)
+            self._touched[digest] = None
+            self.hits += 1
+
+        # Linked next to output_file first, then moved over it, so readers
+        # never see output_file missing or half copied.
+        tmp_file = temp_path(output_file)
+        try:
+            os.link(self._path(digest), tmp_file)
+        except FileNotFoundError:
+            # Only a missing cached file means the entry is gone, a missing
+            # output directory is the caller's error.
+            if os.path.exists(self._path(digest)):
+                raise
+            self._forget(digest)
+            return False
+        except OSError:
+            shutil.copyfile(self._path(digest), tmp_file)
+        os.replace(tmp_file, output_file)
+        return True
+
+    def read(self, digest: str) -> Optional[bytes]:
+        """Return the cached file contents for digest, if there is one."""
+        with self._lock:
+            if digest not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self._touched[digest] = None
+            self.hits += 1
+
+        try:
+            with open(self._path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            self._forget(digest)
+            return None
+
+    def _forget(self, digest: str) -> None:
+        """Drop an entry whose file was removed from disk behind our back."""
+        with self._lock:
+            self.total_bytes -= self._entries.pop(digest, 0)
+            self._touched.pop(digest, None)
+            self.hits -= 1
+            self.misses += 1
+
+    def store(self, digest: str, source_file: str) -> None:
+        """Add the rendered source_file to the cache under digest."""
+        cached_file = self._path(digest)
+        tmp_file = temp_path(cached_file)
+        try:
+            os.link(source_file, tmp_file)
+        except OSError:
+            shutil.copyfile(source_file, tmp_file)
+        os.replace(tmp_file, cached_file)
+        self._add(digest)
+
+    def store_bytes(self, digest: str, data: bytes) -> None:
+        """Add a file rendered in memory to the cache under digest."""
+        with atomic_output(self._path(digest)) as f:
+            f.write(data)
+        self._add(digest)
+
+    def _add(self, digest: str) -> None:
+        cached_file = self._path(digest)
+        with self._lock:
+            size = os.path.getsize(cached_file)
+            self.total_bytes += size - self._entries.pop(digest, 0)
+            self._entries[digest] = size
+            self._touched.pop(digest, None)
+            lines = [
+                f"~{touched}" for touched in self._touched if touched in self._entries
+            ]
+            self._touched.clear()
+            lines.append(f"+{digest} {size}")
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, evicted_size = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+                lines.append(f"-{evicted}")
+                try:
+                    os.remove(self._path(evicted))
+                except FileNotFoundError:
+                    pass
+            self._journal(lines)
+
+
+_default_cache: Optional[OutputCache] = None
+
+
+def default_output_cache() -> OutputCache:
+    """Return the shared cache stored under config.OUTPUT_FILES_DIRECTORY."""
+    global _default_cache
+    if _default_cache is None:
+        from simplejam import config
+
+        _default_cache = OutputCache(
+            os.path.join(config.OUTPUT_FILES_DIRECTORY, ".cache")
+        )
+    return _default_cache
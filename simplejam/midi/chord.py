@@ -0,0 +1,141 @@
+"""Compact chords of MIDI note numbers.
+
+The scale enums name every note, but each note is an Enum member and reading
+its number goes through a descriptor, so renderers spend a good part of each
+chord converting it to a list of ints. A Chord holds its note numbers packed
+in bytes, one byte per note, and is interned: Chord((60, 64, 67)) always
+returns the same instance while one is alive. A chord sequence then stores
+one pointer per chord, chords compare by identity and renderers read
+Chord.notes as is. The intern table only holds weak references, so chords
+no longer used are freed however many distinct ones a long-running service
+has seen.
+
+Everything taking a chord sequence accepts Chords as well as tuples of scale
+notes such as C_major.DiatonicTriads["I"], see chord_notes.
+"""
+
+from enum import Enum
+from functools import lru_cache
+from threading import Lock
+from types import MappingProxyType
+from typing import Any, Iterable, Iterator, Mapping, Sequence, Tuple
+from weakref import WeakValueDictionary
+
+from simplejam.midi.keys.scales import (
+    DEGREES,
+    NUMERALS,
+    SEVENTHS,
+    TRIADS,
+    ScaleNote,
+    key_index,
+)
+
+# Highest MIDI note number
+MAX_NOTE = 127
+
+# packed notes -> the one live Chord holding them
+_INTERNED: "WeakValueDictionary[bytes, Chord]" = WeakValueDictionary()
+_INTERN_LOCK = Lock()
+
+
+class Chord:
+    """An immutable, interned chord of MIDI note numbers.
+
+    notes may be ints or scale notes such as CMajorScale.C4, so
+    Chord(C_major.DiatonicTriads["I"]) adapts an enum chord.
+    """
+
+    __slots__ = ("notes", "__weakref__")
+
+    notes: bytes
+
+    def __new__(cls, notes: Iterable[Any] = ()) -> "Chord":
+        if type(notes) is bytes:
+            packed = notes
+        else:
+            packed = bytes(
+                note.value if isinstance(note, Enum) else note for note in notes
+            )
+        chord = _INTERNED.get(packed)
+        if chord is None:
+            if packed and max(packed) > MAX_NOTE:
+                raise ValueError(f"Note numbers must be between 0 and {MAX_NOTE}.")
+            # Checked again under the lock, so racing threads share one instance
+            with _INTERN_LOCK:
+                chord = _INTERNED.get(packed)
+                if chord is None:
+                    chord = object.__new__(cls)
+                    object.__setattr__(chord, "notes", packed)
+                    _INTERNED[packed] = chord
+        return chord
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Chord is immutable.")
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Unpickled chords are interned again
+        return Chord, (self.notes,)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.notes)
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def __getitem__(self, index: int) -> int:
+        return self.notes[index]
+
+    def __repr__(self) -> str:
+        return f"Chord({', '.join(map(str, self.notes))})"
+
+    def to_scale_notes(self, scale: type[ScaleNote]) -> tuple:
+        """Return the chord as a tuple of members of scale, e.g. CMajorScale.
+
+        Raises ValueError if a note is not in the scale.
+        """
+        return tuple(scale(note) for note in self.notes)
+
+
+def as_chord(chord: Any) -> Chord:
+    """Return chord as a Chord, adapting tuples of scale notes or ints."""
+    return chord if type(chord) is Chord else Chord(chord)
+
+
+def chord_notes(chord: Any) -> Sequence[int]:
+    """Return the MIDI note numbers of a Chord, or a tuple of scale notes or ints."""
+    if type(chord) is Chord:
+        return chord.notes
+    try:
+        return [note.value for note in chord]
+    except AttributeError:
+        return [note.value if isinstance(note, Enum) else note for note in chord]
+
+
+def _key_chords(index: int, table: Tuple[Tuple[int, ...], ...]) -> Mapping[str, Chord]:
+    return MappingProxyType(
+        {
+            numeral: Chord(table[index * DEGREES + degree])
+            for degree, numeral in enumerate(NUMERALS)
+        }
+    )
+
+
+def triads(key: str) -> Mapping[str, Chord]:
+    """Return the diatonic triads of key as Chords, see scales.diatonic_triads."""
+    return _triads(key_index(key))
+
+
+def sevenths(key: str) -> Mapping[str, Chord]:
+    """Return the diatonic sevenths of key as Chords, see scales.diatonic_sevenths."""
+    return _sevenths(key_index(key))
+
+
+# Cached by row of the lookup tables, however the key is spelled
+@lru_cache(maxsize=None)
+def _triads(index: int) -> Mapping[str, Chord]:
+    return _key_chords(index, TRIADS)
+
+
+@lru_cache(maxsize=None)
+def _sevenths(index: int) -> Mapping[str, Chord]:
+    return _key_chords(index, SEVENTHS)
@@ -0,0 +1,653 @@
+"""Incremental re-rendering: patch only the bars of a MIDI file that changed.
+
+render_incremental writes the file generate_midi_file_from_chord_sequence
+renders with the bytes encoder, plus a binary sidecar (.sjb) indexing every
+bar: its length in bytes, its span, the rest carried into it from the bar
+before and its chord. Running status is reset at every bar boundary, so
+each bar starts with its own status byte and can be encoded on its own. A
+new chord always starts with a note_on after the note_off events of the
+last one, so the file is byte-identical to a full render.
+
+An IncrementalMidiFile keeps that index in memory. patch replaces the chords
+of some bars and only encodes those, plus the next bar when the rest carried
+into it changed. Bars that kept their length are overwritten in place.
+Otherwise the file is rewritten from the first bar whose length changed,
+copying the bytes of the unchanged bars after it without encoding them
+again. update does the same for a whole new chord sequence, comparing it
+with the index first.
+
+The sidecar holds fixed width columns, one entry per bar, and a table of the
+distinct chords the bars point into. As long as the number of bars stays
+the same, an edit only writes the entries of the bars it encoded, so its
+cost does not depend on the length of the song.
+
+Full renders replace the file atomically, but patches write into it in place
+and are not atomic: a reader can see a file half patched. A patch cut short
+by a crash leaves the file changed since its sidecar was written, so the
+next patch renders it in full. With fsync, the file and its sidecar are
+flushed to disk before a render or patch returns.
+"""
+
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from itertools import compress, count, repeat
+from operator import ne, or_
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from simplejam.instrumentation import instruments
+from simplejam.midi.atomic import atomic_output
+from simplejam.midi.chord import Chord, chord_notes
+from simplejam.midi.midifile import TimeSignature
+from simplejam.midi.rhythm import Rhythm, chord_spans, get_rhythm, meter_ticks
+from simplejam.midi.smf import (
+    DEFAULT_TICKS_PER_BEAT,
+    TrackWriter,
+    bpm2tempo,
+    encode_file,
+    end_of_track,
+)
+
+SIDECAR_SUFFIX = ".sjb"
+SIDECAR_MAGIC = b"SJB1"
+# magic, mtime_ns and size of the indexed file, offset of the first bar,
+# rest after the last bar, bar count, chord count, variant length. The
+# variant follows, then the length, span, rest and chord columns and the
+# note count and notes of each chord.
+_SIDECAR_HEADER = struct.Struct(">4sqqIIIIH")
+_ENTRY = struct.Struct(">I")
+_NOTE_COUNT = struct.Struct(">H")
+_COLUMNS = 4
+_SWAP = sys.byteorder == "little"
+
+# The track data starts after the MThd chunk and the MTrk chunk header, the
+# track length is the last 4 bytes before it.
+TRACK_START = 22
+TRACK_LENGTH_OFFSET = 18
+
+# Files opened or rendered lately, so patching the same file over and over
+# doesn't read its index every time
+RECENT_FILES = 16
+_recent: "OrderedDict[str, IncrementalMidiFile]" = OrderedDict()
+
+# Ticks of a chord without a rhythm, see generate_midi_file_from_chord_sequence
+BLOCK_TICKS = DEFAULT_TICKS_PER_BEAT * 4
+
+
+class BarIndex(NamedTuple):
+    """The bars of a file rendered by render_incremental."""
+
+    # tempo, time signature and rhythm the bars were rendered with
+    variant: str
+    # Offset of the first bar, after the tempo and time signature
+    start: int
+    # Per bar: length in bytes, span in ticks, ticks from the last event
+    # before the bar to its start, and index of its notes in table
+    lengths: array
+    spans: array
+    rests: array
+    chords: array
+    table: List[bytes]
+    # Ticks from the last event to the end of the last bar
+    rest: int
+
+
+class PatchResult(NamedTuple):
+    bars: int
+    encoded: int
+    # Whether the encoded bars were written over the old ones, leaving the
+    # rest of the file untouched
+    in_place: bool
+
+
+def sidecar_path(path: str) -> str:
+    return path + SIDECAR_SUFFIX
+
+
+def _stamp(stat: os.stat_result) -> Tuple[int, int]:
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _column_bytes(column: array) -> bytes:
+    if _SWAP:
+        column = array("I", column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _column(data: bytes) -> array:
+    column = array("I")
+    column.frombytes(data)
+    if _SWAP:
+        column.byteswap()
+    return column
+
+
+def _table_bytes(table: Iterable[bytes]) -> bytes:
+    return b"".join(_NOTE_COUNT.pack(len(notes)) + notes for notes in table)
+
+
+def _header(index: BarIndex, stamp: Tuple[int, int]) -> bytes:
+    return _SIDECAR_HEADER.pack(
+        SIDECAR_MAGIC,
+        *stamp,
+        index.start,
+        index.rest,
+        len(index.chords),
+        len(index.table),
+        len(index.variant.encode()),
+    )
+
+
+def write_bar_index(path: str, index: BarIndex, fsync: bool = False) -> Tuple[int, int]:
+    """Store index next to path, return the (mtime_ns, size) it is valid for."""
+    stamp = _stamp(os.stat(path))
+    data = b"".join(
+        [
+            _header(index, stamp),
+            index.variant.encode(),
+            _column_bytes(index.lengths),
+            _column_bytes(index.spans),
+            _column_bytes(index.rests),
+            _column_bytes(index.chords),
+            _table_bytes(index.table),
+        ]
+    )
+
+    with atomic_output(sidecar_path(path), fsync) as f:
+        f.write(data)
+    return stamp
+
+
+def update_bar_index(
+    path: str,
+    index: BarIndex,
+    bars: Iterable[int],
+    new_chords: int,
+    fsync: bool = False,
+) -> Tuple[int, int]:
+    """Write some bars of index into the sidecar of path, in place.
+
+    The sidecar must index as many bars as index, new_chords is the number
+    of chords added to the end of its table since. The header goes last,
+    so the sidecar stays out of date if this fails half way.
+    """
+    stamp = _stamp(os.stat(path))
+    bar_count = len(index.chords)
+    columns_start = _SIDECAR_HEADER.size + len(index.variant.encode())
+    columns = (index.lengths, index.spans, index.rests, index.chords)
+    with open(sidecar_path(path), "r+b") as f:
+        for i in bars:
+            for column, values in enumerate(columns):
+                f.seek(columns_start + _ENTRY.size * (column * bar_count + i))
+                f.write(_ENTRY.pack(values[i]))
+        if new_chords:
+            f.seek(0, os.SEEK_END)
+            f.write(_table_bytes(index.table[-new_chords:]))
+        f.seek(0)
+        f.write(_header(index, stamp))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    return stamp
+
+
+def read_bar_index(path: str) -> Optional[BarIndex]:
+    """Return the bar index of path, None if missing or out of date."""
+    try:
+        stat = os.stat(path)
+        with open(sidecar_path(path), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    try:
+        magic, mtime_ns, size, start, rest, bars, chord_count, variant_length = (
+            _SIDECAR_HEADER.unpack_from(data)
+        )
+        if magic != SIDECAR_MAGIC or (mtime_ns, size) != _stamp(stat):
+            return None
+        pos = _SIDECAR_HEADER.size
+        variant = data[pos : pos + variant_length].decode()
+        pos += variant_length
+        columns = []
+        for _ in range(_COLUMNS):
+            end = pos + _ENTRY.size * bars
+            columns.append(_column(data[pos:end]))
+            pos = end
+        table = []
+        for _ in range(chord_count):
+            (note_count,) = _NOTE_COUNT.unpack_from(data, pos)
+            pos += _NOTE_COUNT.size
+            table.append(data[pos : pos + note_count])
+            pos += note_count
+    except (struct.error, UnicodeDecodeError, ValueError):
+        return None
+    lengths, spans, rests, chords = columns
+    if pos != len(data) or len(chords) != bars:
+        return None
+    if chords and max(chords) >= len(table):
+        return None
+    return BarIndex(variant, start, lengths, spans, rests, chords, table, rest)
+
+
+def _layout(
+    chord_sequence: Sequence[Any],
+    time_signature: TimeSignature,
+    rhythm: Optional[Rhythm],
+    durations: Optional[Sequence[float]],
+) -> Tuple[List[bytes], List[int]]:
+    """Return the notes and span of every bar."""
+    notes = [
+        chord.notes if type(chord) is Chord else bytes(chord_notes(chord))
+        for chord in chord_sequence
+    ]
+    if rhythm is None:
+        return notes, [BLOCK_TICKS] * len(notes)
+    beat_ticks, bar_ticks = meter_ticks(
+        time_signature.numerator, time_signature.denominator, DEFAULT_TICKS_PER_BEAT
+    )
+    return notes, chord_spans(len(notes), bar_ticks, beat_ticks, durations)
+
+
+def _variant(
+    tempo: int, time_signature: TimeSignature, rhythm: Optional[Rhythm]
+) -> str:
+    return f"{tempo}:{time_signature}:{rhythm.cache_key() if rhythm else 'block'}"
+
+
+def _resolve_rhythm(
+    rhythm: Optional[Rhythm | str], durations: Optional[Sequence[float]]
+) -> Optional[Rhythm]:
+    if rhythm is None and durations is None:
+        return None
+    return get_rhythm(rhythm or "block")
+
+
+class IncrementalMidiFile:
+    """A file rendered by render_incremental, with its bar index in memory.
+
+    Get one from render_incremental or open_incremental. patch and update
+    raise ValueError when the file was changed by something else since.
+    With fsync, every render and patch is flushed to disk before returning.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        index: BarIndex,
+        tempo: int,
+        time_signature: TimeSignature,
+        rhythm: Optional[Rhythm],
+        stamp: Tuple[int, int],
+        fsync: bool = False,
+    ) -> None:
+        self.path = path
+        self.index = index
+        self.tempo = tempo
+        self.time_signature = time_signature
+        self.rhythm = rhythm
+        self._stamp = stamp
+        self.fsync = fsync
+        # notes -> their index in index.table
+        self._chord_ids = {notes: i for i, notes in enumerate(index.table)}
+        self._beat_ticks, self._bar_ticks = meter_ticks(
+            time_signature.numerator, time_signature.denominator, DEFAULT_TICKS_PER_BEAT
+        )
+
+    def __len__(self) -> int:
+        return len(self.index.chords)
+
+    def notes(self) -> List[bytes]:
+        """Return the notes of every bar."""
+        return list(map(self.index.table.__getitem__, self.index.chords))
+
+    def _chord_id(self, notes: bytes) -> int:
+        chord_id = self._chord_ids.get(notes)
+        if chord_id is None:
+            chord_id = self._chord_ids[notes] = len(self.index.table)
+            self.index.table.append(notes)
+        return chord_id
+
+    def _encode_bar(
+        self, writer: TrackWriter, notes: bytes, span: int, rest: int
+    ) -> int:
+        """Append a bar to writer, return the rest carried into the next one."""
+        writer.reset_running_status()
+        if self.rhythm is None:
+            return writer.chord(notes, span, delta=rest)
+        return self.rhythm.render(
+            writer, (notes,), (span,), self._beat_ticks, self._bar_ticks, rest
+        )
+
+    def _render(self, notes: List[bytes], spans: Sequence[int]) -> None:
+        """Render every bar to a new file replacing path."""
+        writer = TrackWriter()
+        writer.tempo(bpm2tempo(self.tempo))
+        writer.time_signature(
+            self.time_signature.numerator, self.time_signature.denominator
+        )
+        start = len(writer.data)
+        lengths = array("I")
+        rests = array("I")
+        rest = 0
+        for chord, span in zip(notes, spans):
+            offset = len(writer.data)
+            rests.append(rest)
+            rest = self._encode_bar(writer, chord, span, rest)
+            lengths.append(len(writer.data) - offset)
+        data = encode_file([writer.data + end_of_track(rest)], DEFAULT_TICKS_PER_BEAT)
+
+        with atomic_output(self.path, self.fsync) as f:
+            f.write(data)
+
+        table = list(dict.fromkeys(notes))
+        self._chord_ids = {chord: i for i, chord in enumerate(table)}
+        self.index = BarIndex(
+            _variant(self.tempo, self.time_signature, self.rhythm),
+            TRACK_START + start,
+            lengths,
+            array("I", spans),
+            rests,
+            array("I", map(self._chord_ids.__getitem__, notes)),
+            table,
+            rest,
+        )
+        self._stamp = write_bar_index(self.path, self.index, self.fsync)
+        if instruments.enabled:
+            instruments.count("bars_encoded", len(notes))
+
+    def _splice(
+        self, bars: int, changes: Mapping[int, bytes], spans: Sequence[int]
+    ) -> PatchResult:
+        """Encode the changed bars and write them into the file, in place.
+
+        Bars past the current count must all be in changes.
+        """
+        index = self.index
+        lengths, rests, chords = index.lengths, index.rests, index.chords
+        old_count = len(chords)
+        old_chords = len(index.table)
+        rest = index.rest
+        if bars < old_count:
+            rest = rests[bars] if bars else 0
+            for column in (lengths, index.spans, rests, chords):
+                del column[bars:]
+        elif bars > old_count:
+            for column in (lengths, index.spans, rests, chords):
+                column.extend(repeat(0, bars - old_count))
+            rests[old_count] = index.rest
+
+        # Encode in order, so the rest carried out of a bar is known when
+        # the next one is encoded, adding it when that rest changed.
+        todo = sorted(i for i in changes if i < bars)
+        writer = TrackWriter()
+        # bar -> offset in writer, old length
+        encoded: Dict[int, Tuple[int, int]] = {}
+        k = 0
+        while k < len(todo):
+            i = todo[k]
+            k += 1
+            notes = changes.get(i)
+            if notes is None:
+                notes = index.table[chords[i]]
+            offset = len(writer.data)
+            carried = self._encode_bar(writer, notes, spans[i], rests[i])
+            encoded[i] = offset, lengths[i]
+            lengths[i] = len(writer.data) - offset
+            index.spans[i] = spans[i]
+            chords[i] = self._chord_id(notes)
+            if i + 1 == bars:
+                rest = carried
+            elif rests[i + 1] != carried:
+                rests[i + 1] = carried
+                if k == len(todo) or todo[k] != i + 1:
+                    todo.insert(k, i + 1)
+
+        # Every bar before first keeps its offset
+        first = min(
+            (i for i, (_, old) in encoded.items() if lengths[i] != old),
+            default=bars,
+        )
+        first = min(first, bars, old_count)
+        in_place = first == bars == old_count and rest == index.rest
+        data = memoryview(writer.data)
+
+        with open(self.path, "r+b") as f:
+            position, bar = index.start, 0
+            for i, (offset, _) in encoded.items():
+                if i >= first:
+                    break
+                position += sum(lengths[bar:i])
+                f.seek(position)
+                f.write(data[offset : offset + lengths[i]])
+                bar = i
+
+            if not in_place:
+                tail_start = index.start + sum(lengths[:first])
+                f.seek(tail_start)
+                old_tail = f.read()
+                parts: List[bytes | memoryview] = []
+                kept, bar = 0, first
+                for i, (offset, old) in encoded.items():
+                    if i < first:
+                        continue
+                    # Copy the unchanged bars since the last encoded one
+                    run = sum(lengths[bar:i])
+                    parts.append(old_tail[kept : kept + run])
+                    parts.append(data[offset : offset + lengths[i]])
+                    kept += run + old
+                    bar = i + 1
+                run = sum(lengths[bar : min(bars, old_count)])
+                parts.append(old_tail[kept : kept + run])
+                parts.append(end_of_track(rest))
+                f.seek(tail_start)
+                size = f.write(b"".join(parts)) + tail_start
+                f.truncate()
+                f.seek(TRACK_LENGTH_OFFSET)
+                f.write(struct.pack(">L", size - TRACK_START))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.index = index._replace(rest=rest)
+        try:
+            if bars == old_count:
+                self._stamp = update_bar_index(
+                    self.path,
+                    self.index,
+                    encoded,
+                    len(index.table) - old_chords,
+                    self.fsync,
+                )
+            else:
+                self._stamp = write_bar_index(self.path, self.index, self.fsync)
+        except FileNotFoundError:
+            # The sidecar was removed since
+            self._stamp = write_bar_index(self.path, self.index, self.fsync)
+        if instruments.enabled:
+            instruments.count("bars_encoded", len(encoded))
+        return PatchResult(bars, len(encoded), in_place)
+
+    def _rewrite(
+        self, bars: int, changes: Mapping[int, bytes], spans: Sequence[int]
+    ) -> PatchResult:
+        timed = instruments.enabled
+        if timed:
+            start = time.perf_counter()
+
+        stat = os.stat(self.path)
+        if _stamp(stat) != self._stamp:
+            raise ValueError(f"'{self.path}' was changed since it was indexed.")
+        if stat.st_nlink > 1:
+            # Linked from elsewhere (an OutputCache entry), leave the other
+            # names alone
+            notes = self.notes()[:bars]
+            notes.extend(repeat(b"", bars - len(notes)))
+            for i, chord in changes.items():
+                notes[i] = chord
+            self._render(notes, spans[:bars])
+            result = PatchResult(bars, bars, False)
+        else:
+            result = self._splice(bars, changes, spans)
+
+        if timed:
+            instruments.record("patch", time.perf_counter() - start)
+        return result
+
+    def patch(self, changes: Mapping[int, Any]) -> PatchResult:
+        """Replace the chords of some bars, {bar index: chord}.
+
+        Bars keep their span. The cost depends on the number of changes,
+        not on the number of bars.
+        """
+        bars = len(self)
+        notes = {}
+        for i, chord in changes.items():
+            if not 0 <= i < bars:
+                raise IndexError(f"Bar {i} out of range for {bars} bars.")
+            notes[i] = bytes(chord_notes(chord))
+        return self._rewrite(bars, notes, self.index.spans)
+
+    def update(
+        self,
+        chord_sequence: Sequence[Any],
+        durations: Optional[Sequence[float]] = None,
+    ) -> PatchResult:
+        """Update the file to the render of a new chord sequence.
+
+        Only the bars whose chord or span changed are encoded, but every
+        chord is compared with the index: use patch when the changed bars
+        are known.
+        """
+        notes, spans = _layout(
+            chord_sequence, self.time_signature, self.rhythm, durations
+        )
+        index = self.index
+        # New chords have no id, so they differ from every bar
+        chords = map(self._chord_ids.get, notes)
+        changed = map(or_, map(ne, chords, index.chords), map(ne, spans, index.spans))
+        changes = {i: notes[i] for i in compress(count(), changed)}
+        for i in range(len(index.chords), len(notes)):
+            changes[i] = notes[i]
+        return self._rewrite(len(notes), changes, spans)
+
+
+def render_incremental(
+    output_file: str,
+    chord_sequence: Sequence[Any],
+    tempo: int = 60,
+    time_signature: TimeSignature = TimeSignature(4, 4),
+    rhythm: Optional[Rhythm | str] = None,
+    durations: Optional[Sequence[float]] = None,
+    fsync: bool = False,
+) -> IncrementalMidiFile:
+    """Render a chord sequence to output_file and index its bars.
+
+    Takes the same arguments as generate_midi_file_from_chord_sequence. The
+    file is replaced atomically rather than written into, so files linked
+    from an OutputCache are left alone.
+    """
+    resolved = _resolve_rhythm(rhythm, durations)
+    notes, spans = _layout(chord_sequence, time_signature, resolved, durations)
+    empty = array("I")
+    index = BarIndex("", 0, empty, empty, empty, empty, [], 0)
+    midi = IncrementalMidiFile(
+        output_file, index, tempo, time_signature, resolved, (0, 0), fsync
+    )
+    midi._render(notes, spans)
+    return _remember(midi)
+
+
+def _remember(midi: IncrementalMidiFile) -> IncrementalMidiFile:
+    path = os.path.abspath(midi.path)
+    _recent[path] = midi
+    _recent.move_to_end(path)
+    while len(_recent) > RECENT_FILES:
+        _recent.popitem(last=False)
+    return midi
+
+
+def open_incremental(
+    output_file: str,
+    tempo: int = 60,
+    time_signature: TimeSignature = TimeSignature(4, 4),
+    rhythm: Optional[Rhythm | str] = None,
+    fsync: bool = False,
+) -> Optional[IncrementalMidiFile]:
+    """Open a file rendered by render_incremental with these settings.
+
+    Return None when it has no up to date index or was rendered with another
+    tempo, time signature or rhythm. A file rendered with durations and no
+    rhythm was rendered with the "block" rhythm. The last RECENT_FILES files
+    are kept open, their index is only read again when the file changed.
+    """
+    resolved = None if rhythm is None else get_rhythm(rhythm)
+    variant = _variant(tempo, time_signature, resolved)
+    midi = _recent.get(os.path.abspath(output_file))
+    if midi is not None:
+        try:
+            stamp = _stamp(os.stat(output_file))
+        except FileNotFoundError:
+            return None
+        if midi._stamp == stamp and midi.index.variant == variant:
+            midi.fsync = fsync
+            return _remember(midi)
+
+    index = read_bar_index(output_file)
+    if index is None or index.variant != variant:
+        return None
+    return _remember(
+        IncrementalMidiFile(
+            output_file,
+            index,
+            tempo,
+            time_signature,
+            resolved,
+            _stamp(os.stat(output_file)),
+            fsync,
+        )
+    )
+
+
+def patch_midi_file(
+    output_file: str,
+    chord_sequence: Sequence[Any],
+    tempo: int = 60,
+    time_signature: TimeSignature = TimeSignature(4, 4),
+    rhythm: Optional[Rhythm | str] = None,
+    durations: Optional[Sequence[float]] = None,
+    fsync: bool = False,
+) -> PatchResult:
+    """Update output_file to the render of chord_sequence, encoding only what changed.
+
+    The file is rendered in full when open_incremental can't open it with
+    these settings, see IncrementalMidiFile.update otherwise.
+    """
+    resolved = _resolve_rhythm(rhythm, durations)
+    midi = open_incremental(output_file, tempo, time_signature, resolved, fsync)
+    if midi is None:
+        midi = render_incremental(
+            output_file,
+            chord_sequence,
+            tempo,
+            time_signature,
+            resolved,
+            durations,
+            fsync,
+        )
+        return PatchResult(len(midi), len(midi), False)
+    return midi.update(chord_sequence, durations)
@@ -0,0 +1,238 @@
+"""Scales and diatonic chords for every tonic and mode, computed from intervals.
+
+All scales are precomputed once at import time into flat tuples indexed by
+key x degree, so looking up a chord is a single tuple index. The Enum based
+DiatonicTriads mappings used by the rest of the package are built lazily on
+top of those tables.
+"""
+
+from collections import OrderedDict
+from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+MODE_INTERVALS = OrderedDict(
+    [
+        ("major", (2, 2, 1, 2, 2, 2, 1)),
+        ("dorian", (2, 1, 2, 2, 2, 1, 2)),
+        ("phrygian", (1, 2, 2, 2, 1, 2, 2)),
+        ("lydian", (2, 2, 2, 1, 2, 2, 1)),
+        ("mixolydian", (2, 2, 1, 2, 2, 1, 2)),
+        ("minor", (2, 1, 2, 2, 1, 2, 2)),
+        ("locrian", (1, 2, 2, 1, 2, 2, 2)),
+        ("harmonic_minor", (2, 1, 2, 2, 1, 3, 1)),
+        ("melodic_minor", (2, 1, 2, 2, 2, 2, 1)),
+    ]
+)
+MODES = tuple(MODE_INTERVALS)
+MODE_ALIASES = {"ionian": "major", "aeolian": "minor", "m": "minor"}
+
+NUMERALS = ("I", "II", "III", "IV", "V", "VI", "VII", "VIII")
+NUMERAL_DEGREES = {numeral: degree for degree, numeral in enumerate(NUMERALS)}
+
+LETTERS = "CDEFGAB"
+LETTER_PITCH_CLASSES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+ACCIDENTALS = {"": 0, "#": 1, "b": -1, "##": 2, "bb": -2}
+ACCIDENTAL_SYMBOLS = {offset: symbol for symbol, offset in ACCIDENTALS.items()}
+ACCIDENTAL_NAMES = {
+    0: "",
+    1: "_SHARP",
+    -1: "_FLAT",
+    2: "_DOUBLE_SHARP",
+    -2: "_DOUBLE_FLAT",
+}
+TONICS = ("C", "Db", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B")
+
+# The tonic of every scale is placed in octave 4 (C4 = 60), and each scale
+# spans two octaves like the original hand-written key modules.
+BASE_NOTE = 60
+SCALE_LENGTH = 14
+DEGREES = len(NUMERALS)
+KEY_COUNT = 12 * len(MODES)
+
+
+def _build_scales() -> Tuple[int, ...]:
+    scales = []
+    for intervals in MODE_INTERVALS.values():
+        for pitch_class in range(12):
+            note = BASE_NOTE + pitch_class
+            for i in range(SCALE_LENGTH):
+                scales.append(note)
+                note += intervals[i % len(intervals)]
+    return tuple(scales)
+
+
+def _build_chords(scales: Tuple[int, ...], size: int) -> Tuple[Tuple[int, ...], ...]:
+    chords = []
+    for key in range(KEY_COUNT):
+        scale = scales[key * SCALE_LENGTH : (key + 1) * SCALE_LENGTH]
+        for degree in range(DEGREES):
+            chords.append(tuple(scale[degree + 2 * i] for i in range(size)))
+    return tuple(chords)
+
+
+# Flat lookup tables: SCALES[key * SCALE_LENGTH + i], TRIADS[key * DEGREES + degree]
+SCALES = _build_scales()
+TRIADS = _build_chords(SCALES, 3)
+SEVENTHS = _build_chords(SCALES, 4)
+
+
+def _parse_tonic(name: str) -> Tuple[str, int]:
+    """Return the letter and accidental offset of a tonic such as "F#" or "Bb"."""
+    letter, accidental = name[:1].upper(), name[1:]
+    if letter not in LETTER_PITCH_CLASSES or accidental not in ACCIDENTALS:
+        raise ValueError(f"Invalid tonic '{name}'. Available tonics: {list(TONICS)}")
+    return letter, ACCIDENTALS[accidental]
+
+
+def _split_key(key: str) -> Tuple[str, str]:
+    """Split a key such as "C", "F#m", "A minor" or "D dorian" into tonic and mode."""
+    tonic, _, mode = key.strip().partition(" ")
+    if not mode:
+        tonic_length = 2 if tonic[1:2] in ("#", "b") else 1
+        if tonic[tonic_length : tonic_length + 1] in ("#", "b"):
+            tonic_length += 1
+        tonic, mode = tonic[:tonic_length], tonic[tonic_length:]
+
+    mode = mode.strip().lower().replace(" ", "_") or "major"
+    mode = MODE_ALIASES.get(mode, mode)
+    if mode not in MODE_INTERVALS:
+        raise ValueError(f"Invalid mode '{mode}'. Available modes: {list(MODES)}")
+    return tonic, mode
+
+
+def key_spelling(key: str) -> Tuple[str, int, str]:
+    """Return the tonic letter, accidental offset and mode of key.
+
+    Spellings of the same key such as " c", "C" and "C ionian" all return
+    ("C", 0, "major"), so tables cached on it are built once per key.
+    """
+    tonic, mode = _split_key(key)
+    letter, accidental = _parse_tonic(tonic)
+    return letter, accidental, mode
+
+
+def _row(letter: str, accidental: int, mode: str) -> int:
+    return MODES.index(mode) * 12 + (LETTER_PITCH_CLASSES[letter] + accidental) % 12
+
+
+# Keys often come straight from requests, so the raw strings are only cached
+# in a bounded LRU, the tables themselves are cached by key_spelling.
+@lru_cache(maxsize=1024)
+def key_index(key: str) -> int:
+    """Return the row of key in the lookup tables."""
+    return _row(*key_spelling(key))
+
+
+def key_name(index: int) -> str:
+    """Return a key name for a row of the lookup tables, e.g. "Eb", "F#m" or "D dorian"."""
+    mode, pitch_class = divmod(index, 12)
+    tonic = TONICS[pitch_class]
+    if MODES[mode] == "major":
+        return tonic
+    if MODES[mode] == "minor":
+        return f"{tonic}m"
+    return f"{tonic} {MODES[mode].replace('_', ' ')}"
+
+
+def scale_notes(key: str) -> Tuple[int, ...]:
+    """Return the MIDI note numbers of the two octave scale for key."""
+    index = key_index(key) * SCALE_LENGTH
+    return SCALES[index : index + SCALE_LENGTH]
+
+
+def triad_notes(key: str, numeral: str) -> Tuple[int, ...]:
+    """Return the MIDI note numbers of the diatonic triad for numeral in key."""
+    return TRIADS[key_index(key) * DEGREES + NUMERAL_DEGREES[numeral.upper()]]
+
+
+def seventh_notes(key: str, numeral: str) -> Tuple[int, ...]:
+    """Return the MIDI note numbers of the diatonic seventh for numeral in key."""
+    return SEVENTHS[key_index(key) * DEGREES + NUMERAL_DEGREES[numeral.upper()]]
+
+
+def _spell_scale(letter: str, index: int) -> Tuple[str, ...]:
+    """Name each note of a scale, giving every degree its own letter."""
+    names = []
+    start = LETTERS.index(letter)
+    for i, note in enumerate(SCALES[index * SCALE_LENGTH : (index + 1) * SCALE_LENGTH]):
+        note_letter = LETTERS[(start + i) % 7]
+        offset = (note - LETTER_PITCH_CLASSES[note_letter]) % 12
+        offset = offset - 12 if offset > 6 else offset
+        if offset not in ACCIDENTAL_NAMES:
+            raise ValueError(f"Cannot spell note {note} with letter {note_letter}")
+
+        octave = (note - offset - LETTER_PITCH_CLASSES[note_letter]) // 12 - 1
+        if offset:
+            names.append(f"{note_letter}{ACCIDENTAL_NAMES[offset]}_{octave}")
+        else:
+            names.append(f"{note_letter}{octave}")
+    return tuple(names)
+
+
+class ScaleNote(Enum):
+    """Base class of the generated per-key scale enums such as CMajorScale."""
+
+    def __reduce_ex__(self, protocol):
+        return _scale_note, (self.__class__._key, self.name)  # type: ignore[attr-defined]
+
+
+def _scale_note(key: str, name: str) -> ScaleNote:
+    return scale_enum(key)[name]
+
+
+def scale_enum(key: str) -> type[ScaleNote]:
+    """Return the Enum of named scale notes for key, e.g. CMajorScale.C4."""
+    return _scale_enum(*key_spelling(key))
+
+
+@lru_cache(maxsize=None)
+def _scale_enum(letter: str, accidental: int, mode: str) -> type[ScaleNote]:
+    index = _row(letter, accidental, mode)
+    names = _spell_scale(letter, index)
+
+    tonic_name = letter + {1: "Sharp", -1: "Flat"}.get(accidental, "")
+    mode_name = "".join(part.capitalize() for part in mode.split("_"))
+    scale: Any = ScaleNote(  # type: ignore[call-arg]
+        f"{tonic_name}{mode_name}Scale",
+        list(zip(names, SCALES[index * SCALE_LENGTH : (index + 1) * SCALE_LENGTH])),
+        module=__name__,
+    )
+    scale._key = f"{letter}{ACCIDENTAL_SYMBOLS[accidental]} {mode}"
+    return scale
+
+
+def _chord_mapping(
+    spelling: Tuple[str, int, str], table: Tuple[Tuple[int, ...], ...]
+) -> Mapping[str, tuple]:
+    scale = _scale_enum(*spelling)
+    index = _row(*spelling)
+    members: Dict[int, ScaleNote] = {member.value: member for member in scale}
+    return MappingProxyType(
+        OrderedDict(
+            (numeral, tuple(members[note] for note in table[index * DEGREES + degree]))
+            for degree, numeral in enumerate(NUMERALS)
+        )
+    )
+
+
+def diatonic_triads(key: str) -> Mapping[str, tuple]:
+    """Return the DiatonicTriads mapping (numeral -> tuple of scale notes) for key."""
+    return _diatonic_triads(key_spelling(key))
+
+
+def diatonic_sevenths(key: str) -> Mapping[str, tuple]:
+    """Return the diatonic seventh chords (numeral -> tuple of scale notes) for key."""
+    return _diatonic_sevenths(key_spelling(key))
+
+
+# Cached by spelling, which has a few hundred values at most, like _scale_enum
+@lru_cache(maxsize=None)
+def _diatonic_triads(spelling: Tuple[str, int, str]) -> Mapping[str, tuple]:
+    return _chord_mapping(spelling, TRIADS)
+
+
+@lru_cache(maxsize=None)
+def _diatonic_sevenths(spelling: Tuple[str, int, str]) -> Mapping[str, tuple]:
+    return _chord_mapping(spelling, SEVENTHS)
@@ -1,14 +1,121 @@
-from simplejam.midi.keys import C_major
-from simplejam.midi.keys import D_major
-from simplejam.schemas import KeyChordProgression
-from typing import Any, List
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from simplejam.instrumentation import instruments
+from simplejam.midi.keys.scales import diatonic_triads
+from simplejam.midi.logic.numerals import numeral_chord
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from simplejam.schemas import KeyChordProgression
+
+ProgressionKey = Tuple[str, Tuple[str, ...]]
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class ProgressionCache:
+    """Bounded LRU cache of resolved progressions.
+
+    Keys come from KeyChordProgression.cache_key(), values are the tuples of
+    chords the progression resolves to.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[ProgressionKey, Tuple[Any, ...]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: ProgressionKey) -> Optional[Tuple[Any, ...]]:
+        """Return the cached chords for key, or None on a miss."""
+        with self._lock:
+            chords = self._entries.get(key)
+            if chords is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return chords
+
+    def put(self, key: ProgressionKey, chords: Tuple[Any, ...]) -> None:
+        """Store chords for key, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = chords
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        """Return the hit/miss/eviction counters, to help size the cache."""
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.evictions, len(self._entries), self.maxsize
+            )
+
+
+# Shared by default, the traffic is dominated by a few dozen popular progressions.
+progression_cache = ProgressionCache()
+
+
+# Keys come from requests, so raw key strings are only cached in a bounded
+# LRU. The mappings themselves are shared, see scales.diatonic_triads.
+_key_triads = lru_cache(maxsize=1024)(diatonic_triads)
+
+
+def resolve_progression(
+    key: str, number_chord_sequence: Tuple[str, ...]
+) -> Tuple[Any, ...]:
+    """Resolve numerals in key to a tuple of chords.
+
+    Upper-cased plain numerals give DiatonicTriads chords, numerals with a
+    quality such as "V7" or "bVII" give Chords, see logic.numerals.
+    """
+    try:
+        key_triads = _key_triads(key)
+    except ValueError as e:
+        raise ValueError(f"Key '{key}' is not supported. {e}")
+    chords = []
+    for numeral in number_chord_sequence:
+        chord: Any = key_triads.get(numeral)
+        if chord is None:
+            # Cached in numeral_chord, a bounded LRU
+            try:
+                chord = numeral_chord(key, numeral)
+            except ValueError:
+                raise ValueError(f"Invalid chord numeral '{numeral}' for key '{key}'")
+        chords.append(chord)
+    return tuple(chords)
 
 
 def generate_number_chord_sequence(
-    progressions: list[KeyChordProgression],
+    progressions: list["KeyChordProgression"],
+    cache: Optional[ProgressionCache] = progression_cache,
 ) -> List[Any]:
     """Generate sequences of chords for a list of KeyChordProgression objects.
 
+    Any tonic and mode understood by simplejam.midi.keys.scales is supported,
+    e.g. "C", "F#", "Bb", "Am" or "D dorian". Resolved progressions are kept
+    in cache (pass None to disable it).
+
     Example input:
 
     generate_number_chord_sequence([
@@ -26,28 +133,20 @@ def generate_number_chord_sequence(
             D_major.DiatonicTriads.I,
         ]
     """
-    key_modes = {
-        "C": C_major.DiatonicTriads,
-        "D": D_major.DiatonicTriads,
-    }
-
-    results = []
+    timed = instruments.enabled
+    if timed:
+        start = time.perf_counter()
+    results: List[Any] = []
     for progression in progressions:
-        key = progression.key
-        number_chord_sequence = tuple(
-            n.upper() for n in progression.number_chord_sequence
-        )
-        if key not in key_modes:
-            raise ValueError(
-                f"Key '{key}' is not supported. Available keys: {list(key_modes.keys())}"
-            )
-        key_chords = key_modes[key]
-        chords = []
-        for numeral in number_chord_sequence:
-            try:
-                chord = key_chords[numeral]
-                chords.append(chord)
-            except AttributeError:
-                raise ValueError(f"Invalid chord numeral '{numeral}' for key '{key}'")
+        cache_key = progression.cache_key()
+        chords = cache.get(cache_key) if cache is not None else None
+        if chords is None:
+            chords = resolve_progression(*cache_key)
+            if cache is not None:
+                cache.put(cache_key, chords)
         results.extend(chords)
+    if timed:
+        instruments.record("generate_chord_sequence", time.perf_counter() - start)
+        instruments.count("progressions", len(progressions))
+        instruments.count("chords", len(results))
     return results
@@ -0,0 +1,213 @@
+"""Endless random progressions from a Markov chain over scale degrees.
+
+A MarkovGenerator walks a degree to degree transition table, either the
+built-in TRANSITIONS of common practice harmony or one learned from a corpus
+of numeral sequences. Each row is turned into an alias table once, so every
+chord costs one draw of the random number generator whatever the number of
+degrees. The generators are lazy and endless: slice them with
+itertools.islice or stream them straight into
+stream_midi_file_from_chord_sequence, nothing is kept in memory.
+"""
+
+import random
+from collections import Counter
+from itertools import islice
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from simplejam.midi.chord import Chord, triads
+from simplejam.midi.keys.scales import NUMERALS
+
+# numeral -> {next numeral: weight}, the usual moves of major key harmony
+TRANSITIONS: Mapping[str, Mapping[str, float]] = {
+    "I": {"I": 1, "II": 2, "III": 1, "IV": 4, "V": 4, "VI": 3},
+    "II": {"V": 6, "VII": 2, "IV": 1},
+    "III": {"VI": 4, "IV": 2, "II": 1},
+    "IV": {"V": 4, "I": 3, "II": 2, "VII": 1},
+    "V": {"I": 6, "VI": 2, "IV": 1},
+    "VI": {"II": 3, "IV": 4, "V": 1},
+    "VII": {"I": 4, "III": 1},
+}
+
+# The degrees a chain moves between, VIII being I an octave up
+DEGREES = NUMERALS[:-1]
+
+Seed = Optional[int | random.Random]
+
+
+def alias_table(weights: Sequence[float]) -> Tuple[Tuple[float, ...], Tuple[int, ...]]:
+    """Return the (probabilities, aliases) tables of Vose's alias method.
+
+    To draw index i with probability weights[i] / sum(weights), pick a column
+    j uniformly, then keep j with probability probabilities[j], otherwise
+    take aliases[j].
+    """
+    total = float(sum(weights))
+    if not weights or total <= 0 or min(weights) < 0:
+        raise ValueError("weights must be non-negative with a positive sum.")
+    size = len(weights)
+    scaled = [weight * size / total for weight in weights]
+    probabilities = [1.0] * size
+    aliases = list(range(size))
+    small = [i for i, p in enumerate(scaled) if p < 1]
+    large = [i for i, p in enumerate(scaled) if p >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probabilities[less] = scaled[less]
+        aliases[less] = more
+        scaled[more] -= 1 - scaled[less]
+        (small if scaled[more] < 1 else large).append(more)
+    # What is left is 1 up to rounding errors
+    return tuple(probabilities), tuple(aliases)
+
+
+def _numeral(numeral: str) -> str:
+    upper = numeral.upper()
+    if upper not in DEGREES:
+        raise ValueError(
+            f"Invalid chord numeral '{numeral}'. Available numerals: {list(DEGREES)}"
+        )
+    return upper
+
+
+class MarkovGenerator:
+    """Random walks over scale degrees following a transition table.
+
+    transitions maps each numeral to the weights of the numerals that may
+    follow it. Numerals are case insensitive, weights need not sum to 1.
+    Every numeral reachable from another must have transitions of its own.
+    """
+
+    def __init__(
+        self, transitions: Mapping[str, Mapping[str, float]] = TRANSITIONS
+    ) -> None:
+        rows: Dict[str, Dict[str, float]] = {}
+        for numeral, row in transitions.items():
+            weights: Dict[str, float] = {}
+            for target, weight in row.items():
+                target = _numeral(target)
+                weights[target] = weights.get(target, 0) + weight
+            rows[_numeral(numeral)] = weights
+        for numeral, row in rows.items():
+            if sum(row.values()) <= 0 or min(row.values(), default=0) < 0:
+                raise ValueError(
+                    f"Transitions of numeral '{numeral}' must be non-negative "
+                    "with a positive sum."
+                )
+            for target in row:
+                if target not in rows:
+                    raise ValueError(f"Numeral '{target}' has no transitions.")
+
+        total = {numeral: sum(row.values()) for numeral, row in rows.items()}
+        # numeral -> {next numeral: probability}
+        self.transitions: Dict[str, Dict[str, float]] = {
+            numeral: {target: weight / total[numeral] for target, weight in row.items()}
+            for numeral, row in rows.items()
+        }
+
+        # Walks run on state indices, each row holding its column count and
+        # the states of its columns and their aliases.
+        self._states: Tuple[str, ...] = tuple(rows)
+        index = {numeral: i for i, numeral in enumerate(self._states)}
+        self._tables: List[
+            Tuple[int, Tuple[float, ...], Tuple[int, ...], Tuple[int, ...]]
+        ] = []
+        for numeral in self._states:
+            targets = list(rows[numeral])
+            probabilities, aliases = alias_table([rows[numeral][t] for t in targets])
+            columns = tuple(index[target] for target in targets)
+            self._tables.append(
+                (
+                    len(targets),
+                    probabilities,
+                    columns,
+                    tuple(columns[alias] for alias in aliases),
+                )
+            )
+
+    @classmethod
+    def from_corpus(
+        cls, sequences: Iterable[Sequence[str]], smoothing: float = 0.0
+    ) -> "MarkovGenerator":
+        """Learn the transitions from numeral sequences.
+
+        Sequences are progressions played in a loop, so the last numeral of
+        each leads back to its first. smoothing is added to the count of
+        every move between numerals seen in the corpus.
+        """
+        counts: Counter = Counter()
+        seen = set()
+        for sequence in sequences:
+            numerals = [_numeral(numeral) for numeral in sequence]
+            seen.update(numerals)
+            counts.update(zip(numerals, numerals[1:] + numerals[:1]))
+        if not counts:
+            raise ValueError("The corpus has no numerals.")
+        return cls(
+            {
+                numeral: {
+                    target: counts[numeral, target] + smoothing
+                    for target in DEGREES
+                    if target in seen and counts[numeral, target] + smoothing > 0
+                }
+                for numeral in DEGREES
+                if numeral in seen
+            }
+        )
+
+    def _walk(self, start: str, seed: Seed) -> Iterator[int]:
+        """Return the walk of state indices from start, checking start now."""
+        start = _numeral(start)
+        if start not in self.transitions:
+            raise ValueError(f"Numeral '{start}' has no transitions.")
+        rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+        return self._steps(self._states.index(start), rng.random)
+
+    def _steps(self, state: int, draw: Callable[[], float]) -> Iterator[int]:
+        tables = self._tables
+        while True:
+            yield state
+            size, probabilities, columns, aliases = tables[state]
+            # One uniform draw: its integer part picks the column, the
+            # fraction decides between the column and its alias.
+            u = draw() * size
+            column = int(u)
+            state = (
+                columns[column]
+                if u - column < probabilities[column]
+                else aliases[column]
+            )
+
+    def numerals(
+        self, start: str = "I", seed: Seed = None, length: Optional[int] = None
+    ) -> Iterator[str]:
+        """Yield numerals from start on, endlessly or length of them.
+
+        seed is an int or a random.Random, the same seed gives the same walk.
+        """
+        states = self._states
+        return islice((states[state] for state in self._walk(start, seed)), length)
+
+    def chords(
+        self,
+        key: str = "C",
+        start: str = "I",
+        seed: Seed = None,
+        length: Optional[int] = None,
+    ) -> Iterator[Chord]:
+        """Yield the diatonic triads of key along a walk, see numerals.
+
+        The Chords go straight into stream_midi_file_from_chord_sequence.
+        """
+        key_chords = triads(key)
+        chords = tuple(key_chords[numeral] for numeral in self._states)
+        return islice((chords[state] for state in self._walk(start, seed)), length)
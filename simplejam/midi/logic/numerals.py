@@ -0,0 +1,184 @@
+"""Roman numerals with chord qualities: sevenths, extensions, sus and borrowing.
+
+A numeral is an optional accidental, a roman numeral and an optional quality:
+
+    V7, ii9, IV13   thirds stacked in the key's scale, as many as the number
+                    says (7: four notes, 9: five, 11: six, 13: seven)
+    Vsus4, viio7    a quality from QUALITIES, or one of its QUALITY_ALIASES,
+    IVm, Imaj7      built on the scale degree
+    bVII, bIII7     a borrowed chord: the root is the degree of the parallel
+    #ivo7           major scale moved by the accidental. Upper case numerals
+                    are major (7, 9... dominant), lower case ones minor.
+
+Without an accidental the case of the numeral is ignored, so plain numerals
+resolve to the diatonic triads as they always have.
+
+Every quality compiles to an interval bitmask, bit i set for the note i
+semitones above the root. Numerals are parsed once and the notes of each
+(key, numeral) pair are cached, so resolving "ii9" costs the same dict
+lookup as resolving a triad.
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, Mapping, NamedTuple, Optional, Tuple
+
+from simplejam.midi.chord import Chord
+from simplejam.midi.keys.scales import (
+    NUMERAL_DEGREES,
+    SCALE_LENGTH,
+    SCALES,
+    key_index,
+)
+
+# quality -> semitones above the root
+QUALITIES: Mapping[str, Tuple[int, ...]] = {
+    "maj": (0, 4, 7),
+    "m": (0, 3, 7),
+    "dim": (0, 3, 6),
+    "aug": (0, 4, 8),
+    "sus2": (0, 2, 7),
+    "sus4": (0, 5, 7),
+    "6": (0, 4, 7, 9),
+    "m6": (0, 3, 7, 9),
+    "maj7": (0, 4, 7, 11),
+    "dom7": (0, 4, 7, 10),
+    "m7": (0, 3, 7, 10),
+    "mmaj7": (0, 3, 7, 11),
+    "m7b5": (0, 3, 6, 10),
+    "dim7": (0, 3, 6, 9),
+    "7sus4": (0, 5, 7, 10),
+    "add9": (0, 4, 7, 14),
+    "madd9": (0, 3, 7, 14),
+    "maj9": (0, 4, 7, 11, 14),
+    "dom9": (0, 4, 7, 10, 14),
+    "m9": (0, 3, 7, 10, 14),
+}
+
+QUALITY_ALIASES: Mapping[str, str] = {
+    "M": "maj",
+    "min": "m",
+    "-": "m",
+    "o": "dim",
+    "°": "dim",
+    "+": "aug",
+    "sus": "sus4",
+    "M7": "maj7",
+    "Δ": "maj7",
+    "Δ7": "maj7",
+    "min7": "m7",
+    "-7": "m7",
+    "mM7": "mmaj7",
+    "ø": "m7b5",
+    "ø7": "m7b5",
+    "o7": "dim7",
+    "°7": "dim7",
+    "M9": "maj9",
+    "min9": "m9",
+}
+
+# Stacked thirds: quality -> number of notes
+STACKS: Mapping[str, int] = {"": 3, "7": 4, "9": 5, "11": 6, "13": 7}
+
+# Stacked thirds of borrowed chords, dominant for upper case numerals
+MAJOR_STACK = (0, 4, 7, 10, 14, 17, 21)
+MINOR_STACK = (0, 3, 7, 10, 14, 17, 21)
+
+# Degrees of the parallel major scale, in semitones above the tonic
+MAJOR_DEGREES = (0, 2, 4, 5, 7, 9, 11, 12)
+
+NUMERAL_ACCIDENTALS = {"": 0, "b": -1, "#": 1, "♭": -1, "♯": 1}
+
+_NUMERAL_RE = re.compile(r"([b#♭♯]?)([IV]+|[iv]+)(.*)")
+
+
+class Numeral(NamedTuple):
+    """A parsed numeral, see parse_numeral."""
+
+    degree: int
+    # Semitones from the parallel major degree, None for the key's own degree
+    accidental: Optional[int]
+    # Intervals above the root, 0 to stack the key's thirds instead
+    mask: int
+    # Notes of the stack of thirds, 0 when mask is set
+    thirds: int
+
+
+def interval_mask(intervals: Iterable[int]) -> int:
+    """Return the bitmask of intervals in semitones, bit i for i semitones."""
+    mask = 0
+    for interval in intervals:
+        mask |= 1 << interval
+    return mask
+
+
+def mask_intervals(mask: int) -> Tuple[int, ...]:
+    """Return the intervals set in mask, lowest first."""
+    return tuple(i for i in range(mask.bit_length()) if mask >> i & 1)
+
+
+QUALITY_MASKS: Mapping[str, int] = {
+    quality: interval_mask(intervals) for quality, intervals in QUALITIES.items()
+}
+
+
+@lru_cache(maxsize=4096)
+def parse_numeral(numeral: str) -> Numeral:
+    """Parse a numeral such as "V7", "viio7" or "bVII", raising ValueError."""
+    match = _NUMERAL_RE.fullmatch(numeral.strip())
+    if match is None or match.group(2).upper() not in NUMERAL_DEGREES:
+        raise ValueError(f"Invalid chord numeral '{numeral}'.")
+    accidental, roman, quality = match.groups()
+    degree = NUMERAL_DEGREES[roman.upper()]
+    quality = QUALITY_ALIASES.get(quality, quality)
+
+    if quality in QUALITY_MASKS:
+        offset = NUMERAL_ACCIDENTALS[accidental] if accidental else None
+        return Numeral(degree, offset, QUALITY_MASKS[quality], 0)
+    if quality not in STACKS:
+        raise ValueError(
+            f"Invalid chord quality '{quality}' in '{numeral}'. Available "
+            f"qualities: {list(STACKS)[1:] + list(QUALITIES) + list(QUALITY_ALIASES)}"
+        )
+    if not accidental:
+        return Numeral(degree, None, 0, STACKS[quality])
+    stack = MINOR_STACK if roman.islower() else MAJOR_STACK
+    return Numeral(
+        degree,
+        NUMERAL_ACCIDENTALS[accidental],
+        interval_mask(stack[: STACKS[quality]]),
+        0,
+    )
+
+
+def _scale_note(index: int, step: int) -> int:
+    """Return step of the scale of key row index, past its two octaves too."""
+    octaves, step = divmod(step, 7)
+    return SCALES[index * SCALE_LENGTH + step] + 12 * octaves
+
+
+@lru_cache(maxsize=None)
+def _stack_mask(mode: int, degree: int, thirds: int) -> int:
+    # Intervals only depend on the mode, the row of its C scale will do.
+    index = mode * 12
+    root = _scale_note(index, degree)
+    return interval_mask(
+        _scale_note(index, degree + 2 * i) - root for i in range(thirds)
+    )
+
+
+@lru_cache(maxsize=4096)
+def numeral_chord(key: str, numeral: str) -> Chord:
+    """Return the Chord of numeral in key, e.g. ("C", "V7") -> G4 B4 D5 F5.
+
+    Raises ValueError for an invalid key, numeral or quality.
+    """
+    index = key_index(key)
+    degree, accidental, mask, thirds = parse_numeral(numeral)
+    if accidental is None:
+        root = _scale_note(index, degree)
+    else:
+        root = SCALES[index * SCALE_LENGTH] + MAJOR_DEGREES[degree] + accidental
+    if thirds:
+        mask = _stack_mask(index // 12, degree, thirds)
+    return Chord([root + interval for interval in mask_intervals(mask)])
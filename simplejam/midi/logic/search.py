@@ -0,0 +1,129 @@
+"""Reverse lookup from chords to the keys and numerals that produce them.
+
+Every diatonic triad and seventh chord of every key in the scale tables is
+indexed once by its pitch-class set, a 12 bit int with bit 0 for C. A query
+then costs one dict lookup per chord plus merging the few entries found,
+instead of resolving every numeral of every key.
+"""
+
+from collections import defaultdict
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from simplejam.midi.keys.scales import (
+    DEGREES,
+    KEY_COUNT,
+    MODES,
+    NUMERALS,
+    SEVENTHS,
+    TRIADS,
+    key_name,
+)
+
+# Score of a chord that matches a diatonic chord exactly, and of a chord that
+# only contains a diatonic triad (added notes, doublings in other octaves...)
+EXACT_SCORE = 1.0
+PARTIAL_SCORE = 0.5
+
+# (key index, degree) pairs, degree 0 being the tonic
+IndexEntry = Tuple[int, int]
+
+
+class Match(NamedTuple):
+    key: str
+    numerals: Tuple[Optional[str], ...]
+    fit: float
+
+
+def pitch_class_mask(chord: Any) -> int:
+    """Return the pitch-class set of a chord as a 12 bit mask.
+
+    chord is a mask already, or an iterable of MIDI note numbers or scale
+    notes such as CMajorScale.C4.
+    """
+    if isinstance(chord, int):
+        return chord & 0xFFF
+    mask = 0
+    for note in chord:
+        mask |= 1 << ((note.value if isinstance(note, Enum) else note) % 12)
+    return mask
+
+
+def _build_index(
+    tables: Iterable[Tuple[Tuple[int, ...], ...]],
+) -> Dict[int, Tuple[IndexEntry, ...]]:
+    index: Dict[int, List[IndexEntry]] = defaultdict(list)
+    for table in tables:
+        for key in range(KEY_COUNT):
+            # VIII repeats I an octave up, it is not a separate chord
+            for degree in range(DEGREES - 1):
+                entry = (key, degree)
+                entries = index[pitch_class_mask(table[key * DEGREES + degree])]
+                if entry not in entries:
+                    entries.append(entry)
+    return {mask: tuple(sorted(entries)) for mask, entries in index.items()}
+
+
+# pitch-class mask -> keys and degrees of the diatonic chords with those notes
+CHORD_INDEX = _build_index((TRIADS, SEVENTHS))
+TRIAD_INDEX = _build_index((TRIADS,))
+TRIAD_MASKS = tuple(TRIAD_INDEX)
+
+
+@lru_cache(maxsize=4096)
+def _chord_entries(mask: int) -> Tuple[Tuple[int, int, float], ...]:
+    """Return (key, degree, score) for every key with a chord matching mask.
+
+    A key scores EXACT_SCORE when mask is one of its chords, PARTIAL_SCORE
+    when mask only contains one of its triads (the lowest degree is used).
+    """
+    matches: Dict[int, Tuple[int, float]] = {}
+    for triad_mask in TRIAD_MASKS:
+        if mask & triad_mask == triad_mask:
+            for key, degree in TRIAD_INDEX[triad_mask]:
+                if key not in matches or degree < matches[key][0]:
+                    matches[key] = (degree, PARTIAL_SCORE)
+    for key, degree in CHORD_INDEX.get(mask, ()):
+        matches[key] = (degree, EXACT_SCORE)
+    return tuple(
+        (key, degree, score) for key, (degree, score) in sorted(matches.items())
+    )
+
+
+def search_progression(chords: Iterable[Any], limit: int = 10) -> List[Match]:
+    """Return the keys whose diatonic chords best explain chords, best first.
+
+    fit is the average score over the chords: EXACT_SCORE for a diatonic
+    chord of the key, PARTIAL_SCORE for a chord containing a diatonic triad
+    and 0 otherwise. Ties prefer keys with the tonic as first or last chord,
+    then major and minor over the other modes.
+    """
+    masks = [pitch_class_mask(chord) for chord in chords]
+    if not masks:
+        return []
+
+    scores: Dict[int, float] = defaultdict(float)
+    degrees: Dict[int, List[Optional[int]]] = {}
+    for position, mask in enumerate(masks):
+        for key, degree, score in _chord_entries(mask):
+            key_degrees = degrees.get(key)
+            if key_degrees is None:
+                key_degrees = degrees[key] = [None] * len(masks)
+            key_degrees[position] = degree
+            scores[key] += score
+
+    def rank(key: int) -> Tuple[float, int, bool, int]:
+        tonic_ends = (degrees[key][0] == 0) + (degrees[key][-1] == 0)
+        other_mode = MODES[key // 12] not in ("major", "minor")
+        return (-scores[key], -tonic_ends, other_mode, key)
+
+    ranked = sorted(scores, key=rank)[:limit]
+    return [
+        Match(
+            key_name(key),
+            tuple(None if d is None else NUMERALS[d] for d in degrees[key]),
+            scores[key] / len(masks),
+        )
+        for key in ranked
+    ]
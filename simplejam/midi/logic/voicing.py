@@ -0,0 +1,127 @@
+"""Voice leading: choose inversions and octaves so chords move smoothly.
+
+The diatonic tables give every chord in root position, so a progression such
+as II-V-I jumps around the keyboard. voice_chords picks, for every chord, one
+of its closed voicings (each inversion, at each octave that fits in the note
+range) so that the total voice movement over the whole sequence is minimal.
+
+It is a Viterbi pass over the candidate voicings: for each voicing of a chord
+keep the cheapest path reaching it, then walk the back-pointers from the best
+last voicing. That is linear in the number of chords. The costs between the
+voicings of two chords are computed once per pair of chords, and songs reuse
+a handful of pairs, so each step is a few list operations.
+"""
+
+import time
+from functools import lru_cache
+from typing import Any, Iterable, List, Tuple
+
+from simplejam.instrumentation import instruments
+from simplejam.midi.chord import Chord, as_chord
+
+# Voicings are kept between C3 and C5 by default
+DEFAULT_LOW = 48
+DEFAULT_HIGH = 72
+
+
+def movement(a: Iterable[int], b: Iterable[int]) -> int:
+    """Return how far the voices move, in semitones, from chord a to chord b.
+
+    Chords of the same size move voice by voice, lowest to lowest. Otherwise
+    every note of b comes from the nearest note of a.
+    """
+    a, b = sorted(a), sorted(b)
+    if not a or not b:
+        return 0
+    if len(a) == len(b):
+        return sum(abs(x - y) for x, y in zip(a, b))
+    return sum(min(abs(x - y) for x in a) for y in b)
+
+
+@lru_cache(maxsize=4096)
+def candidate_voicings(chord: Chord, low: int, high: int) -> Tuple[Chord, ...]:
+    """Return the closed voicings of chord with every note in [low, high].
+
+    There is one note per pitch class, the bass being each note of the chord
+    in turn. A chord with no voicing in the range keeps its own notes.
+    """
+    pitch_classes = list(dict.fromkeys(note % 12 for note in chord))
+    voicings = []
+    for inversion in range(len(pitch_classes)):
+        order = pitch_classes[inversion:] + pitch_classes[:inversion]
+        bass = low + (order[0] - low) % 12
+        while bass <= high:
+            notes = [bass]
+            for pitch_class in order[1:]:
+                notes.append(notes[-1] + (pitch_class - notes[-1]) % 12)
+            if notes[-1] > high:
+                break
+            voicings.append(Chord(notes))
+            bass += 12
+    return tuple(sorted(voicings, key=lambda v: v.notes)) or (chord,)
+
+
+@lru_cache(maxsize=4096)
+def _transition_costs(
+    previous: Chord, chord: Chord, low: int, high: int
+) -> Tuple[Tuple[int, ...], ...]:
+    """Return, for each voicing of chord, its movement from each of previous."""
+    sources = candidate_voicings(previous, low, high)
+    return tuple(
+        tuple(movement(source, target) for source in sources)
+        for target in candidate_voicings(chord, low, high)
+    )
+
+
+def voice_chords(
+    chord_sequence: Iterable[Any],
+    low: int = DEFAULT_LOW,
+    high: int = DEFAULT_HIGH,
+) -> List[Chord]:
+    """Return the voicings of chord_sequence with the least total movement.
+
+    Chords are Chords or tuples of scale notes, such as the result of
+    generate_number_chord_sequence. The first chord starts from the closest
+    voicing to the chord as given. Among equally smooth paths the lower
+    voicings win.
+    """
+    if low > high:
+        raise ValueError("low must not be above high.")
+    chords = [as_chord(chord) for chord in chord_sequence]
+    if not chords:
+        return []
+
+    timed = instruments.enabled
+    if timed:
+        start = time.perf_counter()
+
+    costs = [
+        movement(voicing, chords[0])
+        for voicing in candidate_voicings(chords[0], low, high)
+    ]
+    back_pointers: List[List[int]] = []
+    for previous, chord in zip(chords, chords[1:]):
+        step_costs = []
+        step_back = []
+        for column in _transition_costs(previous, chord, low, high):
+            totals = [cost + move for cost, move in zip(costs, column)]
+            best = min(totals)
+            step_costs.append(best)
+            step_back.append(totals.index(best))
+        costs = step_costs
+        back_pointers.append(step_back)
+
+    index = costs.index(min(costs))
+    path = [index]
+    for step_back in reversed(back_pointers):
+        index = step_back[index]
+        path.append(index)
+    path.reverse()
+    voiced = [
+        candidate_voicings(chord, low, high)[index]
+        for chord, index in zip(chords, path)
+    ]
+
+    if timed:
+        instruments.record("voice_leading", time.perf_counter() - start)
+    return voiced
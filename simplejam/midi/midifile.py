@@ -1,9 +1,64 @@
 """Classes to generate MIDI files"""
 
-from typing import List, Any
-import mido
-from mido import MidiFile, MidiTrack, MetaMessage, Message
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+from functools import cached_property, partial
+import io
+import logging
 import os
+import threading
+import time
+
+from simplejam.instrumentation import instruments
+from simplejam.lazy import lazy_imports
+from simplejam.midi.atomic import atomic_output
+from simplejam.midi.cache import OutputCache, render_key
+from simplejam.midi.chord import chord_notes
+from simplejam.midi.logic.generators import generate_number_chord_sequence
+from simplejam.midi.smf import (
+    DEFAULT_TICKS_PER_BEAT,
+    END_OF_TRACK,
+    NOTE_ON,
+    Event,
+    StreamingTrackWriter,
+    TrackWriter,
+    bpm2tempo,
+    encode_file,
+    end_of_track,
+)
+from simplejam.midi.rhythm import Rhythm, chord_spans, get_rhythm, meter_ticks
+
+if TYPE_CHECKING:
+    import mido
+    from mido import MidiFile, MidiTrack, MetaMessage, Message
+
+    from simplejam.schemas import KeyChordProgression
+
+# mido is only needed by the "mido" encoder, it is imported on first use.
+_load_mido, __getattr__ = lazy_imports(
+    globals(),
+    {
+        "mido": "mido",
+        "MidiFile": "mido:MidiFile",
+        "MidiTrack": "mido:MidiTrack",
+        "MetaMessage": "mido:MetaMessage",
+        "Message": "mido:Message",
+    },
+)
+
+logger = logging.getLogger(__name__)
+
+# "mido" builds mido messages, "bytes" encodes events straight into a bytearray.
+ENCODERS = ("mido", "bytes")
 
 
 class TimeSignature:
@@ -20,22 +75,66 @@ class TimeSignature:
         return f"{self.numerator}/{self.denominator}"
 
 
+def _write_file(output_file: str, data: bytes, fsync: bool = False) -> None:
+    """Replace output_file with the encoded data of a MIDI file, atomically.
+
+    Counts the file when instrumented, see atomic_output for fsync.
+    """
+    with atomic_output(output_file, fsync) as outfile:
+        outfile.write(data)
+    if instruments.enabled:
+        instruments.count("files_written")
+        instruments.count("bytes_written", len(data))
+
+
 class SingleTrackMidiFile:
-    """Class to generate MIDI files."""
+    """Class to generate MIDI files.
+
+    output_file may be None when the file is only rendered in memory with
+    to_bytes(). save() replaces output_file atomically, with fsync the file
+    is flushed to disk first.
+    """
+
+    def __init__(
+        self, output_file: Optional[str], encoder: str = "mido", fsync: bool = False
+    ) -> None:
+        if encoder not in ENCODERS:
+            raise ValueError(f"Encoder must be one of: {', '.join(ENCODERS)}.")
 
-    def __init__(self, output_file: str) -> None:
         self.output_file = output_file
-        self.mid = MidiFile()
-        self.track = MidiTrack()
-        self.mid.tracks.append(self.track)
+        self.encoder = encoder
+        self.fsync = fsync
+        # The mido file and track, None with the bytes encoder
+        self.mid: Any = None
+        self.track: Any = None
+        self.writer: Optional[TrackWriter] = None
+        if encoder == "bytes":
+            self.writer = TrackWriter()
+            self.ticks_per_beat = DEFAULT_TICKS_PER_BEAT
+        else:
+            _load_mido()
+            self.mid = MidiFile()
+            self.track = MidiTrack()
+            self.mid.tracks.append(self.track)
+            self.ticks_per_beat = self.mid.ticks_per_beat
+        # Ticks from the last event to the end of the last chord added
+        self.rest = 0
 
     def set_tempo(self, bpm: int = 60) -> None:
         """Set the tempo for the MIDI file."""
+        if self.writer is not None:
+            self.writer.tempo(bpm2tempo(bpm))
+            return
         tempo = mido.bpm2tempo(bpm)
         self.track.append(MetaMessage("set_tempo", tempo=tempo, time=0))
 
     def set_time_signature(self, time_signature: TimeSignature) -> None:
         """Set the time signature for the MIDI file."""
+        if self.writer is not None:
+            self.writer.time_signature(
+                time_signature.numerator, time_signature.denominator
+            )
+            return
 
         self.track.append(
             MetaMessage(
@@ -46,42 +145,488 @@ class SingleTrackMidiFile:
             )
         )
 
+    def add_chord(self, notes: Sequence[int], duration: int, velocity: int = 90) -> None:
+        """Add a block chord that is held for duration ticks.
+
+        An empty chord is a rest of duration ticks.
+        """
+        rest, self.rest = self.rest, 0
+        if self.writer is not None:
+            self.rest = self.writer.chord(notes, duration, velocity, delta=rest)
+            return
+        if not notes:
+            self.rest = rest + duration
+            return
+
+        # Note on for all notes in the chord at the start of the beat
+        for note in notes:
+            time = rest if note == notes[0] else 0
+            self.track.append(
+                Message("note_on", note=note, velocity=velocity, time=time)
+            )
+        # Note off for all notes after the full beat
+        for note in notes:
+            # ensure that the time delta (the delay before the MIDI event) is
+            # only set for the first note in the chord.
+            time = duration if note == notes[0] else 0
+            self.track.append(
+                Message("note_off", note=note, velocity=velocity, time=time)
+            )
+
+    def add_rhythm(
+        self,
+        chords: Sequence[Sequence[int]],
+        rhythm: Rhythm,
+        spans: Sequence[int],
+        beat_ticks: int,
+        bar_ticks: int,
+    ) -> None:
+        """Add chords played with rhythm, each lasting its span in ticks."""
+        if self.writer is not None:
+            self.rest = rhythm.render(
+                self.writer, chords, spans, beat_ticks, bar_ticks, self.rest
+            )
+            return
+
+        tick = -self.rest
+        for event_tick, _, status, note, velocity in rhythm.events(
+            chords, spans, beat_ticks, bar_ticks
+        ):
+            message_type = "note_on" if status & 0xF0 == NOTE_ON else "note_off"
+            self.track.append(
+                Message(
+                    message_type, note=note, velocity=velocity, time=event_tick - tick
+                )
+            )
+            tick = event_tick
+        self.rest = sum(spans) - tick
+
+    def _end_mido_track(self) -> None:
+        # mido appends end_of_track on save, but only with a zero delta.
+        if self.rest:
+            self.track.append(MetaMessage("end_of_track", time=self.rest))
+            self.rest = 0
+
     def save(self) -> None:
         """Save the MIDI file."""
-        if os.path.exists(self.output_file):
-            print(f"File {self.output_file} already exists. Removing it.")
-            os.remove(self.output_file)
+        if self.output_file is None:
+            raise ValueError("save() requires an output_file, use to_bytes() instead.")
+
+        logger.info("Saving MIDI file to: %s", self.output_file)
+        with instruments.timer("save"):
+            _write_file(self.output_file, self.to_bytes(), self.fsync)
+
+    def to_bytes(self) -> bytes:
+        """Return the encoded file without touching the filesystem."""
+        if self.writer is None:
+            self._end_mido_track()
+            buffer = io.BytesIO()
+            self.mid.save(file=buffer)
+            return buffer.getvalue()
+
+        return encode_file(
+            [self.writer.data + end_of_track(self.rest)], self.ticks_per_beat
+        )
+
+
+class MultiTrackMidiFile:
+    """Class to generate type 1 MIDI files with one track per part.
+
+    The first track only holds the tempo and time signature, every part added
+    with add_track() gets its own track. Tracks are encoded straight to bytes.
+    save() replaces output_file atomically, like SingleTrackMidiFile.save().
+    """
+
+    def __init__(
+        self,
+        output_file: Optional[str],
+        ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT,
+        fsync: bool = False,
+    ) -> None:
+        self.output_file = output_file
+        self.ticks_per_beat = ticks_per_beat
+        self.fsync = fsync
+        self.tracks: List[TrackWriter] = [TrackWriter()]
+
+    def set_tempo(self, bpm: int = 60) -> None:
+        """Set the tempo for the MIDI file."""
+        self.tracks[0].tempo(bpm2tempo(bpm))
+
+    def set_time_signature(self, time_signature: TimeSignature) -> None:
+        """Set the time signature for the MIDI file."""
+        self.tracks[0].time_signature(
+            time_signature.numerator, time_signature.denominator
+        )
+
+    def add_track(
+        self, events: Iterable[Event], program: Optional[int] = None, channel: int = 0
+    ) -> TrackWriter:
+        """Add a track with events, given in absolute ticks and in tick order."""
+        track = TrackWriter()
+        if program is not None:
+            track.program_change(program, channel)
+        track.events(events)
+        self.tracks.append(track)
+        return track
+
+    def save(self) -> None:
+        """Save the MIDI file."""
+        if self.output_file is None:
+            raise ValueError("save() requires an output_file, use to_bytes() instead.")
+
+        logger.info("Saving MIDI file to: %s", self.output_file)
+        with instruments.timer("save"):
+            _write_file(self.output_file, self.to_bytes(), self.fsync)
+
+    def to_bytes(self) -> bytes:
+        """Return the encoded file without touching the filesystem."""
+        return encode_file(
+            [track.data + END_OF_TRACK for track in self.tracks], self.ticks_per_beat
+        )
+
+
+class _Render:
+    """A render of an output file in progress, see _render_once."""
+
+    def __init__(self, key: Callable[[], str]) -> None:
+        self._key = key
+        self.done = threading.Event()
+        self.ok = False
+
+    @cached_property
+    def key(self) -> str:
+        return self._key()
+
+
+# absolute output path -> the render writing it
+_renders: Dict[str, _Render] = {}
+_renders_lock = threading.Lock()
+
+
+def _render_once(output_file: str, key: Callable[[], str], render: Callable) -> None:
+    """Call render, which writes output_file, once per concurrent key.
 
-        print("Saving MIDI file to:", self.output_file)
-        self.mid.save(self.output_file)
+    While another thread renders output_file from the same key, wait for it
+    instead. A render from another key is waited for, then render runs.
+    key is only called when there is another render to compare with.
+    """
+    path = os.path.abspath(output_file)
+    mine = _Render(key)
+    while True:
+        with _renders_lock:
+            current = _renders.setdefault(path, mine)
+        if current is mine:
+            break
+        same = current.key == mine.key
+        current.done.wait()
+        if same and current.ok:
+            if instruments.enabled:
+                instruments.count("renders_coalesced")
+            return
+        # Render again when the one waited for failed or had other inputs
+
+    try:
+        render()
+        mine.ok = True
+    finally:
+        with _renders_lock:
+            del _renders[path]
+        mine.done.set()
 
 
 def generate_midi_file_from_chord_sequence(
-    output_file: str,
+    output_file: Optional[str],
     chord_sequence: List[Any],
     tempo: int = 60,
     time_signature: TimeSignature = TimeSignature(4, 4),
-) -> None:
-    """Create an example file with each chord from CModes."""
-    fg = SingleTrackMidiFile(output_file)
+    encoder: str = "mido",
+    cache: Optional[OutputCache] = None,
+    rhythm: Optional[Rhythm | str] = None,
+    durations: Optional[Sequence[float]] = None,
+    incremental: bool = False,
+    fsync: bool = False,
+) -> Optional[memoryview]:
+    """Create an example file with each chord from CModes.
+
+    Chords are simplejam.midi.chord.Chords or tuples of scale notes such as
+    C_major.DiatonicTriads["I"]. Chords are read as they are, without
+    converting each note, so they render fastest.
+
+    encoder selects how SingleTrackMidiFile serializes the events, see ENCODERS.
+    Both encoders produce byte-identical files.
+
+    By default every chord is a block chord held for four beats. With a rhythm
+    (a Rhythm or a name from RHYTHMS) or durations (beats per chord), chords
+    are played with that rhythm and last one bar of time_signature, or their
+    duration.
+
+    With a cache, a file previously rendered from the same chords, tempo and
+    time signature is linked to output_file instead of being rendered again.
+
+    When output_file is None nothing is written to disk, the encoded file is
+    returned as a memoryview instead.
+
+    With incremental, an output_file rendered incrementally before only gets
+    the bars that changed re-encoded, see simplejam.midi.incremental. It
+    can't be combined with a cache.
+
+    output_file is replaced atomically, with fsync it is flushed to disk
+    first. Incremental patches are the exception: they write the changed bars
+    in place, so readers can see a file half patched. Concurrent calls writing
+    the same output_file from the same inputs are coalesced: one renders it,
+    the others wait for that render. Calls writing it from other inputs run
+    one after the other.
+    """
+    if incremental and (output_file is None or cache is not None):
+        raise ValueError("incremental requires an output_file and no cache.")
+    if rhythm is not None or durations is not None:
+        rhythm = get_rhythm(rhythm or "block")
+    variant = ""
+    if isinstance(rhythm, Rhythm):
+        variant = f"{rhythm.cache_key()}:{durations}"
+
+    def render() -> Optional[memoryview]:
+        return _generate_midi_file(
+            output_file,
+            chord_sequence,
+            tempo,
+            time_signature,
+            encoder,
+            cache,
+            rhythm,
+            durations,
+            incremental,
+            fsync,
+            variant,
+        )
+
+    if output_file is None:
+        return render()
+    # Only computed when another call is writing output_file
+    key = partial(
+        render_key,
+        chord_sequence,
+        tempo,
+        time_signature.numerator,
+        time_signature.denominator,
+        f"{variant}:incremental" if incremental else variant,
+    )
+    _render_once(output_file, key, render)
+    return None
+
+
+def _generate_midi_file(
+    output_file: Optional[str],
+    chord_sequence: List[Any],
+    tempo: int,
+    time_signature: TimeSignature,
+    encoder: str,
+    cache: Optional[OutputCache],
+    rhythm: Optional[Rhythm | str],
+    durations: Optional[Sequence[float]],
+    incremental: bool,
+    fsync: bool,
+    variant: str,
+) -> Optional[memoryview]:
+    if incremental:
+        assert output_file is not None
+        from simplejam.midi.incremental import patch_midi_file
+
+        patch_midi_file(
+            output_file,
+            chord_sequence,
+            tempo,
+            time_signature,
+            rhythm,
+            durations,
+            fsync,
+        )
+        return None
+
+    digest = None
+    if cache is not None:
+        digest = render_key(
+            chord_sequence,
+            tempo,
+            time_signature.numerator,
+            time_signature.denominator,
+            variant,
+        )
+        if output_file is None:
+            cached = cache.read(digest)
+            if cached is not None:
+                instruments.count("cache_hits")
+                return memoryview(cached)
+        elif cache.fetch(digest, output_file):
+            instruments.count("cache_hits")
+            return None
+
+    # Checked once, a timer per stage would cost more than small renders.
+    timed = instruments.enabled
+    if timed:
+        start = time.perf_counter()
+
+    fg = SingleTrackMidiFile(output_file, encoder=encoder, fsync=fsync)
     fg.set_tempo(tempo)
     fg.set_time_signature(time_signature)
-    mid = fg.mid
-    track = mid.tracks[0]
-    ticks_per_beat = mid.ticks_per_beat * 4
 
-    for chord in chord_sequence:
-        # Convert the scale enum entry to the mapped value
-        chord_notes = [note.value for note in chord]
+    if isinstance(rhythm, Rhythm):
+        chords = [chord_notes(chord) for chord in chord_sequence]
+        beat_ticks, bar_ticks = meter_ticks(
+            time_signature.numerator,
+            time_signature.denominator,
+            fg.ticks_per_beat,
+        )
+        spans = chord_spans(len(chords), bar_ticks, beat_ticks, durations)
+        fg.add_rhythm(chords, rhythm, spans, beat_ticks, bar_ticks)
+    else:
+        ticks_per_beat = fg.ticks_per_beat * 4
+        for chord in chord_sequence:
+            fg.add_chord(chord_notes(chord), ticks_per_beat)
 
-        # Note on for all notes in the chord at the start of the beat
-        for note in chord_notes:
-            track.append(Message("note_on", note=note, velocity=90, time=0))
-        # Note off for all notes after the full beat
-        for note in chord_notes:
-            # ensure that the time delta (the delay before the MIDI event) is
-            # only set for the first note in the chord.
-            time = ticks_per_beat if note == chord_notes[0] else 0
-            track.append(Message("note_off", note=note, velocity=90, time=time))
+    if timed:
+        instruments.record("build_events", time.perf_counter() - start)
+        if isinstance(rhythm, Rhythm):
+            events = rhythm.event_count(chords, spans, beat_ticks, bar_ticks)
+        else:
+            events = 2 * sum(len(chord) for chord in chord_sequence)
+        instruments.count("events", events)
+
+    if output_file is None:
+        if timed:
+            start = time.perf_counter()
+        data = fg.to_bytes()
+        if timed:
+            instruments.record("encode", time.perf_counter() - start)
+        if cache is not None and digest is not None:
+            cache.store_bytes(digest, data)
+        return memoryview(data)
 
     fg.save()
+    if cache is not None and digest is not None:
+        cache.store(digest, output_file)
+    return None
+
+
+def stream_midi_file_from_chord_sequence(
+    output_file: str,
+    chord_sequence: Iterable[Any],
+    tempo: int = 60,
+    time_signature: TimeSignature = TimeSignature(4, 4),
+    flush_bytes: int = 64 * 1024,
+) -> None:
+    """Write the same file as generate_midi_file_from_chord_sequence, streaming.
+
+    chord_sequence can be any iterator or generator, chords are consumed one
+    at a time and written out every flush_bytes, so memory use does not grow
+    with the length of the output. The file replaces output_file once it is
+    complete.
+    """
+    logger.info("Streaming MIDI file to: %s", output_file)
+    with atomic_output(output_file) as outfile:
+        writer = StreamingTrackWriter(outfile, flush_bytes=flush_bytes)
+        writer.tempo(bpm2tempo(tempo))
+        writer.time_signature(time_signature.numerator, time_signature.denominator)
+        ticks_per_beat = DEFAULT_TICKS_PER_BEAT * 4
+
+        rest = 0
+        for chord in chord_sequence:
+            rest = writer.chord(chord_notes(chord), ticks_per_beat, delta=rest)
+            writer.flush_if_full()
+        writer.close(rest)
+
+
+class BatchJob(NamedTuple):
+    """One file to render with generate_midi_files_batch.
+
+    With output_file None the file is rendered in memory and returned in
+    BatchJobResult.data.
+    """
+
+    output_file: Optional[str]
+    progressions: List["KeyChordProgression"]
+    tempo: int = 60
+    time_signature: TimeSignature = TimeSignature(4, 4)
+
+
+class BatchJobResult(NamedTuple):
+    """Outcome of a single BatchJob."""
+
+    output_file: Optional[str]
+    elapsed: float
+    error: Optional[str] = None
+    data: Optional[bytes] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _render_batch_job(job: BatchJob, encoder: str) -> BatchJobResult:
+    """Render one job, reporting any failure instead of raising it."""
+    output_file, progressions, tempo, time_signature = job
+    start = time.perf_counter()
+    try:
+        chord_sequence = generate_number_chord_sequence(progressions)
+        data = generate_midi_file_from_chord_sequence(
+            output_file,
+            chord_sequence,
+            tempo=tempo,
+            time_signature=time_signature,
+            encoder=encoder,
+        )
+    except Exception as e:
+        return BatchJobResult(
+            output_file, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+        )
+    return BatchJobResult(
+        output_file,
+        time.perf_counter() - start,
+        data=None if data is None else bytes(data),
+    )
+
+
+def _render_batch_chunk(jobs: List[BatchJob], encoder: str) -> List[BatchJobResult]:
+    return [_render_batch_job(job, encoder) for job in jobs]
+
+
+def generate_midi_files_batch(
+    jobs: Sequence[BatchJob],
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    encoder: str = "bytes",
+) -> List[BatchJobResult]:
+    """Render many progressions to many files in a process pool.
+
+    Each job is a BatchJob or a plain (output_file, progressions, tempo,
+    time_signature) tuple. Jobs are sent to the workers in chunks to keep the
+    inter-process overhead low. A failing job does not abort the batch, its
+    error is reported in the matching BatchJobResult. Results are returned in
+    the same order as jobs. workers defaults to the number of CPUs.
+    """
+    if workers is not None and workers <= 0:
+        raise ValueError("workers must be positive.")
+    if chunksize is not None and chunksize <= 0:
+        raise ValueError("chunksize must be positive.")
+    jobs = [BatchJob(*job) for job in jobs]
+    if not jobs:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return _render_batch_chunk(jobs, encoder)
+
+    if chunksize is None:
+        # A few chunks per worker balances the load without paying per job IPC.
+        chunksize = max(1, len(jobs) // (workers * 4))
+    chunks = [jobs[i : i + chunksize] for i in range(0, len(jobs), chunksize)]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    results: List[BatchJobResult] = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        for chunk_results in executor.map(
+            _render_batch_chunk, chunks, [encoder] * len(chunks)
+        ):
+            results.extend(chunk_results)
+    return results
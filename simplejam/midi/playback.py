@@ -0,0 +1,314 @@
+"""Real-time MIDI playback with a persistent output and gapless queueing.
+
+Files are turned into a timeline of (seconds, message bytes) once, before they
+play. A single scheduler thread then sends every message at its due time on a
+monotonic clock: it sleeps until shortly before the deadline and spins for the
+rest, so messages go out well under a millisecond late. Queued files start
+exactly when the previous one ends, without waiting for the queue to be read.
+
+Outputs stay open between files. NullOutput sends nowhere and can record what
+it was sent, for tests and headless machines.
+"""
+
+import argparse
+import io
+import os
+import threading
+import time
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from simplejam.instrumentation import add_arguments as add_instrumentation_arguments
+from simplejam.instrumentation import instrumented_run, instruments
+from simplejam.lazy import lazy_imports
+
+if TYPE_CHECKING:
+    import mido
+
+# mido is imported once a file is loaded or a mido port opened.
+_load_mido, __getattr__ = lazy_imports(globals(), {"mido": "mido"})
+
+# Sleep until this long before an event is due, then spin.
+DEFAULT_SPIN_SECONDS = 0.002
+
+# control_change 123: all notes off
+ALL_NOTES_OFF = 123
+
+
+class Timeline(NamedTuple):
+    """Messages of a file in play order, with their time from its start."""
+
+    events: Tuple[Tuple[float, bytes], ...]
+    duration: float
+
+
+def load_timeline(source: str | bytes) -> Timeline:
+    """Return the timeline of a MIDI file, given as a path or its contents.
+
+    Tempo changes are applied, meta messages are left out.
+    """
+    _load_mido()
+    if isinstance(source, str):
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"MIDI file not found: {source}")
+        mid = mido.MidiFile(source)
+    else:
+        mid = mido.MidiFile(file=io.BytesIO(source))
+
+    events = []
+    seconds = 0.0
+    for message in mid:
+        seconds += message.time
+        if not message.is_meta:
+            events.append((seconds, bytes(message.bytes())))
+    return Timeline(tuple(events), seconds)
+
+
+class NullOutput:
+    """Output that sends nowhere. With record, sent messages are kept in sent
+    as (clock time, message bytes)."""
+
+    def __init__(
+        self, record: bool = False, clock: Callable[[], float] = time.perf_counter
+    ) -> None:
+        self.record = record
+        self.clock = clock
+        self.sent: List[Tuple[float, bytes]] = []
+        self.closed = False
+
+    def send(self, message: bytes) -> None:
+        if self.record:
+            self.sent.append((self.clock(), message))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class MidoOutput:
+    """Output to a MIDI port opened with mido, requires a mido backend."""
+
+    def __init__(self, name: Optional[str] = None) -> None:
+        _load_mido()
+        self.port = mido.open_output(name)
+
+    def send(self, message: bytes) -> None:
+        self.port.send(mido.Message.from_bytes(message))
+
+    def close(self) -> None:
+        self.port.close()
+
+
+class PygameMidiOutput:
+    """Output to a MIDI device with pygame.midi (PortMidi)."""
+
+    def __init__(self, device_id: Optional[int] = None) -> None:
+        import pygame.midi
+
+        pygame.midi.init()
+        if device_id is None:
+            device_id = pygame.midi.get_default_output_id()
+        if device_id < 0:
+            pygame.midi.quit()
+            raise RuntimeError("No MIDI output device available.")
+        self._midi = pygame.midi
+        self.output = pygame.midi.Output(device_id)
+
+    def send(self, message: bytes) -> None:
+        if message[0] == 0xF0:
+            self.output.write_sys_ex(0, list(message))
+        else:
+            self.output.write_short(*message)
+
+    def close(self) -> None:
+        self.output.close()
+        self._midi.quit()
+
+
+class PlaybackStats(NamedTuple):
+    events: int
+    files: int
+    # How late messages were sent, in seconds
+    mean_drift: float
+    max_drift: float
+
+
+class Player:
+    """Plays queued timelines on output from a background scheduler thread.
+
+    clock and sleep default to time.perf_counter and waiting on stop(), tests
+    can pass a simulated clock instead. sleep returns True if playback was
+    stopped meanwhile.
+    """
+
+    def __init__(
+        self,
+        output: Any = None,
+        spin_seconds: float = DEFAULT_SPIN_SECONDS,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Optional[Callable[[float], bool]] = None,
+    ) -> None:
+        self.output = output if output is not None else NullOutput()
+        self.spin_seconds = spin_seconds
+        self.clock = clock
+        self._queue: Deque[Timeline] = deque()
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self.sleep = sleep if sleep is not None else self._stop.wait
+        self._thread: Optional[threading.Thread] = None
+        self._playing = False
+        self._events = 0
+        self._files = 0
+        self._total_drift = 0.0
+        self._max_drift = 0.0
+
+    def enqueue(self, source: str | bytes | Timeline) -> Timeline:
+        """Queue a file to play after the ones already queued."""
+        timeline = source if isinstance(source, Timeline) else load_timeline(source)
+        with self._condition:
+            self._queue.append(timeline)
+            self._condition.notify_all()
+        self._start()
+        return timeline
+
+    def play(self, source: str | bytes | Timeline, wait: bool = True) -> None:
+        """Queue a file and, with wait, block until everything queued has played."""
+        self.enqueue(source)
+        if wait:
+            self.wait()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue is empty, return False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._queue and not self._playing, timeout
+            )
+
+    def stop(self) -> None:
+        """Stop playing, drop the queue and silence every channel."""
+        self._stop.set()
+        with self._condition:
+            self._queue.clear()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stop.clear()
+        for channel in range(16):
+            self.output.send(bytes((0xB0 | channel, ALL_NOTES_OFF, 0)))
+
+    def close(self) -> None:
+        """Stop and close the output."""
+        self.stop()
+        self.output.close()
+
+    def __enter__(self) -> "Player":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def stats(self) -> PlaybackStats:
+        mean = self._total_drift / self._events if self._events else 0.0
+        return PlaybackStats(self._events, self._files, mean, self._max_drift)
+
+    def _start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="simplejam-playback", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        next_start = 0.0
+        while not self._stop.is_set():
+            with self._condition:
+                # Checked under the lock, so stop() can't notify before we wait.
+                if self._stop.is_set():
+                    break
+                if not self._queue:
+                    self._playing = False
+                    self._condition.notify_all()
+                    self._condition.wait()
+                    continue
+                timeline = self._queue.popleft()
+                self._playing = True
+
+            # Gapless: a file queued in time starts exactly when the last ended.
+            start = max(next_start, self.clock())
+            self._play_timeline(timeline, start)
+            next_start = start + timeline.duration
+            self._files += 1
+
+        with self._condition:
+            self._playing = False
+            self._condition.notify_all()
+
+    def _play_timeline(self, timeline: Timeline, start: float) -> None:
+        send = self.output.send
+        spin = self.spin_seconds
+        clock = self.clock
+        sleep = self.sleep
+        for offset, message in timeline.events:
+            due = start + offset
+            remaining = due - clock()
+            if remaining > spin and sleep(remaining - spin):
+                return
+            while clock() < due:
+                pass
+            drift = clock() - due
+            send(message)
+            self._events += 1
+            self._total_drift += drift
+            self._max_drift = max(self._max_drift, drift)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Play MIDI files back to back")
+    parser.add_argument("files", nargs="+", help="MIDI files to play in order")
+    parser.add_argument(
+        "--output",
+        choices=("pygame", "mido", "null"),
+        default="pygame",
+        help="Where to send the MIDI messages",
+    )
+    parser.add_argument("--port", help="mido port name, or pygame device id")
+    add_instrumentation_arguments(parser)
+    return parser.parse_args()
+
+
+def open_output(kind: str, port: Optional[str] = None) -> Any:
+    """Return an output by kind, see parse_args."""
+    if kind == "null":
+        return NullOutput()
+    if kind == "mido":
+        return MidoOutput(port)
+    if kind == "pygame":
+        return PygameMidiOutput(None if port is None else int(port))
+    raise ValueError("Output must be one of: pygame, mido, null.")
+
+
+def run() -> None:
+    """Play the given files gaplessly, then print the scheduling drift."""
+    args = parse_args()
+    with instrumented_run(args.profile, args.metrics):
+        with Player(open_output(args.output, args.port)) as player:
+            for path in args.files:
+                player.enqueue(os.path.realpath(path))
+            player.wait()
+            stats = player.stats()
+        instruments.count("events", stats.events)
+        instruments.count("files_played", stats.files)
+    print(
+        f"Played {stats.files} files, {stats.events} events, "
+        f"max drift {stats.max_drift * 1000:.3f} ms"
+    )
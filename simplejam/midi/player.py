@@ -1,13 +1,32 @@
-import pygame
 import time
 import os
 import argparse
+from typing import TYPE_CHECKING
+
+from simplejam.instrumentation import add_arguments as add_instrumentation_arguments
+from simplejam.instrumentation import instrumented_run, instruments
+from simplejam.lazy import lazy_imports
+
+if TYPE_CHECKING:
+    import pygame
+
+# pygame is imported when a file is played, without printing its banner.
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+_load_pygame, __getattr__ = lazy_imports(globals(), {"pygame": "pygame"})
 
 
 def play_midi_file__pygame(filepath: str, wait_for_completion: bool = True) -> None:
     """
     Play a MIDI file using pygame mixer.
 
+    This path stays on pygame on purpose: the mixer synthesizes the audio
+    itself, so it plays on machines without a MIDI output port, which
+    simplejam.midi.playback.Player needs. The price is that the mixer is
+    started and stopped for every file, and completion is polled every
+    0.1 s, so the call can return up to 100 ms after the file ends. For
+    precise timing or files played back to back, use Player, or the
+    play_midi_files script.
+
     Args:
         filepath: Path to the MIDI file to play
         wait_for_completion: If True, wait for the file to finish playing
@@ -15,6 +34,7 @@ def play_midi_file__pygame(filepath: str, wait_for_completion: bool = True) -> N
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"MIDI file not found: {filepath}")
 
+    _load_pygame()
     # Initialize pygame mixer
     pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
 
@@ -39,6 +59,7 @@ def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="Play MIDI files using pygame")
     parser.add_argument("file_path", help="Path to the MIDI file to play")
+    add_instrumentation_arguments(parser)
     return parser.parse_args()
 
 
@@ -54,8 +75,11 @@ def run() -> None:
     if not os.path.isfile(input_file):
         raise FileNotFoundError(f"MIDI file not found: {input_file}")
 
-    try:
-        play_midi_file__pygame(input_file)
-        print(f"Finished playing: {input_file}")
-    except (FileNotFoundError, RuntimeError) as e:
-        print(f"Error: {e}")
+    with instrumented_run(args.profile, args.metrics):
+        try:
+            with instruments.timer("play"):
+                play_midi_file__pygame(input_file)
+            instruments.count("files_played")
+            print(f"Finished playing: {input_file}")
+        except (FileNotFoundError, RuntimeError) as e:
+            print(f"Error: {e}")
@@ -0,0 +1,426 @@
+"""Read and analyze existing MIDI files without building mido messages.
+
+The scanner walks the SMF bytes through a memoryview (over an mmap for files
+on disk) and only keeps note events. From those notes each file gets:
+
+- a timeline of notes (start, end, channel, note, velocity) in ticks,
+- the detected key, using the Krumhansl-Schmuckler key profiles,
+- chord segments, each mapped to the DiatonicTriads numeral of the key.
+
+Analyses are stored in a compact binary sidecar next to each file, together
+with the file size and mtime, so re-indexing a library only re-reads files
+that changed.
+"""
+
+import logging
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from simplejam.midi.atomic import atomic_output
+from simplejam.midi.keys.scales import (
+    DEGREES,
+    NUMERALS,
+    SCALE_LENGTH,
+    SCALES,
+    TONICS,
+    TRIADS,
+    key_index,
+)
+
+logger = logging.getLogger(__name__)
+
+DRUM_CHANNEL = 9
+
+SIDECAR_SUFFIX = ".sjx"
+SIDECAR_MAGIC = b"SJX1"
+_SIDECAR_HEADER = struct.Struct(">4sqqHH")
+_SIDECAR_COUNTS = struct.Struct(">II")
+_SIDECAR_NOTE = struct.Struct(">IIBBB")
+_SIDECAR_SEGMENT = struct.Struct(">IIHBb")
+
+# Krumhansl-Kessler key profiles, indexed by pitch class above the tonic.
+MAJOR_PROFILE = (6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88)
+MINOR_PROFILE = (6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17)
+
+
+class Note(NamedTuple):
+    start: int
+    end: int
+    channel: int
+    note: int
+    velocity: int
+
+
+class ChordSegment(NamedTuple):
+    """A span of time in which the same pitch classes sound.
+
+    pitch_classes is a 12 bit mask (bit 0 = C), bass the lowest sounding note
+    and numeral the matching diatonic triad of the key, if any.
+    """
+
+    start: int
+    end: int
+    pitch_classes: int
+    bass: int
+    numeral: Optional[str]
+
+
+class MidiAnalysis(NamedTuple):
+    ticks_per_beat: int
+    key: Optional[str]
+    notes: List[Note]
+    segments: List[ChordSegment]
+
+    @property
+    def numerals(self) -> List[Optional[str]]:
+        return [segment.numeral for segment in self.segments]
+
+
+def _read_variable_int(data: memoryview, pos: int) -> Tuple[int, int]:
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, pos
+
+
+def read_notes(data: bytes | memoryview | mmap.mmap) -> Tuple[int, List[Note]]:
+    """Return the ticks per beat and the notes of an SMF, sorted by start.
+
+    Only the timing of note events is kept. Notes still sounding at the end
+    of their track end there.
+    """
+    # Views are released explicitly so an mmap can be closed even while an
+    # exception raised here still references them.
+    with memoryview(data) as view:
+        if bytes(view[:4]) != b"MThd" or len(view) < 14:
+            raise ValueError("Not a MIDI file: missing MThd header.")
+        header_length, _, n_tracks, division = struct.unpack_from(">LHHH", view, 4)
+        if division & 0x8000:
+            raise ValueError("SMPTE time division is not supported.")
+
+        notes: List[Note] = []
+        pos = 8 + header_length
+        for _ in range(n_tracks):
+            if bytes(view[pos : pos + 4]) != b"MTrk" or pos + 8 > len(view):
+                raise ValueError(f"Not a MIDI file: expected MTrk at byte {pos}.")
+            (length,) = struct.unpack_from(">L", view, pos + 4)
+            pos += 8
+            with view[pos : pos + length] as track:
+                try:
+                    notes.extend(_read_track(track))
+                except IndexError:
+                    raise ValueError(f"Truncated MIDI track at byte {pos}.")
+            pos += length
+
+    notes.sort()
+    return division, notes
+
+
+def _read_track(track: memoryview) -> List[Note]:
+    notes = []
+    # (channel, note) -> stack of (start, velocity) of sounding notes
+    sounding: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    tick = 0
+    pos = 0
+    status = 0
+    end = len(track)
+    while pos < end:
+        byte = track[pos]
+        if byte < 0x80:
+            # Most deltas fit in one byte
+            tick += byte
+            pos += 1
+        else:
+            delta, pos = _read_variable_int(track, pos)
+            tick += delta
+
+        byte = track[pos]
+        if byte >= 0x80:
+            status = byte
+            pos += 1
+        elif not status:
+            raise ValueError("Running status without a previous status byte.")
+
+        if status == 0xFF:
+            pos += 1
+            length, pos = _read_variable_int(track, pos)
+            pos += length
+            status = 0
+            continue
+        if status in (0xF0, 0xF7):
+            length, pos = _read_variable_int(track, pos)
+            pos += length
+            status = 0
+            continue
+
+        kind = status & 0xF0
+        if kind in (0xC0, 0xD0):
+            pos += 1
+            continue
+
+        data1, data2 = track[pos], track[pos + 1]
+        pos += 2
+        if kind == 0x90 and data2:
+            sounding.setdefault((status & 0x0F, data1), []).append((tick, data2))
+        elif kind == 0x80 or kind == 0x90:
+            started = sounding.get((status & 0x0F, data1))
+            if started:
+                start, velocity = started.pop(0)
+                notes.append(Note(start, tick, status & 0x0F, data1, velocity))
+
+    for (channel, note), started in sounding.items():
+        for start, velocity in started:
+            notes.append(Note(start, tick, channel, note, velocity))
+    return notes
+
+
+def _mask(notes: Iterable[int]) -> int:
+    mask = 0
+    for note in notes:
+        mask |= 1 << (note % 12)
+    return mask
+
+
+def _key_masks(key: str) -> Tuple[int, List[Tuple[str, int, int]]]:
+    """Return the scale mask of key and the (numeral, mask, root) of its triads."""
+    index = key_index(key)
+    scale = SCALES[index * SCALE_LENGTH : index * SCALE_LENGTH + 7]
+    triads = []
+    for degree in range(7):
+        notes = TRIADS[index * DEGREES + degree]
+        triads.append((NUMERALS[degree], _mask(notes), notes[0] % 12))
+    return _mask(scale), triads
+
+
+def chord_segments(notes: List[Note], min_ticks: int = 0) -> List[ChordSegment]:
+    """Split the notes into spans of constant harmony.
+
+    Consecutive spans of the same pitch classes are merged. Spans shorter than
+    min_ticks, such as the onsets of a strum, are dropped. Drums are ignored.
+    The segments are not named yet, see name_segments.
+    """
+    boundaries: Dict[int, List[Tuple[int, int]]] = {}
+    for note in notes:
+        if note.channel != DRUM_CHANNEL and note.end > note.start:
+            boundaries.setdefault(note.start, []).append((note.note, 1))
+            boundaries.setdefault(note.end, []).append((note.note, -1))
+
+    segments: List[ChordSegment] = []
+    # note number -> number of notes sounding it
+    sounding: Dict[int, int] = {}
+    ticks = sorted(boundaries)
+    for tick, next_tick in zip(ticks, ticks[1:]):
+        for pitch, change in boundaries[tick]:
+            count = sounding.get(pitch, 0) + change
+            if count:
+                sounding[pitch] = count
+            else:
+                del sounding[pitch]
+        if next_tick - tick < min_ticks or not sounding:
+            continue
+
+        mask = _mask(sounding)
+        if segments and segments[-1].pitch_classes == mask:
+            segments[-1] = segments[-1]._replace(end=next_tick)
+        else:
+            segments.append(ChordSegment(tick, next_tick, mask, min(sounding), None))
+    return segments
+
+
+def detect_key(
+    notes: List[Note], segments: Sequence[ChordSegment] = ()
+) -> Optional[str]:
+    """Return the best matching major or minor key, such as "G" or "F#m".
+
+    Keys are ranked by the share of note time that is in their scale, then by
+    how many of the first and last segments hold their tonic triad, and then
+    by the Krumhansl-Schmuckler profile score. Drums are ignored.
+    """
+    weights = [0.0] * 12
+    for note in notes:
+        if note.channel != DRUM_CHANNEL:
+            weights[note.note % 12] += note.end - note.start
+    total = sum(weights)
+    if not total:
+        return None
+
+    ends = [segments[0], segments[-1]] if segments else []
+    best_key, best_score = None, None
+    for suffix, profile in (("", MAJOR_PROFILE), ("m", MINOR_PROFILE)):
+        for tonic in range(12):
+            key = f"{TONICS[tonic]}{suffix}"
+            scale_mask, triads = _key_masks(key)
+            in_scale = sum(weights[pc] for pc in range(12) if scale_mask >> pc & 1)
+            tonic_mask = triads[0][1]
+            tonic_ends = sum(
+                segment.pitch_classes & tonic_mask == tonic_mask for segment in ends
+            )
+            profile_score = sum(
+                weights[(tonic + i) % 12] * profile[i] for i in range(12)
+            )
+            score = (round(in_scale / total, 2), tonic_ends, profile_score)
+            if best_score is None or score > best_score:
+                best_key, best_score = key, score
+    return best_key
+
+
+def name_segments(
+    segments: List[ChordSegment], key: Optional[str]
+) -> List[ChordSegment]:
+    """Name each segment after the triad of key it contains, if any.
+
+    When a segment holds several triads, the one with its root in the bass
+    is preferred.
+    """
+    if key is None:
+        return segments
+
+    _, triads = _key_masks(key)
+    named = []
+    for segment in segments:
+        numeral = None
+        for name, triad_mask, root in triads:
+            if segment.pitch_classes & triad_mask == triad_mask:
+                if numeral is None or root == segment.bass % 12:
+                    numeral = name
+        named.append(segment._replace(numeral=numeral))
+    return named
+
+
+def analyze_bytes(data: bytes | memoryview | mmap.mmap) -> MidiAnalysis:
+    """Analyze the contents of a MIDI file."""
+    ticks_per_beat, notes = read_notes(data)
+    segments = chord_segments(notes, min_ticks=ticks_per_beat // 4)
+    key = detect_key(notes, segments)
+    return MidiAnalysis(ticks_per_beat, key, notes, name_segments(segments, key))
+
+
+def analyze_file(path: str) -> MidiAnalysis:
+    """Analyze a MIDI file, mapping it into memory instead of reading it."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("Not a MIDI file: empty file.")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return analyze_bytes(mapped)
+
+
+def sidecar_path(path: str) -> str:
+    return path + SIDECAR_SUFFIX
+
+
+def write_sidecar(path: str, analysis: MidiAnalysis, stat: os.stat_result) -> None:
+    """Store analysis next to path, tagged with the stat of the analyzed file."""
+    key = (analysis.key or "").encode()
+    parts = [
+        _SIDECAR_HEADER.pack(
+            SIDECAR_MAGIC,
+            stat.st_mtime_ns,
+            stat.st_size,
+            analysis.ticks_per_beat,
+            len(key),
+        ),
+        key,
+        _SIDECAR_COUNTS.pack(len(analysis.notes), len(analysis.segments)),
+    ]
+    parts.extend(_SIDECAR_NOTE.pack(*note) for note in analysis.notes)
+    numerals = {numeral: degree for degree, numeral in enumerate(NUMERALS)}
+    for segment in analysis.segments:
+        degree = -1 if segment.numeral is None else numerals[segment.numeral]
+        parts.append(_SIDECAR_SEGMENT.pack(*segment[:4], degree))
+
+    with atomic_output(sidecar_path(path)) as f:
+        f.write(b"".join(parts))
+
+
+def read_sidecar(path: str, stat: os.stat_result) -> Optional[MidiAnalysis]:
+    """Return the stored analysis of path, None if missing or out of date."""
+    try:
+        with open(sidecar_path(path), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    try:
+        magic, mtime_ns, size, ticks_per_beat, key_length = _SIDECAR_HEADER.unpack_from(
+            data
+        )
+        if magic != SIDECAR_MAGIC or (mtime_ns, size) != (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            return None
+        pos = _SIDECAR_HEADER.size
+        key = data[pos : pos + key_length].decode() or None
+        pos += key_length
+        n_notes, n_segments = _SIDECAR_COUNTS.unpack_from(data, pos)
+        pos += _SIDECAR_COUNTS.size
+
+        end = pos + n_notes * _SIDECAR_NOTE.size
+        notes = [Note(*note) for note in _SIDECAR_NOTE.iter_unpack(data[pos:end])]
+        pos, end = end, end + n_segments * _SIDECAR_SEGMENT.size
+        segments = [
+            ChordSegment(
+                start, stop, mask, bass, None if degree < 0 else NUMERALS[degree]
+            )
+            for start, stop, mask, bass, degree in _SIDECAR_SEGMENT.iter_unpack(
+                data[pos:end]
+            )
+        ]
+    except (struct.error, UnicodeDecodeError):
+        return None
+    return MidiAnalysis(ticks_per_beat, key, notes, segments)
+
+
+def index_file(path: str) -> Tuple[MidiAnalysis, bool]:
+    """Return the analysis of path and whether it came from its sidecar.
+
+    The file is only analyzed again when its size or mtime changed. When
+    the sidecar can't be written, in a read-only library for instance, the
+    failure is logged and the analysis returned all the same.
+    """
+    stat = os.stat(path)
+    analysis = read_sidecar(path, stat)
+    if analysis is not None:
+        return analysis, True
+
+    analysis = analyze_file(path)
+    try:
+        write_sidecar(path, analysis, stat)
+    except OSError as e:
+        logger.warning("Could not write the sidecar of %s: %s", path, e)
+    return analysis, False
+
+
+class LibraryIndex(NamedTuple):
+    analyses: Dict[str, MidiAnalysis]
+    analyzed: int
+    reused: int
+    errors: Dict[str, str]
+
+
+def index_directory(directory: str) -> LibraryIndex:
+    """Index every .mid/.midi file below directory, reusing valid sidecars."""
+    analyses: Dict[str, MidiAnalysis] = {}
+    errors: Dict[str, str] = {}
+    analyzed = reused = 0
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.lower().endswith((".mid", ".midi")):
+                continue
+            path = os.path.join(root, name)
+            try:
+                analysis, from_sidecar = index_file(path)
+            except (OSError, ValueError) as e:
+                errors[path] = str(e)
+                continue
+            analyses[path] = analysis
+            if from_sidecar:
+                reused += 1
+            else:
+                analyzed += 1
+    return LibraryIndex(analyses, analyzed, reused, errors)
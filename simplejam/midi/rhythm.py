@@ -0,0 +1,322 @@
+"""Rhythms: when and how the notes of each chord are played.
+
+A Rhythm is a pattern of hits, in beats of the time signature, repeated to
+fill the length of every chord. For each chord size and length the pattern is
+compiled once into a template holding the encoded events of one chord with
+placeholder note numbers. Rendering a chord copies its template onto the
+track and patches in the notes, so rhythmic patterns render about as fast as
+plain block chords.
+"""
+
+from collections import OrderedDict
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from simplejam.midi.smf import NOTE_OFF, NOTE_ON, Event, TrackWriter, variable_int
+
+# "block" plays all notes of a hit together, "strum" spreads their onsets by
+# strum_ticks and "arpeggio" plays one note per hit, cycling through the chord.
+STYLES = ("block", "strum", "arpeggio")
+
+# At the same tick note_off events go first, so repeated notes are released
+# before they are struck again.
+OFF_PRIORITY = 0
+ON_PRIORITY = 1
+
+# Templates kept per Rhythm. Spans come from user supplied durations, so the
+# least recently used templates are dropped past this many.
+TEMPLATE_CACHE_SIZE = 1024
+
+
+class Hit(NamedTuple):
+    """A chord onset, start and length in beats from the start of the period.
+
+    A length of None lasts until the end of the period.
+    """
+
+    start: float
+    length: Optional[float] = None
+    velocity: int = 90
+
+
+class Template(NamedTuple):
+    """The encoded events of one chord, see Rhythm.template."""
+
+    first_tick: int
+    first_status: int
+    body: bytes
+    last_status: int
+    # (offset in body, index of the chord note) for every note number byte
+    note_slots: Tuple[Tuple[int, int], ...]
+    # ticks from the last event to the end of the chord
+    rest: int
+
+
+def meter_ticks(
+    numerator: int, denominator: int, ticks_per_beat: int
+) -> Tuple[int, int]:
+    """Return the ticks in one beat and one bar of a time signature."""
+    beat_ticks = ticks_per_beat * 4 // denominator
+    return beat_ticks, beat_ticks * numerator
+
+
+def chord_spans(
+    chord_count: int,
+    bar_ticks: int,
+    beat_ticks: int,
+    durations: Optional[Sequence[float]] = None,
+) -> List[int]:
+    """Return the length in ticks of each chord.
+
+    durations gives the length of each chord in beats, without it every chord
+    lasts one bar.
+    """
+    if durations is None:
+        return [bar_ticks] * chord_count
+    if len(durations) != chord_count:
+        raise ValueError("durations must have one entry per chord.")
+    if any(duration <= 0 for duration in durations):
+        raise ValueError("durations must be positive.")
+    return [round(duration * beat_ticks) for duration in durations]
+
+
+class Rhythm:
+    """A pattern of hits repeated every period beats to fill each chord.
+
+    period defaults to one bar of the time signature. Hits that run past the
+    end of a chord are cut short.
+    """
+
+    def __init__(
+        self,
+        hits: Sequence[Hit],
+        style: str = "block",
+        period: Optional[float] = None,
+        strum_ticks: int = 30,
+    ) -> None:
+        if style not in STYLES:
+            raise ValueError(f"Style must be one of: {', '.join(STYLES)}.")
+        if period is not None and period <= 0:
+            raise ValueError("period must be positive.")
+        if strum_ticks < 0:
+            raise ValueError("strum_ticks must not be negative.")
+
+        self.hits = tuple(Hit(*hit) for hit in hits)
+        for hit in self.hits:
+            if hit.start < 0:
+                raise ValueError("Hit start must not be negative.")
+            if hit.length is not None and hit.length <= 0:
+                raise ValueError("Hit length must be positive.")
+        self.style = style
+        self.period = period
+        self.strum_ticks = strum_ticks
+        self._templates: OrderedDict[Tuple[int, ...], Optional[Template]] = (
+            OrderedDict()
+        )
+
+    def cache_key(self) -> str:
+        """Return a string identifying the rendered output of this rhythm."""
+        return repr((self.hits, self.style, self.period, self.strum_ticks))
+
+    def chord_events(
+        self, size: int, span: int, beat_ticks: int, bar_ticks: int, channel: int = 0
+    ) -> List[Event]:
+        """Return the events of a chord of size notes lasting span ticks.
+
+        The data1 field of each event is the index of the note in the chord.
+        Raises ValueError when span is negative or the period is shorter than
+        a tick.
+        """
+        if span < 0:
+            raise ValueError("Chord spans must not be negative.")
+        period = round(self.period * beat_ticks) if self.period else bar_ticks
+        if period <= 0:
+            raise ValueError(
+                f"period of {self.period} beats is shorter than a tick at "
+                f"{beat_ticks} ticks per beat."
+            )
+        events = []
+        hit_index = 0
+        for period_start in range(0, span, period):
+            for hit in self.hits:
+                start = period_start + round(hit.start * beat_ticks)
+                if hit.length is None:
+                    end = period_start + period
+                else:
+                    end = period_start + round((hit.start + hit.length) * beat_ticks)
+                end = min(end, span)
+                if end <= start:
+                    continue
+
+                if self.style == "arpeggio":
+                    onsets = [(hit_index % size, start)]
+                elif self.style == "strum":
+                    spacing = min(self.strum_ticks, (end - start) // size)
+                    onsets = [(i, start + i * spacing) for i in range(size)]
+                else:
+                    onsets = [(i, start) for i in range(size)]
+                for index, onset in onsets:
+                    events.append(
+                        (onset, ON_PRIORITY, NOTE_ON | channel, index, hit.velocity)
+                    )
+                    events.append(
+                        (end, OFF_PRIORITY, NOTE_OFF | channel, index, hit.velocity)
+                    )
+                hit_index += 1
+
+        # Stable, so notes keep their chord order within a tick.
+        events.sort(key=lambda event: event[:2])
+        return events
+
+    def template(
+        self, size: int, span: int, beat_ticks: int, bar_ticks: int, channel: int = 0
+    ) -> Optional[Template]:
+        """Return the compiled template of a chord, None if it has no events."""
+        key = (size, span, beat_ticks, bar_ticks, channel)
+        templates = self._templates
+        # Each dict operation is atomic, a template evicted by another thread
+        # in between is just compiled again.
+        try:
+            cached = templates[key]
+            templates.move_to_end(key)
+            return cached
+        except KeyError:
+            pass
+
+        template = None
+        events = (
+            self.chord_events(size, span, beat_ticks, bar_ticks, channel)
+            if size
+            else []
+        )
+        if events:
+            first_tick, _, first_status, _, _ = events[0]
+            body = bytearray()
+            note_slots = []
+            tick, status = first_tick, first_status
+            for i, (event_tick, _, event_status, index, velocity) in enumerate(events):
+                if i:
+                    body += variable_int(event_tick - tick)
+                    if event_status != status:
+                        body.append(event_status)
+                note_slots.append((len(body), index))
+                body.append(0)
+                body.append(velocity)
+                tick, status = event_tick, event_status
+            template = Template(
+                first_tick,
+                first_status,
+                bytes(body),
+                status,
+                tuple(note_slots),
+                span - tick,
+            )
+        templates[key] = template
+        while len(templates) > TEMPLATE_CACHE_SIZE:
+            try:
+                templates.popitem(last=False)
+            except KeyError:
+                break
+        return template
+
+    def render(
+        self,
+        writer: TrackWriter,
+        chords: Iterable[Sequence[int]],
+        spans: Iterable[int],
+        beat_ticks: int,
+        bar_ticks: int,
+        rest: int = 0,
+        channel: int = 0,
+    ) -> int:
+        """Append chords lasting spans ticks each to writer.
+
+        rest is the time since the last event already in the track. The time
+        from the last appended event to the end of the last chord is returned.
+        """
+        data = writer.data
+        for notes, span in zip(chords, spans):
+            template = self.template(len(notes), span, beat_ticks, bar_ticks, channel)
+            if template is None:
+                rest += span
+                continue
+
+            offset = writer.stamp(
+                rest + template.first_tick,
+                template.first_status,
+                template.body,
+                template.last_status,
+            )
+            for slot, index in template.note_slots:
+                data[offset + slot] = notes[index]
+            rest = template.rest
+        return rest
+
+    def event_count(
+        self,
+        chords: Iterable[Sequence[int]],
+        spans: Iterable[int],
+        beat_ticks: int,
+        bar_ticks: int,
+    ) -> int:
+        """Return the number of events render() writes for chords."""
+        count = 0
+        for notes, span in zip(chords, spans):
+            template = self.template(len(notes), span, beat_ticks, bar_ticks)
+            if template is not None:
+                count += len(template.note_slots)
+        return count
+
+    def events(
+        self,
+        chords: Iterable[Sequence[int]],
+        spans: Iterable[int],
+        beat_ticks: int,
+        bar_ticks: int,
+        channel: int = 0,
+    ) -> Iterator[Event]:
+        """Yield the events of chords lasting spans ticks each, in absolute ticks."""
+        start = 0
+        for notes, span in zip(chords, spans):
+            if notes:
+                for tick, priority, status, index, velocity in self.chord_events(
+                    len(notes), span, beat_ticks, bar_ticks, channel
+                ):
+                    yield (start + tick, priority, status, notes[index], velocity)
+            start += span
+
+
+RHYTHMS: Dict[str, Rhythm] = {
+    # One block chord per bar
+    "block": Rhythm([Hit(0)]),
+    # A block chord on every beat: 4 in 4/4, 3 in 3/4, 6 in 6/8
+    "beats": Rhythm([Hit(0, 1)], period=1),
+    "strum": Rhythm([Hit(0)], style="strum"),
+    # Down, down-up, up-down strumming pattern in eighths
+    "syncopated": Rhythm(
+        [Hit(0, 1, 100), Hit(1, 0.5, 80), Hit(1.5, 1, 80), Hit(2.5, 1, 80), Hit(3.5)],
+        style="strum",
+        period=4,
+    ),
+    # Eighth note arpeggio cycling through the chord
+    "arpeggio": Rhythm([Hit(0, 0.5)], style="arpeggio", period=0.5),
+}
+
+
+def get_rhythm(rhythm: "Rhythm | str") -> Rhythm:
+    """Return rhythm, looking it up in RHYTHMS when given by name."""
+    if isinstance(rhythm, Rhythm):
+        return rhythm
+    if rhythm not in RHYTHMS:
+        raise ValueError(
+            f"Invalid rhythm '{rhythm}'. Available rhythms: {list(RHYTHMS)}"
+        )
+    return RHYTHMS[rhythm]
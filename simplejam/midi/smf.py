@@ -0,0 +1,286 @@
+"""Encode Standard MIDI File chunks directly into bytes, without mido messages."""
+
+import struct
+from functools import lru_cache
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+DEFAULT_TICKS_PER_BEAT = 480
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+
+PROGRAM_CHANGE = 0xC0
+
+META_SET_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+META_END_OF_TRACK = 0x2F
+
+# end_of_track meta event with a zero delta, as appended by mido on save.
+END_OF_TRACK = b"\x00\xff\x2f\x00"
+
+# (absolute tick, priority, status, data1, data2). Tuples order by tick, and
+# at the same tick by priority, so streams of them can be merged with heapq.
+Event = Tuple[int, int, int, int, int]
+
+
+def bpm2tempo(bpm: float) -> int:
+    """Return the set_tempo value, microseconds per beat, of bpm. Same as mido."""
+    return int(round(60 * 1e6 / bpm))
+
+
+def encode_variable_int(value: int) -> bytes:
+    """Encode a delta time as a MIDI variable-length quantity."""
+    if value < 0:
+        raise ValueError("message time must be non-negative in MIDI file")
+
+    encoded = [value & 0x7F]
+    value >>= 7
+    while value:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.reverse()
+    return bytes(encoded)
+
+
+# Deltas below this are by far the most common, so their encodings are cached.
+_VLQ_CACHE = tuple(encode_variable_int(i) for i in range(0x4000))
+
+
+def variable_int(value: int) -> bytes:
+    """Return the variable-length encoding for value, using the cache if possible."""
+    if 0 <= value < 0x4000:
+        return _VLQ_CACHE[value]
+    return encode_variable_int(value)
+
+
+@lru_cache(maxsize=1024)
+def chord_payload(notes: bytes, velocity: int) -> bytes:
+    """Return the note events of a block chord after its status byte.
+
+    That is each note and velocity, separated by zero deltas under running
+    status. A song repeats a handful of chords, so payloads are cached.
+    """
+    return b"\x00".join(bytes((note, velocity)) for note in notes)
+
+
+def end_of_track(delta: int = 0) -> bytes:
+    """Return the end_of_track meta event, delta ticks after the last event."""
+    return variable_int(delta) + END_OF_TRACK[1:] if delta else END_OF_TRACK
+
+
+def chunk(name: bytes, data: bytes | bytearray) -> bytes:
+    """Return an IFF chunk with the given 4 byte name."""
+    return name + struct.pack(">L", len(data)) + data
+
+
+def header_chunk(
+    n_tracks: int, ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT, smf_type: int = 1
+) -> bytes:
+    """Return the MThd chunk for a file."""
+    return chunk(b"MThd", struct.pack(">hhh", smf_type, n_tracks, ticks_per_beat))
+
+
+def encode_file(
+    tracks: Iterable[bytes | bytearray],
+    ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT,
+    smf_type: int = 1,
+) -> bytes:
+    """Return a complete MIDI file from already encoded track data."""
+    track_data: List[bytes | bytearray] = list(tracks)
+    out = bytearray(header_chunk(len(track_data), ticks_per_beat, smf_type))
+    for data in track_data:
+        out += chunk(b"MTrk", data)
+    return bytes(out)
+
+
+class TrackWriter:
+    """Build MTrk event data straight into a bytearray.
+
+    Channel messages use running status the same way mido's writer does, so
+    the output is byte-identical to saving the equivalent mido track.
+    """
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self._running_status: Optional[int] = None
+
+    def reset_running_status(self) -> None:
+        """Force the next channel message to be written with its status byte."""
+        self._running_status = None
+
+    def meta(self, meta_type: int, payload: bytes, delta: int = 0) -> None:
+        """Append a meta event."""
+        data = self.data
+        data += variable_int(delta)
+        data += bytes((0xFF, meta_type))
+        data += variable_int(len(payload))
+        data += payload
+        self._running_status = None
+
+    def tempo(self, tempo: int, delta: int = 0) -> None:
+        """Append a set_tempo meta event (tempo in microseconds per beat)."""
+        self.meta(META_SET_TEMPO, tempo.to_bytes(3, "big"), delta)
+
+    def time_signature(
+        self,
+        numerator: int,
+        denominator: int,
+        clocks_per_click: int = 24,
+        notated_32nd_notes_per_beat: int = 8,
+        delta: int = 0,
+    ) -> None:
+        """Append a time_signature meta event."""
+        payload = bytes(
+            (
+                numerator,
+                denominator.bit_length() - 1,
+                clocks_per_click,
+                notated_32nd_notes_per_beat,
+            )
+        )
+        self.meta(META_TIME_SIGNATURE, payload, delta)
+
+    def end_of_track(self, delta: int = 0) -> None:
+        """Append the end_of_track meta event."""
+        self.meta(META_END_OF_TRACK, b"", delta)
+
+    def message(self, status: int, data1: int, data2: int, delta: int = 0) -> None:
+        """Append a two data byte channel message."""
+        data = self.data
+        data += variable_int(delta)
+        if status != self._running_status:
+            data.append(status)
+            self._running_status = status
+        data.append(data1)
+        data.append(data2)
+
+    def program_change(self, program: int, channel: int = 0, delta: int = 0) -> None:
+        """Append a program_change message."""
+        status = PROGRAM_CHANGE | channel
+        data = self.data
+        data += variable_int(delta)
+        if status != self._running_status:
+            data.append(status)
+            self._running_status = status
+        data.append(program)
+
+    def events(self, events: Iterable[Event], tick: int = 0) -> int:
+        """Append channel events given in absolute ticks, in tick order.
+
+        tick is the absolute time of the last event already in the track, the
+        absolute time of the last appended event is returned.
+        """
+        for event_tick, _, status, data1, data2 in events:
+            self.message(status, data1, data2, event_tick - tick)
+            tick = event_tick
+        return tick
+
+    def note_on(
+        self, note: int, velocity: int, delta: int = 0, channel: int = 0
+    ) -> None:
+        """Append a note_on message."""
+        self.message(NOTE_ON | channel, note, velocity, delta)
+
+    def note_off(
+        self, note: int, velocity: int, delta: int = 0, channel: int = 0
+    ) -> None:
+        """Append a note_off message."""
+        self.message(NOTE_OFF | channel, note, velocity, delta)
+
+    def chord(
+        self,
+        notes: Iterable[int],
+        duration: int,
+        velocity: int = 90,
+        channel: int = 0,
+        delta: int = 0,
+    ) -> int:
+        """Append a block chord held for duration ticks, starting after delta ticks.
+
+        Return the ticks to carry into the delta of the next event: 0, or
+        delta + duration when notes is empty, since an empty chord is a rest.
+        """
+        payload = chord_payload(
+            notes if type(notes) is bytes else bytes(notes), velocity
+        )
+        if not payload:
+            return delta + duration
+        on_status = NOTE_ON | channel
+        off_status = NOTE_OFF | channel
+        data = self.data
+
+        # All note_on events share one status byte, then all note_off events.
+        data += variable_int(delta)
+        if self._running_status != on_status:
+            data.append(on_status)
+        data += payload
+        data += variable_int(duration)
+        data.append(off_status)
+        data += payload
+        self._running_status = off_status
+        return 0
+
+    def stamp(
+        self, delta: int, first_status: int, body: bytes, last_status: int
+    ) -> int:
+        """Append pre-encoded events and return the offset of body in data.
+
+        body holds the events after the status byte of the first one, encoded
+        with running status starting from first_status. last_status is the
+        running status at the end of body.
+        """
+        data = self.data
+        data += variable_int(delta)
+        if first_status != self._running_status:
+            data.append(first_status)
+        offset = len(data)
+        data += body
+        self._running_status = last_status
+        return offset
+
+
+class StreamingTrackWriter(TrackWriter):
+    """TrackWriter that writes a single track file incrementally.
+
+    Events are flushed to outfile whenever flush_bytes have been buffered, so
+    memory stays constant however long the track is. The MTrk length is
+    patched in by close(), which requires a seekable outfile.
+    """
+
+    def __init__(
+        self,
+        outfile: BinaryIO,
+        ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT,
+        flush_bytes: int = 64 * 1024,
+    ) -> None:
+        super().__init__()
+        self.outfile = outfile
+        self.flush_bytes = flush_bytes
+        self.track_length = 0
+
+        outfile.write(header_chunk(1, ticks_per_beat))
+        outfile.write(b"MTrk")
+        self._length_offset = outfile.tell()
+        outfile.write(b"\x00\x00\x00\x00")
+
+    def flush(self) -> None:
+        """Write the buffered events to outfile."""
+        self.outfile.write(self.data)
+        self.track_length += len(self.data)
+        # Clearing keeps the running status, the next event continues the track.
+        self.data.clear()
+
+    def flush_if_full(self) -> None:
+        """Flush once the buffer has reached flush_bytes."""
+        if len(self.data) >= self.flush_bytes:
+            self.flush()
+
+    def close(self, delta: int = 0) -> None:
+        """End the track delta ticks after the last event and patch its length
+        into the MTrk header."""
+        self.end_of_track(delta)
+        self.flush()
+        end = self.outfile.tell()
+        self.outfile.seek(self._length_offset)
+        self.outfile.write(struct.pack(">L", self.track_length))
+        self.outfile.seek(end)
@@ -0,0 +1,325 @@
+"""Offline software synthesizer rendering chord sequences to WAV.
+
+Chord sequences go through generate_midi_file_from_chord_sequence first, so
+the audio plays exactly the notes, rhythm and timing of the MIDI file. Each
+note is a wavetable voice, one cycle of a few harmonics, shaped by an ADSR
+envelope. Audio is computed a block of samples at a time with NumPy and
+written to the WAV file as 16 bit PCM as it is produced, so memory use does
+not grow with the length of the render.
+
+NumPy is an optional dependency: pip install "simplejam[numpy]".
+"""
+
+import argparse
+import io
+import time
+import wave
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        'simplejam.midi.synth requires numpy, install "simplejam[numpy]"'
+    ) from e
+
+from simplejam.instrumentation import add_arguments as add_instrumentation_arguments
+from simplejam.instrumentation import instrumented_run, instruments
+from simplejam.midi.midifile import (
+    TimeSignature,
+    generate_midi_file_from_chord_sequence,
+)
+from simplejam.midi.reader import Note, read_notes
+from simplejam.midi.rhythm import Rhythm
+
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_BLOCK_SIZE = 4096
+
+# Samples in one cycle of a wavetable
+TABLE_SIZE = 2048
+
+# Amplitude of a note at velocity 127, before the envelope
+DEFAULT_GAIN = 0.2
+
+
+class Voice(NamedTuple):
+    """A wavetable instrument.
+
+    harmonics are the amplitudes of the fundamental and its overtones, attack,
+    decay and release are in seconds and sustain is a level from 0 to 1.
+    """
+
+    harmonics: Tuple[float, ...]
+    attack: float = 0.01
+    decay: float = 0.1
+    sustain: float = 0.7
+    release: float = 0.2
+
+    def wavetable(self) -> np.ndarray:
+        """Return one cycle of the voice, peak normalized, plus a guard sample."""
+        phase = np.arange(TABLE_SIZE + 1) * (2 * np.pi / TABLE_SIZE)
+        table = np.zeros(TABLE_SIZE + 1)
+        for harmonic, amplitude in enumerate(self.harmonics, start=1):
+            table += amplitude * np.sin(harmonic * phase)
+        peak = np.abs(table).max()
+        return table / peak if peak else table
+
+
+VOICES: Dict[str, Voice] = {
+    "sine": Voice((1.0,)),
+    "organ": Voice((1.0, 0.5, 0.25, 0.125), attack=0.005, decay=0.05, sustain=0.9),
+    "strings": Voice(
+        tuple(1 / n for n in range(1, 9)), attack=0.15, decay=0.2, release=0.4
+    ),
+    "piano": Voice((1.0, 0.4, 0.2, 0.1, 0.05), decay=0.8, sustain=0.3, release=0.3),
+}
+
+
+def get_voice(voice: Voice | str) -> Voice:
+    """Return voice, looking it up in VOICES when given by name."""
+    if isinstance(voice, Voice):
+        return voice
+    if voice not in VOICES:
+        raise ValueError(f"Invalid voice '{voice}'. Available voices: {list(VOICES)}")
+    return VOICES[voice]
+
+
+def envelope(t: np.ndarray, held: float, voice: Voice) -> np.ndarray:
+    """Return the ADSR level at times t after the onset of a note held seconds.
+
+    A note released during its attack or decay fades out from the level it
+    had reached.
+    """
+    points = [0.0, voice.attack, voice.attack + voice.decay]
+    levels = [0.0, 1.0, voice.sustain]
+    release_level = np.interp(held, points, levels)
+    fade = np.clip(1 - (t - held) / max(voice.release, 1e-9), 0, 1)
+    return np.where(t < held, np.interp(t, points, levels), release_level * fade)
+
+
+def note_frequency(note: int) -> float:
+    """Return the frequency in Hz of a MIDI note number, A4 = 440 Hz."""
+    return 440.0 * 2 ** ((note - 69) / 12)
+
+
+class SynthNote(NamedTuple):
+    """A note to synthesize, times in samples."""
+
+    start: int
+    end: int
+    note: int
+    velocity: int
+
+
+def seconds_notes(
+    notes: Iterable[Note], ticks_per_beat: int, tempo: int, sample_rate: int
+) -> List[SynthNote]:
+    """Return notes timed in ticks as notes timed in samples at tempo bpm."""
+    samples_per_tick = 60 * sample_rate / (tempo * ticks_per_beat)
+    return [
+        SynthNote(
+            round(note.start * samples_per_tick),
+            round(note.end * samples_per_tick),
+            note.note,
+            note.velocity,
+        )
+        for note in notes
+    ]
+
+
+def render_blocks(
+    notes: Sequence[SynthNote],
+    voice: Voice | str = "organ",
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    gain: float = DEFAULT_GAIN,
+) -> Iterator[np.ndarray]:
+    """Yield the audio of notes as float64 blocks of block_size samples.
+
+    The last block is shorter, it ends with the release of the last note.
+    """
+    voice = get_voice(voice)
+    table = voice.wavetable()
+    release = round(voice.release * sample_rate)
+    notes = sorted(notes)
+    total = max((note.end + release for note in notes), default=0)
+
+    active: List[SynthNote] = []
+    next_note = 0
+    for block_start in range(0, total, block_size):
+        block_end = min(block_start + block_size, total)
+        while next_note < len(notes) and notes[next_note].start < block_end:
+            active.append(notes[next_note])
+            next_note += 1
+        active = [note for note in active if note.end + release > block_start]
+
+        block = np.zeros(block_end - block_start)
+        for note in active:
+            first = max(note.start, block_start)
+            last = min(note.end + release, block_end)
+            elapsed = np.arange(first - note.start, last - note.start)
+
+            # Phase from the note onset, so voices are continuous across blocks
+            position = elapsed * (note_frequency(note.note) * TABLE_SIZE / sample_rate)
+            position %= TABLE_SIZE
+            index = position.astype(np.int64)
+            fraction = position - index
+            signal = table[index] + fraction * (table[index + 1] - table[index])
+
+            level = envelope(
+                elapsed / sample_rate, (note.end - note.start) / sample_rate, voice
+            )
+            block[first - block_start : last - block_start] += (
+                signal * level * (gain * note.velocity / 127)
+            )
+        yield block
+
+
+def write_wav(
+    output: str | BinaryIO,
+    blocks: Iterable[np.ndarray],
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+) -> int:
+    """Write float blocks as a mono 16 bit WAV file, return the sample count.
+
+    Samples outside [-1, 1] are clipped.
+    """
+    samples = 0
+    with wave.open(output, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        for block in blocks:
+            pcm = (np.clip(block, -1, 1) * 32767).astype("<i2")
+            wav.writeframes(pcm.tobytes())
+            samples += len(pcm)
+    return samples
+
+
+class SynthResult(NamedTuple):
+    """Outcome of a render. data holds the WAV file when none was written."""
+
+    samples: int
+    sample_rate: int
+    # Seconds of audio rendered, and wall clock seconds spent rendering them
+    duration: float
+    elapsed: float
+    data: Optional[bytes] = None
+
+    @property
+    def real_time_factor(self) -> float:
+        """Render time over audio time, below 1 is faster than real time."""
+        return self.elapsed / self.duration if self.duration else 0.0
+
+    @property
+    def renders_per_core(self) -> float:
+        """How many renders like this one a core keeps up with in real time."""
+        return self.duration / self.elapsed if self.elapsed else float("inf")
+
+
+def synthesize_chord_sequence(
+    output_file: Optional[str],
+    chord_sequence: List[Any],
+    tempo: int = 60,
+    time_signature: TimeSignature = TimeSignature(4, 4),
+    rhythm: Optional[Rhythm | str] = None,
+    durations: Optional[Sequence[float]] = None,
+    voice: Voice | str = "organ",
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> SynthResult:
+    """Render a chord sequence to a WAV file.
+
+    Takes the same chord sequence, tempo, time signature, rhythm and durations
+    as generate_midi_file_from_chord_sequence. When output_file is None the
+    WAV file is returned in the result's data instead of written to disk.
+    """
+    voice = get_voice(voice)
+    start = time.perf_counter()
+    midi = generate_midi_file_from_chord_sequence(
+        None,
+        chord_sequence,
+        tempo=tempo,
+        time_signature=time_signature,
+        encoder="bytes",
+        rhythm=rhythm,
+        durations=durations,
+    )
+    assert midi is not None
+    ticks_per_beat, notes = read_notes(midi)
+    blocks = render_blocks(
+        seconds_notes(notes, ticks_per_beat, tempo, sample_rate),
+        voice,
+        sample_rate,
+        block_size,
+    )
+
+    with instruments.timer("synthesize"):
+        if output_file is None:
+            buffer = io.BytesIO()
+            samples = write_wav(buffer, blocks, sample_rate)
+            data: Optional[bytes] = buffer.getvalue()
+        else:
+            samples = write_wav(output_file, blocks, sample_rate)
+            data = None
+    instruments.count("samples", samples)
+    elapsed = time.perf_counter() - start
+    return SynthResult(samples, sample_rate, samples / sample_rate, elapsed, data)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Render a chord progression to a WAV file"
+    )
+    parser.add_argument("output_file", help="WAV file to write")
+    parser.add_argument("--key", default="C", help="Key, e.g. C or D")
+    parser.add_argument(
+        "--numerals", default="I,IV,V,I", help="Comma separated triad numerals"
+    )
+    parser.add_argument("--tempo", type=int, default=90)
+    parser.add_argument("--rhythm", help="Rhythm name, see rhythm.RHYTHMS")
+    parser.add_argument("--voice", choices=list(VOICES), default="organ")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE)
+    add_instrumentation_arguments(parser)
+    return parser.parse_args()
+
+
+def run() -> None:
+    """Render a progression and print its real-time factor."""
+    from simplejam.midi.logic.generators import generate_number_chord_sequence
+    from simplejam.schemas import KeyChordProgression
+
+    args = parse_args()
+    with instrumented_run(args.profile, args.metrics):
+        chord_sequence = generate_number_chord_sequence(
+            [
+                KeyChordProgression(
+                    key=args.key, number_chord_sequence=tuple(args.numerals.split(","))
+                )
+            ]
+        )
+        result = synthesize_chord_sequence(
+            args.output_file,
+            chord_sequence,
+            tempo=args.tempo,
+            rhythm=args.rhythm,
+            voice=args.voice,
+            sample_rate=args.sample_rate,
+        )
+    print(
+        f"Rendered {result.duration:.2f} s of audio in {result.elapsed * 1000:.1f} ms, "
+        f"real-time factor {result.real_time_factor:.4f} "
+        f"({result.renders_per_core:.0f} renders per core)"
+    )
@@ -0,0 +1,205 @@
+"""Columnar event timelines backed by NumPy structured arrays.
+
+A timeline holds one row per note_on or note_off event, in the EVENT_DTYPE
+layout. Transposition, humanization, quantization and delta times are whole
+array operations, and encode_events writes the MTrk data for every event in a
+single vectorized pass, with the same running status as TrackWriter.
+
+NumPy is an optional dependency: pip install "simplejam[numpy]".
+"""
+
+from typing import Any, Iterable, Optional
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        'simplejam.midi.timeline requires numpy, install "simplejam[numpy]"'
+    ) from e
+
+from simplejam.midi.chord import chord_notes
+from simplejam.midi.midifile import TimeSignature
+from simplejam.midi.smf import (
+    DEFAULT_TICKS_PER_BEAT,
+    END_OF_TRACK,
+    NOTE_OFF,
+    NOTE_ON,
+    TrackWriter,
+    bpm2tempo,
+    encode_file,
+)
+
+EVENT_DTYPE = np.dtype(
+    [
+        ("tick", np.int64),
+        ("channel", np.uint8),
+        ("note", np.uint8),
+        ("velocity", np.uint8),
+        ("type", np.uint8),  # NOTE_ON or NOTE_OFF
+    ]
+)
+
+# Largest delta time a 4 byte variable-length quantity can hold.
+MAX_DELTA = 0x0FFFFFFF
+
+
+def empty_timeline(size: int = 0) -> np.ndarray:
+    """Return a zeroed timeline with room for size events."""
+    return np.zeros(size, dtype=EVENT_DTYPE)
+
+
+def chord_timeline(
+    chord_sequence: Iterable[Any],
+    duration: int,
+    velocity: int = 90,
+    channel: int = 0,
+) -> np.ndarray:
+    """Return the timeline of block chords held for duration ticks each.
+
+    Events are in the order generate_midi_file_from_chord_sequence writes
+    them, so encoding the timeline gives a byte-identical file.
+    """
+    chords = [chord_notes(chord) for chord in chord_sequence]
+    lengths = np.fromiter((len(chord) for chord in chords), np.int64, len(chords))
+    notes = np.fromiter(
+        (note for chord in chords for note in chord), np.uint8, int(lengths.sum())
+    )
+    chord_index = np.repeat(np.arange(len(chords)), lengths)
+
+    # Each chord is its note_on events followed by its note_off events.
+    on_positions = np.cumsum(lengths)[chord_index] - lengths[chord_index]
+    on_positions = on_positions + np.arange(len(notes))
+    off_positions = on_positions + lengths[chord_index]
+
+    events = empty_timeline(2 * len(notes))
+    events["channel"] = channel
+    events["velocity"] = velocity
+    for positions, event_type, ticks in (
+        (on_positions, NOTE_ON, chord_index * duration),
+        (off_positions, NOTE_OFF, (chord_index + 1) * duration),
+    ):
+        events["tick"][positions] = ticks
+        events["note"][positions] = notes
+        events["type"][positions] = event_type
+    return events
+
+
+def sort_timeline(events: np.ndarray) -> np.ndarray:
+    """Return events in tick order, note_off first at equal ticks.
+
+    The sort is stable, so events at the same tick and of the same type keep
+    their relative order.
+    """
+    return events[np.lexsort((events["type"], events["tick"]))]
+
+
+def transpose(events: np.ndarray, semitones: int) -> np.ndarray:
+    """Return a copy of events with every note moved by semitones."""
+    notes = events["note"].astype(np.int64) + semitones
+    if len(notes) and (notes.min() < 0 or notes.max() > 127):
+        raise ValueError(f"Transposing by {semitones} moves notes out of MIDI range.")
+    result = events.copy()
+    result["note"] = notes
+    return result
+
+
+def humanize(
+    events: np.ndarray, spread: int = 8, seed: Optional[int] = None
+) -> np.ndarray:
+    """Return a copy of events with note_on velocities randomly varied by up to spread."""
+    rng = np.random.default_rng(seed)
+    result = events.copy()
+    on = result["type"] == NOTE_ON
+    velocities = result["velocity"][on].astype(np.int64)
+    velocities += rng.integers(-spread, spread + 1, len(velocities))
+    result["velocity"][on] = np.clip(velocities, 1, 127)
+    return result
+
+
+def quantize(events: np.ndarray, grid: int) -> np.ndarray:
+    """Return events with ticks snapped to the nearest multiple of grid, re-sorted.
+
+    A note shorter than half a grid step would collapse to zero length and be
+    released before it is struck, so its note_off is moved one grid step
+    after its note_on instead.
+    """
+    if grid < 1:
+        raise ValueError("grid must be at least 1 tick.")
+    result = events.copy()
+    ticks = (events["tick"] + grid // 2) // grid * grid
+
+    # Each note_off belongs to the note_on just before it on the same
+    # channel and note, note_off first at equal ticks like sort_timeline.
+    order = np.lexsort(
+        (events["type"], events["tick"], events["note"], events["channel"])
+    )
+    on_rows, off_rows = order[:-1], order[1:]
+    paired = (
+        (events["type"][on_rows] == NOTE_ON)
+        & (events["type"][off_rows] == NOTE_OFF)
+        & (events["note"][on_rows] == events["note"][off_rows])
+        & (events["channel"][on_rows] == events["channel"][off_rows])
+    )
+    on_rows, off_rows = on_rows[paired], off_rows[paired]
+    collapsed = ticks[off_rows] <= ticks[on_rows]
+    ticks[off_rows[collapsed]] = ticks[on_rows[collapsed]] + grid
+
+    result["tick"] = ticks
+    return sort_timeline(result)
+
+
+def delta_ticks(events: np.ndarray, start: int = 0) -> np.ndarray:
+    """Return the delta time of every event, the first relative to start."""
+    return np.diff(events["tick"], prepend=start)
+
+
+def encode_events(events: np.ndarray, start: int = 0) -> bytes:
+    """Encode sorted events as MTrk data, using running status.
+
+    The first event always carries its status byte, as after the meta events
+    at the start of a track.
+    """
+    deltas = delta_ticks(events, start)
+    if len(deltas) and (deltas.min() < 0 or deltas.max() > MAX_DELTA):
+        raise ValueError("events must be sorted and deltas fit in 4 bytes.")
+
+    statuses = events["type"] | events["channel"]
+    has_status = np.ones(len(events), dtype=np.int64)
+    has_status[1:] = statuses[1:] != statuses[:-1]
+    vlq_lengths = np.ones(len(events), dtype=np.int64)
+    for shift in (7, 14, 21):
+        vlq_lengths += deltas >= 1 << shift
+
+    sizes = vlq_lengths + has_status + 2
+    offsets = np.cumsum(sizes) - sizes
+    out = np.zeros(int(sizes.sum()), dtype=np.uint8)
+
+    # Variable-length quantities, most significant group first.
+    for k in range(4):
+        rows = vlq_lengths > k
+        remaining = vlq_lengths[rows] - 1 - k
+        groups = (deltas[rows] >> (7 * remaining)) & 0x7F
+        out[offsets[rows] + k] = groups | np.where(remaining > 0, 0x80, 0)
+
+    positions = offsets + vlq_lengths
+    with_status = has_status.astype(bool)
+    out[positions[with_status]] = statuses[with_status]
+    positions = positions + has_status
+    out[positions] = events["note"]
+    out[positions + 1] = events["velocity"]
+    return out.tobytes()
+
+
+def encode_timeline(
+    events: np.ndarray,
+    tempo: int = 60,
+    time_signature: TimeSignature = TimeSignature(4, 4),
+    ticks_per_beat: int = DEFAULT_TICKS_PER_BEAT,
+) -> bytes:
+    """Return a single track MIDI file for sorted events."""
+    writer = TrackWriter()
+    writer.tempo(bpm2tempo(tempo))
+    writer.time_signature(time_signature.numerator, time_signature.denominator)
+    return encode_file(
+        [bytes(writer.data) + encode_events(events) + END_OF_TRACK], ticks_per_beat
+    )
@@ -1,8 +1,46 @@
-from typing import Tuple
+from typing import Annotated, Literal, Optional, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from simplejam.midi.keys.scales import NUMERAL_DEGREES
+
+# Beats per minute. A MIDI tempo is a 24-bit count of microseconds per beat,
+# so slower tempos overflow it.
+MIN_TEMPO = 4
+MAX_TEMPO = 1000
+
+Tempo = Annotated[int, Field(ge=MIN_TEMPO, le=MAX_TEMPO)]
+
+# (beats per bar, note value of a beat). The numerator is stored in one byte,
+# the note value as a power of two, see midifile.TimeSignature.
+Meter = Tuple[Annotated[int, Field(ge=1, le=255)], Literal[2, 4, 8, 16]]
 
 
 class KeyChordProgression(BaseModel):
     key: str
     number_chord_sequence: Tuple[str, ...]
+
+    def cache_key(self) -> Tuple[str, Tuple[str, ...]]:
+        """Return a hashable key identifying this progression by value.
+
+        Plain numerals are case insensitive and upper-cased, numerals with a
+        quality or accidental (see logic.numerals) are kept as they are.
+        """
+        return self.key, tuple(
+            n.upper() if n.upper() in NUMERAL_DEGREES else n
+            for n in self.number_chord_sequence
+        )
+
+
+class RenderSpec(KeyChordProgression):
+    """A progression to render to its own file, one line of simplejam render.
+
+    A relative output_file is relative to the output directory, without one
+    the file is named after the line number of the spec. With voice_leading
+    the chords are revoiced to move smoothly, see voicing.voice_chords.
+    """
+
+    tempo: Tempo = 60
+    time_signature: Meter = (4, 4)
+    output_file: Optional[str] = None
+    voice_leading: bool = False
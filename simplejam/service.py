@@ -0,0 +1,354 @@
+"""asyncio HTTP front-end that renders chord progressions to MIDI files.
+
+Endpoints:
+    POST /render   JSON body, see parse_render_request. Responds with audio/midi.
+    GET  /metrics  Request counters and latency percentiles of successful
+                   renders as JSON.
+    GET  /health   Liveness probe.
+
+Rendering runs in a worker pool so the event loop only parses requests and
+streams responses. At most max_concurrency renders run at a time and at most
+max_pending requests wait for a slot; anything beyond that is rejected with
+503 so a burst can't queue unbounded work.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from http import HTTPStatus
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from simplejam.instrumentation import instruments
+from simplejam.midi.logic.generators import generate_number_chord_sequence
+from simplejam.midi.logic.voicing import voice_chords
+from simplejam.midi.midifile import (
+    TimeSignature,
+    generate_midi_file_from_chord_sequence,
+)
+from simplejam.schemas import KeyChordProgression, Meter, Tempo
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class RenderRequest(BaseModel):
+    progressions: List[KeyChordProgression]
+    tempo: Tempo = 60
+    time_signature: Meter = (4, 4)
+    # Revoice the chords for smooth voice leading, see voicing.voice_chords
+    voice_leading: bool = False
+
+
+# Fields of a RenderRequest other than its progressions
+RENDER_SETTINGS = tuple(
+    name for name in RenderRequest.model_fields if name != "progressions"
+)
+
+
+def parse_render_request(body: bytes) -> RenderRequest:
+    """Validate a request body.
+
+    The body is a RenderRequest object, a single KeyChordProgression object or
+    a list of KeyChordProgression objects. A single progression can carry the
+    other RenderRequest fields, such as tempo, next to its own.
+    """
+    data = json.loads(body)
+    if isinstance(data, list):
+        data = {"progressions": data}
+    elif isinstance(data, dict) and "progressions" not in data:
+        settings = {name: data.pop(name) for name in RENDER_SETTINGS if name in data}
+        data = {"progressions": [data], **settings}
+    return RenderRequest.model_validate(data)
+
+
+def render_request(request: RenderRequest) -> bytes:
+    """Render a request to the bytes of a MIDI file. Runs in the worker pool."""
+    chord_sequence = generate_number_chord_sequence(request.progressions)
+    if request.voice_leading:
+        chord_sequence = voice_chords(chord_sequence)
+    data = generate_midi_file_from_chord_sequence(
+        None,
+        chord_sequence,
+        tempo=request.tempo,
+        time_signature=TimeSignature(*request.time_signature),
+        encoder="bytes",
+    )
+    assert data is not None
+    return bytes(data)
+
+
+def _render_in_worker(
+    request: RenderRequest, instrument: bool = False
+) -> Tuple[bytes, Optional[Dict[str, Any]]]:
+    """Render a request. With instrument, in a worker process, the metrics of
+    the render are returned too, to be merged by the parent."""
+    if instrument:
+        instruments.enable()
+        instruments.reset()
+    data = render_request(request)
+    return data, instruments.snapshot() if instrument else None
+
+
+# Rendered once before the workers are forked, so they inherit the key tables
+# and encoder state it warms instead of each building them on first use.
+WARM_UP_REQUEST = RenderRequest(
+    progressions=[KeyChordProgression(key="C", number_chord_sequence=("I",))]
+)
+
+
+def _warm_up() -> None:
+    """Render WARM_UP_REQUEST, leaving it out of the metrics."""
+    enabled = instruments.enabled
+    instruments.disable()
+    try:
+        render_request(WARM_UP_REQUEST)
+    finally:
+        instruments.enabled = enabled
+
+
+class LatencyMetrics:
+    """Counters and latency percentiles over the most recent requests.
+
+    Only successful renders are timed, failed and rejected requests are
+    counted in errors and rejected instead.
+    """
+
+    def __init__(self, window: int = 1024) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.bytes_sent = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "bytes_sent": self.bytes_sent,
+            "latency_seconds": {
+                "count": len(latencies),
+                "mean": sum(latencies) / len(latencies) if latencies else None,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+            },
+        }
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str = "") -> None:
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class JamService:
+    """HTTP service rendering KeyChordProgression JSON to MIDI files."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        workers: Optional[int] = None,
+        max_concurrency: int = 8,
+        max_pending: int = 64,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.metrics = LatencyMetrics()
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self) -> None:
+        """Start listening, self.port is updated when port 0 was requested."""
+        if self._executor is None:
+            _warm_up()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            # Start the workers before accepting connections. Forked later,
+            # they would inherit client sockets and keep them open.
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, os.getpid)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        assert self._server is not None
+        print(f"Serving on http://{self.host}:{self.port}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            method, path, body = await self._read_request(reader)
+            if path == "/render":
+                if method != "POST":
+                    raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+                await self._render(body, writer)
+            elif path == "/metrics" and method == "GET":
+                payload = json.dumps(self.metrics.snapshot()).encode()
+                await self._respond(writer, HTTPStatus.OK, payload, "application/json")
+            elif path == "/health" and method == "GET":
+                await self._respond(writer, HTTPStatus.OK, b"ok", "text/plain")
+            else:
+                raise HTTPError(HTTPStatus.NOT_FOUND)
+        except HTTPError as e:
+            await self._respond_error(writer, e.status, str(e))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> Tuple[str, str, bytes]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], body
+
+    async def _render(self, body: bytes, writer: asyncio.StreamWriter) -> None:
+        assert self._slots is not None
+        start = time.perf_counter()
+        self.metrics.requests += 1
+
+        try:
+            request = parse_render_request(body)
+        except (ValueError, ValidationError) as e:
+            self.metrics.errors += 1
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+        # Back-pressure: refuse work once the queue for the worker pool is full.
+        if self._slots.locked() and self._waiting >= self.max_pending:
+            self.metrics.rejected += 1
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Too many pending renders")
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self.metrics.in_flight += 1
+        # Workers in other processes send their metrics back with the file.
+        instrument = instruments.enabled and isinstance(
+            self._executor, ProcessPoolExecutor
+        )
+        try:
+            loop = asyncio.get_running_loop()
+            data, snapshot = await loop.run_in_executor(
+                self._executor, _render_in_worker, request, instrument
+            )
+            if snapshot is not None:
+                instruments.merge(snapshot)
+        except ValueError as e:
+            self.metrics.errors += 1
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        except Exception as e:
+            self.metrics.errors += 1
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+        finally:
+            self.metrics.in_flight -= 1
+            self._slots.release()
+
+        await self._respond(writer, HTTPStatus.OK, data, "audio/midi")
+        self.metrics.record(time.perf_counter() - start)
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        body: bytes,
+        content_type: str,
+    ) -> None:
+        writer.write(
+            (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+        )
+        # Stream in chunks, waiting for slow clients instead of buffering it all.
+        view = memoryview(body)
+        for offset in range(0, len(view), STREAM_CHUNK_BYTES):
+            writer.write(view[offset : offset + STREAM_CHUNK_BYTES])
+            await writer.drain()
+        await writer.drain()
+        self.metrics.bytes_sent += len(body)
+
+    async def _respond_error(
+        self, writer: asyncio.StreamWriter, status: HTTPStatus, message: str
+    ) -> None:
+        body = json.dumps({"error": message}).encode()
+        try:
+            await self._respond(writer, status, body, "application/json")
+        except ConnectionError:
+            pass
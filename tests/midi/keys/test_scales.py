@@ -0,0 +1,140 @@
+import pickle
+from collections import OrderedDict
+from types import MappingProxyType
+
+import pytest
+
+from simplejam.midi.keys import C_major, D_major, scales
+
+# Values of the original hand-written C_major and D_major modules.
+HAND_WRITTEN_TRIADS = {
+    "C": OrderedDict([
+        ("I", (60, 64, 67)), ("II", (62, 65, 69)), ("III", (64, 67, 71)), ("IV", (65, 69, 72)),
+        ("V", (67, 71, 74)), ("VI", (69, 72, 76)), ("VII", (71, 74, 77)), ("VIII", (72, 76, 79)),
+    ]),
+    "D": OrderedDict([
+        ("I", (62, 66, 69)), ("II", (64, 67, 71)), ("III", (66, 69, 73)), ("IV", (67, 71, 74)),
+        ("V", (69, 73, 76)), ("VI", (71, 74, 78)), ("VII", (73, 76, 79)), ("VIII", (74, 78, 81)),
+    ]),
+}
+
+
+@pytest.mark.parametrize("key,module", [
+    pytest.param("C", C_major, id="c_major"),
+    pytest.param("D", D_major, id="d_major")
+])
+def test_diatonic_triads_match_hand_written_tables(key, module):
+    triads = module.DiatonicTriads
+    
+    assert isinstance(triads, MappingProxyType)
+    assert triads is scales.diatonic_triads(key)
+    assert OrderedDict(
+        (numeral, tuple(note.value for note in chord)) for numeral, chord in triads.items()
+    ) == HAND_WRITTEN_TRIADS[key]
+
+
+def test_scale_enum_names_match_hand_written_enums():
+    assert C_major.CMajorScale.__name__ == "CMajorScale"
+    assert C_major.CMajorScale.C4.value == 60
+    assert C_major.CMajorScale.B5.value == 83
+    assert D_major.DMajorScale.__name__ == "DMajorScale"
+    assert D_major.DMajorScale.F_SHARP_4.value == 66
+    assert D_major.DMajorScale.C_SHARP_6.value == 85
+
+
+@pytest.mark.parametrize("key,expected_names", [
+    pytest.param("F", ["F4", "G4", "A4", "B_FLAT_4", "C5", "D5", "E5"], id="f_major"),
+    pytest.param("F#m", ["F_SHARP_4", "G_SHARP_4", "A4", "B4", "C_SHARP_5", "D5", "E5"], id="f_sharp_minor"),
+    pytest.param("Eb lydian", ["E_FLAT_4", "F4", "G4", "A4", "B_FLAT_4", "C5", "D5"], id="e_flat_lydian"),
+    pytest.param("G# harmonic minor", ["G_SHARP_4", "A_SHARP_4", "B4", "C_SHARP_5", "D_SHARP_5", "E5", "F_DOUBLE_SHARP_5"], id="g_sharp_harmonic_minor")
+])
+def test_scale_enum_spelling(key, expected_names):
+    assert list(scales.scale_enum(key).__members__)[:7] == expected_names
+
+
+@pytest.mark.parametrize("key,equivalent", [
+    pytest.param("A minor", "Am", id="minor_suffix"),
+    pytest.param("A aeolian", "Am", id="aeolian_alias"),
+    pytest.param("C ionian", "C", id="ionian_alias"),
+    pytest.param("Db", "C#", id="enharmonic_tonic")
+])
+def test_key_index_aliases(key, equivalent):
+    assert scales.key_index(key) == scales.key_index(equivalent)
+
+
+def test_tables_are_flat_and_complete():
+    assert len(scales.SCALES) == 12 * len(scales.MODES) * scales.SCALE_LENGTH
+    assert len(scales.TRIADS) == 12 * len(scales.MODES) * len(scales.NUMERALS)
+    assert len(scales.SEVENTHS) == len(scales.TRIADS)
+    # The VIII triad is the I triad an octave up in every key
+    for key in range(12 * len(scales.MODES)):
+        row = key * scales.DEGREES
+        assert scales.TRIADS[row + 7] == tuple(n + 12 for n in scales.TRIADS[row])
+
+
+@pytest.mark.parametrize("key,numeral,expected", [
+    pytest.param("C", "V", (67, 71, 74, 77), id="g_dominant_7"),
+    pytest.param("C", "vii", (71, 74, 77, 81), id="b_half_diminished_7"),
+    pytest.param("A harmonic minor", "V", (76, 80, 83, 86), id="e_dominant_7_in_a_harmonic_minor")
+])
+def test_seventh_notes(key, numeral, expected):
+    assert scales.seventh_notes(key, numeral) == expected
+    assert tuple(note.value for note in scales.diatonic_sevenths(key)[numeral.upper()]) == expected
+
+
+def test_triad_notes():
+    assert scales.triad_notes("E", "I") == (64, 68, 71)
+
+
+@pytest.mark.parametrize("key,error", [
+    pytest.param("H", "Invalid tonic 'H'", id="invalid_tonic"),
+    pytest.param("C#x", "Invalid mode 'x'", id="invalid_mode_suffix"),
+    pytest.param("C blues", "Invalid mode 'blues'", id="invalid_mode")
+])
+def test_key_index_invalid(key, error):
+    with pytest.raises(ValueError, match=error):
+        scales.key_index(key)
+
+
+def test_scale_notes_pickle_round_trip():
+    note = scales.scale_enum("Bb")["E_FLAT_5"]
+    
+    assert pickle.loads(pickle.dumps(note)) is note
+
+
+@pytest.mark.parametrize("index,expected_name", [
+    pytest.param(0, "C", id="c_major"),
+    pytest.param(3, "Eb", id="e_flat_major"),
+    pytest.param(5 * 12 + 6, "F#m", id="f_sharp_minor"),
+    pytest.param(12 + 2, "D dorian", id="d_dorian"),
+    pytest.param(7 * 12 + 9, "A harmonic minor", id="a_harmonic_minor")
+])
+def test_key_name(index, expected_name):
+    assert scales.key_name(index) == expected_name
+    assert scales.key_index(expected_name) == index
+
+
+def test_key_name_round_trips_every_key():
+    assert [scales.key_index(scales.key_name(i)) for i in range(scales.KEY_COUNT)] == list(range(scales.KEY_COUNT))
+
+
+@pytest.mark.parametrize("key", [
+    pytest.param(" C", id="padded"),
+    pytest.param("c", id="lower_case"),
+    pytest.param("C major", id="mode"),
+    pytest.param("C ionian", id="alias"),
+])
+def test_key_spellings_share_tables(key):
+    assert scales.key_spelling(key) == ("C", 0, "major")
+    assert scales.scale_enum(key) is C_major.CMajorScale
+    assert scales.diatonic_triads(key) is C_major.DiatonicTriads
+    assert scales.diatonic_sevenths(key) is C_major.DiatonicSevenths
+
+
+def test_key_caches_are_bounded():
+    for i in range(2000):
+        scales.diatonic_triads(" " * i + "Bb")
+        scales.key_index(" " * i + "Bb")
+
+    assert scales._diatonic_triads.cache_info().currsize <= len(scales.LETTERS) * len(scales.ACCIDENTALS) * len(scales.MODES)
+    assert scales.key_index.cache_info().currsize <= 1024
@@ -1,59 +1,59 @@
 import pytest
-from unittest.mock import patch, MagicMock
-from simplejam.midi.logic.generators import generate_number_chord_sequence
+from simplejam.midi.keys import C_major, D_major
+from simplejam.midi.logic.generators import CacheInfo, ProgressionCache, generate_number_chord_sequence
 from simplejam.schemas import KeyChordProgression
 
 
 @pytest.mark.parametrize("progressions,expected_result", [
     pytest.param(
         [KeyChordProgression(key="C", number_chord_sequence=("I", "V", "VI"))],
-        ["mock_c_I", "mock_c_V", "mock_c_VI"],
+        [C_major.DiatonicTriads["I"], C_major.DiatonicTriads["V"], C_major.DiatonicTriads["VI"]],
         id="single_c_major_progression"
     ),
     pytest.param(
         [
             KeyChordProgression(key="C", number_chord_sequence=("II", "V")),
-            KeyChordProgression(key="D", number_chord_sequence=("IV", "I"))
+            KeyChordProgression(key="D", number_chord_sequence=("iv", "I"))
         ],
-        ["mock_c_II", "mock_c_V", "mock_d_IV", "mock_d_I"],
+        [C_major.DiatonicTriads["II"], C_major.DiatonicTriads["V"], D_major.DiatonicTriads["IV"], D_major.DiatonicTriads["I"]],
         id="multiple_progressions"
     )
 ])
-@patch('simplejam.midi.logic.generators.C_major')
-@patch('simplejam.midi.logic.generators.D_major')
-def test_generate_number_chord_sequence_valid(mock_d_major, mock_c_major, progressions, expected_result):
-    # Setup mocks
-    mock_c_chords = MagicMock()
-    mock_d_chords = MagicMock()
-    
-    # Configure C major chord access
-    mock_c_chords.__getitem__ = MagicMock(side_effect=lambda x: f"mock_c_{x}")
-    mock_c_major.DiatonicTriads = mock_c_chords
-    
-    # Configure D major chord access  
-    mock_d_chords.__getitem__ = MagicMock(side_effect=lambda x: f"mock_d_{x}")
-    mock_d_major.DiatonicTriads = mock_d_chords
-    
+def test_generate_number_chord_sequence_valid(progressions, expected_result):
     result = generate_number_chord_sequence(progressions)
-    
+
     assert result == expected_result
 
 
+@pytest.mark.parametrize("key,expected_notes", [
+    pytest.param("G", [[67, 71, 74], [74, 78, 81], [67, 71, 74]], id="g_major"),
+    pytest.param("Bb", [[70, 74, 77], [77, 81, 84], [70, 74, 77]], id="b_flat_major"),
+    pytest.param("Am", [[69, 72, 76], [76, 79, 83], [69, 72, 76]], id="a_minor"),
+    pytest.param("D dorian", [[62, 65, 69], [69, 72, 76], [62, 65, 69]], id="d_dorian")
+])
+def test_generate_number_chord_sequence_any_key(key, expected_notes):
+    progressions = [KeyChordProgression(key=key, number_chord_sequence=("I", "V", "I"))]
+
+    result = generate_number_chord_sequence(progressions)
+
+    assert [[note.value for note in chord] for chord in result] == expected_notes
+
+
 @pytest.mark.parametrize("invalid_key,expected_error", [
     pytest.param(
-        "E",
-        r"Key 'E' is not supported. Available keys: \['C', 'D'\]",
-        id="unsupported_key_E"
+        "H",
+        r"Key 'H' is not supported. Invalid tonic 'H'",
+        id="unsupported_tonic_H"
     ),
     pytest.param(
-        "G",
-        r"Key 'G' is not supported. Available keys: \['C', 'D'\]",
-        id="unsupported_key_G"
+        "C bebop",
+        r"Key 'C bebop' is not supported. Invalid mode 'bebop'",
+        id="unsupported_mode_bebop"
     )
 ])
 def test_generate_number_chord_sequence_invalid_key(invalid_key, expected_error):
     progressions = [KeyChordProgression(key=invalid_key, number_chord_sequence=("I", "V"))]
-    
+
     with pytest.raises(ValueError, match=expected_error):
         generate_number_chord_sequence(progressions)
 
@@ -66,36 +66,62 @@ def test_generate_number_chord_sequence_invalid_key(invalid_key, expected_error)
         id="invalid_numeral_c_major"
     ),
     pytest.param(
-        "D", 
+        "D",
         "X",
         "Invalid chord numeral 'X' for key 'D'",
         id="invalid_numeral_d_major"
     )
 ])
-@patch('simplejam.midi.logic.generators.C_major')
-@patch('simplejam.midi.logic.generators.D_major')
-def test_generate_number_chord_sequence_invalid_numeral(mock_d_major, mock_c_major, key, invalid_numeral, expected_error):
-    # Setup mocks to raise AttributeError for invalid numerals
-    mock_c_chords = MagicMock()
-    mock_d_chords = MagicMock()
-    
-    def c_chord_getter(numeral):
-        if numeral in ["I", "II", "III", "IV", "V", "VI", "VII", "VIII"]:
-            return f"mock_c_{numeral}"
-        raise AttributeError()
-    
-    def d_chord_getter(numeral):
-        if numeral in ["I", "II", "III", "IV", "V", "VI", "VII", "VIII"]:
-            return f"mock_d_{numeral}"
-        raise AttributeError()
-    
-    mock_c_chords.__getitem__ = MagicMock(side_effect=c_chord_getter)
-    mock_d_chords.__getitem__ = MagicMock(side_effect=d_chord_getter)
-    
-    mock_c_major.DiatonicTriads = mock_c_chords
-    mock_d_major.DiatonicTriads = mock_d_chords
-    
+def test_generate_number_chord_sequence_invalid_numeral(key, invalid_numeral, expected_error):
     progressions = [KeyChordProgression(key=key, number_chord_sequence=(invalid_numeral,))]
-    
+
     with pytest.raises(ValueError, match=expected_error):
-        generate_number_chord_sequence(progressions)
\ No newline at end of file
+        generate_number_chord_sequence(progressions)
+
+
+def test_generate_number_chord_sequence_cache_hits_and_misses():
+    cache = ProgressionCache(maxsize=8)
+    progressions = [
+        KeyChordProgression(key="C", number_chord_sequence=("II", "V", "I")),
+        KeyChordProgression(key="C", number_chord_sequence=("ii", "v", "i")),
+    ]
+
+    first = generate_number_chord_sequence(progressions, cache=cache)
+    second = generate_number_chord_sequence(progressions, cache=cache)
+
+    assert first == second == generate_number_chord_sequence(progressions, cache=None)
+    # Numerals are normalized, so both progressions share one entry
+    assert cache.info() == CacheInfo(hits=3, misses=1, evictions=0, size=1, maxsize=8)
+
+
+def test_generate_number_chord_sequence_cache_does_not_store_errors():
+    cache = ProgressionCache()
+    progressions = [KeyChordProgression(key="C", number_chord_sequence=("IX",))]
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Invalid chord numeral 'IX' for key 'C'"):
+            generate_number_chord_sequence(progressions, cache=cache)
+
+    assert cache.info() == CacheInfo(hits=0, misses=2, evictions=0, size=0, maxsize=256)
+
+
+def test_progression_cache_evicts_least_recently_used():
+    cache = ProgressionCache(maxsize=2)
+    cache.put(("C", ("I",)), ("c",))
+    cache.put(("D", ("I",)), ("d",))
+    assert cache.get(("C", ("I",))) == ("c",)
+
+    cache.put(("E", ("I",)), ("e",))
+
+    assert cache.get(("D", ("I",))) is None
+    assert cache.get(("C", ("I",))) == ("c",)
+    assert cache.get(("E", ("I",))) == ("e",)
+    assert cache.info() == CacheInfo(hits=3, misses=1, evictions=1, size=2, maxsize=2)
+
+    cache.clear()
+    assert cache.info() == CacheInfo(hits=0, misses=0, evictions=0, size=0, maxsize=2)
+
+
+def test_progression_cache_invalid_maxsize():
+    with pytest.raises(ValueError, match="maxsize must be at least 1."):
+        ProgressionCache(maxsize=0)
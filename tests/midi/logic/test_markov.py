@@ -0,0 +1,112 @@
+import random
+from collections import Counter
+from itertools import islice
+
+import mido
+import pytest
+
+from simplejam.midi.chord import triads
+from simplejam.midi.logic.markov import TRANSITIONS, MarkovGenerator, alias_table
+from simplejam.midi.midifile import stream_midi_file_from_chord_sequence
+
+
+@pytest.mark.parametrize("weights", [
+    pytest.param([1], id="single"),
+    pytest.param([1, 1, 1, 1], id="uniform"),
+    pytest.param([6, 2, 1], id="skewed"),
+    pytest.param([0.1, 0, 3, 0.9], id="with_zero"),
+])
+def test_alias_table_probabilities_are_exact(weights):
+    probabilities, aliases = alias_table(weights)
+
+    # Each column holds 1/size of the mass, split between itself and its alias
+    mass = [0.0] * len(weights)
+    for column, (p, alias) in enumerate(zip(probabilities, aliases)):
+        mass[column] += p / len(weights)
+        mass[alias] += (1 - p) / len(weights)
+    assert mass == pytest.approx([w / sum(weights) for w in weights])
+
+
+@pytest.mark.parametrize("weights", [
+    pytest.param([], id="empty"),
+    pytest.param([0, 0], id="zero_sum"),
+    pytest.param([2, -1], id="negative"),
+])
+def test_alias_table_invalid_weights_raise_value_error(weights):
+    with pytest.raises(ValueError, match="weights must be non-negative"):
+        alias_table(weights)
+
+
+def test_numerals_follow_transitions():
+    generator = MarkovGenerator()
+
+    numerals = list(generator.numerals(start="ii", seed=1, length=20_000))
+
+    assert numerals[0] == "II"
+    moves = Counter(zip(numerals, numerals[1:]))
+    for (numeral, target), count in moves.items():
+        assert target in TRANSITIONS[numeral]
+    from_v = sum(count for (numeral, _), count in moves.items() if numeral == "V")
+    assert moves["V", "I"] / from_v == pytest.approx(6 / 9, abs=0.03)
+
+
+def test_walks_are_seeded():
+    generator = MarkovGenerator()
+
+    first = list(generator.numerals(seed=42, length=100))
+
+    assert first == list(generator.numerals(seed=42, length=100))
+    assert first == list(generator.numerals(seed=random.Random(42), length=100))
+    assert first != list(generator.numerals(seed=43, length=100))
+
+
+def test_numerals_are_endless():
+    walk = MarkovGenerator().numerals(seed=0)
+
+    assert len(list(islice(walk, 1000))) == 1000
+    assert next(walk) in TRANSITIONS
+
+
+def test_from_corpus():
+    generator = MarkovGenerator.from_corpus([("I", "IV", "V"), ("i", "v")])
+
+    assert generator.transitions == {
+        "I": {"IV": 0.5, "V": 0.5},
+        "IV": {"V": 1.0},
+        "V": {"I": 1.0},
+    }
+    assert set(generator.numerals(seed=3, length=100)) == {"I", "IV", "V"}
+
+
+def test_from_corpus_smoothing():
+    generator = MarkovGenerator.from_corpus([("I", "V")], smoothing=1)
+
+    assert generator.transitions["I"] == {"I": 1 / 3, "V": 2 / 3}
+
+
+@pytest.mark.parametrize("transitions,message", [
+    pytest.param({"I": {"V": 1}}, "Numeral 'V' has no transitions", id="dead_end"),
+    pytest.param({"I": {"IX": 1}}, "Invalid chord numeral 'IX'", id="invalid_numeral"),
+    pytest.param({"I": {"I": 0}}, "must be non-negative with a positive sum", id="zero_row"),
+])
+def test_invalid_transitions_raise_value_error(transitions, message):
+    with pytest.raises(ValueError, match=message):
+        MarkovGenerator(transitions)
+
+
+def test_invalid_start_raises_value_error_at_once():
+    generator = MarkovGenerator.from_corpus([("I", "V")])
+
+    with pytest.raises(ValueError, match="Numeral 'IV' has no transitions"):
+        generator.chords(start="IV")
+
+
+def test_chords_stream_to_midi_file(tmp_path):
+    generator = MarkovGenerator()
+    output_file = tmp_path / "practice.mid"
+
+    stream_midi_file_from_chord_sequence(str(output_file), generator.chords(key="D", seed=7, length=500))
+
+    expected = [triads("D")[numeral] for numeral in generator.numerals(seed=7, length=500)]
+    notes = [message.note for message in mido.MidiFile(output_file) if message.type == "note_on"]
+    assert notes == [note for chord in expected for note in chord]
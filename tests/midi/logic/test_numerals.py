@@ -0,0 +1,104 @@
+import pytest
+
+from simplejam.midi.chord import Chord
+from simplejam.midi.keys import C_major, D_major
+from simplejam.midi.logic import generators
+from simplejam.midi.logic.generators import generate_number_chord_sequence, resolve_progression
+from simplejam.midi.logic.numerals import (
+    Numeral,
+    interval_mask,
+    mask_intervals,
+    numeral_chord,
+    parse_numeral,
+)
+from simplejam.schemas import KeyChordProgression
+
+
+@pytest.mark.parametrize("intervals,mask", [
+    pytest.param((), 0, id="empty"),
+    pytest.param((0, 4, 7), 0b10010001, id="major_triad"),
+    pytest.param((0, 3, 7, 10, 14), 0b100010010001001, id="minor_ninth"),
+])
+def test_interval_mask_round_trips(intervals, mask):
+    assert interval_mask(intervals) == mask
+    assert mask_intervals(mask) == intervals
+
+
+@pytest.mark.parametrize("numeral,expected", [
+    pytest.param("V", Numeral(4, None, 0, 3), id="triad"),
+    pytest.param("ii9", Numeral(1, None, 0, 5), id="ninth"),
+    pytest.param("viio7", Numeral(6, None, interval_mask((0, 3, 6, 9)), 0), id="alias"),
+    pytest.param("bVII", Numeral(6, -1, interval_mask((0, 4, 7)), 0), id="borrowed_major"),
+    pytest.param("bvi7", Numeral(5, -1, interval_mask((0, 3, 7, 10)), 0), id="borrowed_minor"),
+    pytest.param("#IVdim", Numeral(3, 1, interval_mask((0, 3, 6)), 0), id="borrowed_quality"),
+])
+def test_parse_numeral(numeral, expected):
+    assert parse_numeral(numeral) == expected
+
+
+@pytest.mark.parametrize("numeral,message", [
+    pytest.param("", "Invalid chord numeral ''", id="empty"),
+    pytest.param("X", "Invalid chord numeral 'X'", id="not_roman"),
+    pytest.param("IIII", "Invalid chord numeral 'IIII'", id="not_a_degree"),
+    pytest.param("Vi", "Invalid chord quality 'i' in 'Vi'", id="mixed_case"),
+    pytest.param("V8", "Invalid chord quality '8' in 'V8'", id="invalid_quality"),
+])
+def test_parse_numeral_invalid_raises_value_error(numeral, message):
+    with pytest.raises(ValueError, match=message):
+        parse_numeral(numeral)
+
+
+@pytest.mark.parametrize("key,numeral,expected", [
+    pytest.param("C", "I", [60, 64, 67], id="triad"),
+    pytest.param("C", "V7", [67, 71, 74, 77], id="dominant_seventh"),
+    pytest.param("C", "vii7", [71, 74, 77, 81], id="half_diminished"),
+    pytest.param("C", "ii9", [62, 65, 69, 72, 76], id="minor_ninth"),
+    pytest.param("C", "IV13", [65, 69, 72, 76, 79, 83, 86], id="thirteenth"),
+    pytest.param("C", "Vsus4", [67, 72, 74], id="sus4"),
+    pytest.param("C", "viio7", [71, 74, 77, 80], id="diminished_seventh"),
+    pytest.param("C", "IVm", [65, 68, 72], id="minor_iv"),
+    pytest.param("C", "bVII", [70, 74, 77], id="flat_seven"),
+    pytest.param("C", "bvi", [68, 71, 75], id="borrowed_minor"),
+    pytest.param("C", "bVII7", [70, 74, 77, 80], id="borrowed_dominant"),
+    pytest.param("Am", "V7", [76, 79, 83, 86], id="minor_key"),
+    pytest.param("Am", "bVII", [79, 83, 86], id="minor_key_borrowed"),
+    pytest.param("D dorian", "IV7", [67, 71, 74, 77], id="dorian_iv7"),
+])
+def test_numeral_chord(key, numeral, expected):
+    assert list(numeral_chord(key, numeral)) == expected
+
+
+def test_numeral_chord_matches_diatonic_tables():
+    for numeral, chord in D_major.DiatonicTriads.items():
+        assert numeral_chord("D", numeral) is Chord(chord)
+    for numeral, chord in D_major.DiatonicSevenths.items():
+        assert numeral_chord("D", numeral + "7") is Chord(chord)
+
+
+def test_generate_number_chord_sequence_with_qualities():
+    progression = KeyChordProgression(key="C", number_chord_sequence=("ii7", "V7", "I", "bVII"))
+
+    result = generate_number_chord_sequence([progression], cache=None)
+
+    assert result[2] == C_major.DiatonicTriads["I"]
+    assert [list(Chord(chord)) for chord in result] == [
+        [62, 65, 69, 72],
+        [67, 71, 74, 77],
+        [60, 64, 67],
+        [70, 74, 77],
+    ]
+
+
+def test_cache_key_keeps_qualities():
+    progression = KeyChordProgression(key="C", number_chord_sequence=("ii", "bvi", "bVI", "IVm"))
+
+    assert progression.cache_key() == ("C", ("II", "bvi", "bVI", "IVm"))
+
+
+def test_resolve_progression_leaves_key_tables_alone():
+    resolve_progression("C", ("V7", "bVII", "I"))
+
+    assert list(generators._key_triads("C")) == list(C_major.DiatonicTriads)
+    assert generators._key_triads("C") is C_major.DiatonicTriads
+    assert generators._key_triads(" c") is C_major.DiatonicTriads
+    assert generators._key_triads.cache_info().maxsize == 1024
@@ -0,0 +1,61 @@
+import pytest
+
+from simplejam.midi.keys import C_major
+from simplejam.midi.logic.generators import generate_number_chord_sequence
+from simplejam.midi.logic.search import Match, pitch_class_mask, search_progression
+from simplejam.schemas import KeyChordProgression
+
+
+@pytest.mark.parametrize("chord,expected_mask", [
+    pytest.param(C_major.DiatonicTriads["I"], 0b000010010001, id="scale_notes"),
+    pytest.param((67, 71, 74, 77), 0b100010100100, id="note_numbers"),
+    pytest.param((48, 60, 72), 0b1, id="octaves"),
+    pytest.param(0b1000010010001, 0b000010010001, id="mask")
+])
+def test_pitch_class_mask(chord, expected_mask):
+    assert pitch_class_mask(chord) == expected_mask
+
+
+@pytest.mark.parametrize("key,numerals", [
+    pytest.param("C", ("I", "IV", "V", "I"), id="c_major"),
+    pytest.param("G", ("I", "VI", "II", "V"), id="g_major"),
+    pytest.param("F#m", ("I", "IV", "V", "I"), id="f_sharp_minor"),
+    pytest.param("Bb", ("II", "V", "I"), id="b_flat_ii_v_i")
+])
+def test_search_progression_finds_generated_progression(key, numerals):
+    chord_sequence = generate_number_chord_sequence(
+        [KeyChordProgression(key=key, number_chord_sequence=numerals)]
+    )
+
+    matches = search_progression(chord_sequence)
+
+    assert matches[0] == Match(key, numerals, 1.0)
+    assert all(match.fit == 1.0 for match in matches[:3])
+
+
+def test_search_progression_ranks_by_fit():
+    # I and IV of C, then a chord that is not diatonic in C
+    matches = search_progression([(60, 64, 67), (65, 69, 72), (62, 66, 69)], limit=200)
+    by_key = {match.key: match for match in matches}
+
+    assert [match.fit for match in matches] == sorted((match.fit for match in matches), reverse=True)
+    assert by_key["C"] == Match("C", ("I", "IV", None), pytest.approx(2 / 3))
+    assert by_key["G"].numerals == ("IV", None, "V")
+    assert matches[0].key == "C"
+
+
+def test_search_progression_sevenths_and_partial_matches():
+    # G7 is exact in C, C with an added 9th only contains the C triad
+    matches = search_progression([(67, 71, 74, 77), (60, 62, 64, 67)], limit=200)
+    by_key = {match.key: match for match in matches}
+
+    assert by_key["C"] == Match("C", ("V", "I"), 0.75)
+
+
+@pytest.mark.parametrize("chords,limit,expected_count", [
+    pytest.param([], 10, 0, id="empty"),
+    pytest.param([(60, 61, 62)], 10, 0, id="cluster"),
+    pytest.param([(60, 64, 67)], 3, 3, id="limit")
+])
+def test_search_progression_result_count(chords, limit, expected_count):
+    assert len(search_progression(chords, limit=limit)) == expected_count
@@ -0,0 +1,107 @@
+import pytest
+
+from simplejam.instrumentation import instruments
+from simplejam.midi.chord import Chord, triads
+from simplejam.midi.keys import C_major
+from simplejam.midi.logic.voicing import candidate_voicings, movement, voice_chords
+
+
+@pytest.mark.parametrize("a,b,expected", [
+    pytest.param((60, 64, 67), (60, 64, 67), 0, id="same"),
+    pytest.param((60, 64, 67), (59, 62, 67), 3, id="voice_by_voice"),
+    pytest.param((67, 60, 64), (62, 59, 67), 3, id="unsorted"),
+    pytest.param((60, 64, 67), (59, 62, 65, 67), 4, id="triad_to_seventh"),
+    pytest.param((), (60, 64, 67), 0, id="from_rest"),
+])
+def test_movement(a, b, expected):
+    assert movement(a, b) == expected
+
+
+def test_candidate_voicings_are_closed_inversions_in_range():
+    voicings = candidate_voicings(triads("C")["I"], 55, 72)
+
+    assert [list(voicing) for voicing in voicings] == [
+        [55, 60, 64],
+        [60, 64, 67],
+        [64, 67, 72],
+    ]
+
+
+def test_candidate_voicings_keep_chord_without_voicing_in_range():
+    chord = Chord((60, 64, 67))
+
+    assert candidate_voicings(chord, 60, 62) == (chord,)
+
+
+@pytest.mark.parametrize("numerals,expected", [
+    pytest.param(
+        ("II", "V", "I"),
+        [[62, 65, 69], [62, 67, 71], [64, 67, 72]],
+        id="ii_v_i"
+    ),
+    pytest.param(
+        ("I", "IV", "V", "I"),
+        [[60, 64, 67], [60, 65, 69], [59, 62, 67], [60, 64, 67]],
+        id="i_iv_v_i"
+    ),
+])
+def test_voice_chords(numerals, expected):
+    chord_sequence = [C_major.DiatonicTriads[numeral] for numeral in numerals]
+
+    voiced = voice_chords(chord_sequence)
+
+    assert [list(chord) for chord in voiced] == expected
+    assert sum(movement(a, b) for a, b in zip(voiced, voiced[1:])) < sum(
+        movement(
+            [n.value for n in a], [n.value for n in b]
+        ) for a, b in zip(chord_sequence, chord_sequence[1:])
+    )
+
+
+def test_voice_chords_keeps_pitch_classes():
+    chord_sequence = [C_major.DiatonicTriads[numeral] for numeral in ("VI", "II", "V", "I")] * 50
+
+    voiced = voice_chords(chord_sequence, low=40, high=80)
+
+    assert len(voiced) == len(chord_sequence)
+    for chord, voicing in zip(chord_sequence, voiced):
+        assert {note % 12 for note in voicing} == {note.value % 12 for note in chord}
+        assert all(40 <= note <= 80 for note in voicing)
+
+
+def test_voice_chords_is_minimal():
+    chord_sequence = [triads("C")[numeral] for numeral in ("I", "VI", "IV", "V", "I")]
+
+    voiced = voice_chords(chord_sequence)
+
+    def best(index, previous):
+        # Exhaustive search of every path
+        if index == len(chord_sequence):
+            return 0
+        return min(
+            movement(previous, voicing) + best(index + 1, voicing)
+            for voicing in candidate_voicings(chord_sequence[index], 48, 72)
+        )
+
+    total = movement(chord_sequence[0], voiced[0]) + sum(
+        movement(a, b) for a, b in zip(voiced, voiced[1:])
+    )
+    assert total == best(0, chord_sequence[0])
+
+
+def test_voice_chords_empty_and_invalid_range():
+    assert voice_chords([]) == []
+    with pytest.raises(ValueError, match="low must not be above high"):
+        voice_chords([triads("C")["I"]], low=72, high=48)
+
+
+def test_voice_chords_is_timed():
+    instruments.reset()
+    instruments.enable()
+    try:
+        voice_chords([triads("C")["I"], triads("C")["V"]])
+    finally:
+        instruments.disable()
+
+    assert instruments.timers["voice_leading"][0] == 1
+    instruments.reset()
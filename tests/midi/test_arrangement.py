@@ -0,0 +1,123 @@
+import io
+
+import mido
+import pytest
+
+from simplejam.midi.arrangement import (
+    CLOSED_HI_HAT,
+    KICK,
+    SNARE,
+    bass_events,
+    chord_events,
+    drum_events,
+    generate_arrangement_from_chord_sequence,
+)
+from simplejam.midi.midifile import TimeSignature
+from simplejam.midi.keys import C_major
+
+
+def _absolute_messages(track):
+    tick = 0
+    messages = []
+    for message in track:
+        tick += message.time
+        if not message.is_meta:
+            messages.append((tick, message))
+    return messages
+
+
+@pytest.mark.parametrize("events", [
+    pytest.param(lambda: chord_events([[60, 64, 67], [67, 71, 74]], 1920), id="chords"),
+    pytest.param(lambda: bass_events([[60, 64, 67], [60, 64, 67]], 1920, 480, "root"), id="bass_root"),
+    pytest.param(lambda: bass_events([[60, 64, 67], [67, 71, 74]], 1440, 480, "root_fifth"), id="bass_root_fifth"),
+    pytest.param(lambda: drum_events(4, 1920, 480, "rock"), id="drums_rock"),
+    pytest.param(lambda: drum_events(3, 1440, 240, "four_on_the_floor"), id="drums_six_eight")
+])
+def test_events_are_in_tick_order(events):
+    result = list(events())
+
+    assert result == sorted(result)
+
+
+def test_bass_events_root_fifth():
+    result = list(bass_events([[60, 64, 67]], 1920, 480, "root_fifth"))
+
+    assert result == [
+        (0, 1, 0x91, 36, 100),
+        (960, 0, 0x81, 36, 100),
+        (960, 1, 0x91, 43, 100),
+        (1920, 0, 0x81, 43, 100),
+    ]
+
+
+@pytest.mark.parametrize("chords,expected", [
+    pytest.param([[60, 64, 67], [], [62, 65, 69]], [(0, 36), (1920, 36), (3840, 38), (5760, 38)], id="rest"),
+    pytest.param([[14, 18, 21]], [(0, 2), (1920, 2)], id="low_root"),
+    pytest.param([[0, 4, 7]], [(0, 0), (1920, 0)], id="lowest_note"),
+])
+def test_bass_events_stay_in_range(chords, expected):
+    result = list(bass_events(chords, 1920, 480))
+
+    assert [(tick, note) for tick, _, _, note, _ in result] == expected
+
+
+def test_drum_events_rock_bar():
+    hits = [(tick, note) for tick, _, status, note, _ in drum_events(1, 1920, 480) if status == 0x99]
+
+    assert hits == [
+        (0, KICK), (0, CLOSED_HI_HAT), (240, CLOSED_HI_HAT),
+        (480, SNARE), (480, CLOSED_HI_HAT), (720, CLOSED_HI_HAT),
+        (960, KICK), (960, CLOSED_HI_HAT), (1200, CLOSED_HI_HAT),
+        (1440, SNARE), (1440, CLOSED_HI_HAT), (1680, CLOSED_HI_HAT),
+    ]
+
+
+@pytest.mark.parametrize("bass,drums,expected_tracks", [
+    pytest.param("root", "rock", 4, id="full_band"),
+    pytest.param("root_fifth", None, 3, id="no_drums"),
+    pytest.param(None, None, 2, id="chords_only")
+])
+def test_generate_arrangement_from_chord_sequence(bass, drums, expected_tracks):
+    chord_sequence = [C_major.DiatonicTriads["I"], C_major.DiatonicTriads["V"]]
+
+    data = generate_arrangement_from_chord_sequence(
+        None, chord_sequence, tempo=100, time_signature=TimeSignature(3, 4), bass=bass, drums=drums
+    )
+
+    mid = mido.MidiFile(file=io.BytesIO(data))
+    assert mid.type == 1
+    assert len(mid.tracks) == expected_tracks
+    assert [m.type for m in mid.tracks[0]] == ["set_tempo", "time_signature", "end_of_track"]
+
+    chords = _absolute_messages(mid.tracks[1])
+    assert chords[0][1] == mido.Message("program_change", program=0)
+    assert [(tick, m.type, m.note) for tick, m in chords[1:] if m.type == "note_on"] == [
+        (0, "note_on", 60), (0, "note_on", 64), (0, "note_on", 67),
+        (1440, "note_on", 67), (1440, "note_on", 71), (1440, "note_on", 74),
+    ]
+    # Every track ends when the last chord is released
+    for track in mid.tracks[1:]:
+        assert max(tick for tick, _ in _absolute_messages(track)) <= 2880
+
+
+def test_generate_arrangement_from_chord_sequence_saves_file(tmp_path):
+    output_file = tmp_path / "arrangement.mid"
+    chord_sequence = [C_major.DiatonicTriads["I"]]
+
+    result = generate_arrangement_from_chord_sequence(str(output_file), chord_sequence)
+
+    assert result is None
+    assert output_file.read_bytes() == bytes(generate_arrangement_from_chord_sequence(None, chord_sequence))
+
+
+@pytest.mark.parametrize("bass,drums,expected_error", [
+    pytest.param("walking", "rock", "Invalid bass pattern 'walking'", id="invalid_bass"),
+    pytest.param("root", "samba", "Invalid drum pattern 'samba'", id="invalid_drums")
+])
+def test_generate_arrangement_from_chord_sequence_invalid_pattern(tmp_path, bass, drums, expected_error):
+    output_file = tmp_path / "arrangement.mid"
+
+    with pytest.raises(ValueError, match=expected_error):
+        generate_arrangement_from_chord_sequence(str(output_file), [C_major.DiatonicTriads["I"]], bass=bass, drums=drums)
+
+    assert not output_file.exists()
@@ -0,0 +1,166 @@
+import os
+from enum import Enum
+from unittest.mock import patch
+
+import pytest
+
+from simplejam.midi import cache as cache_module
+from simplejam.midi.cache import OutputCache, default_output_cache, render_key
+from simplejam.midi.midifile import TimeSignature, generate_midi_file_from_chord_sequence
+
+
+class MockScale(Enum):
+    C4 = 60
+    E4 = 64
+    G4 = 67
+    A4 = 69
+
+
+CHORDS = [(MockScale.C4, MockScale.E4, MockScale.G4), (MockScale.A4, MockScale.C4, MockScale.E4)]
+
+
+@pytest.mark.parametrize("other_inputs", [
+    pytest.param((CHORDS[:1], 60, 4, 4), id="different_chords"),
+    pytest.param(([CHORDS[0] + CHORDS[1]], 60, 4, 4), id="merged_chords"),
+    pytest.param((CHORDS, 61, 4, 4), id="different_tempo"),
+    pytest.param((CHORDS, 60, 3, 4), id="different_time_signature")
+])
+def test_render_key_depends_on_all_inputs(other_inputs):
+    key = render_key(CHORDS, 60, 4, 4)
+    
+    assert key == render_key(list(CHORDS), 60, 4, 4)
+    assert key != render_key(*other_inputs)
+
+
+def write_file(path, size):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return str(path)
+
+
+def test_output_cache_store_and_fetch(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    source = write_file(tmp_path / "source.mid", 10)
+    output = write_file(tmp_path / "output.mid", 3)
+    
+    assert not cache.fetch("abc", output)
+    cache.store("abc", source)
+    assert cache.fetch("abc", output)
+    
+    assert open(output, "rb").read() == b"x" * 10
+    assert os.path.samefile(output, tmp_path / "cache" / "abc.mid")
+    assert sorted(os.listdir(tmp_path)) == ["cache", "output.mid", "source.mid"]
+    assert (cache.hits, cache.misses, cache.total_bytes) == (1, 1, 10)
+
+
+def test_output_cache_evicts_least_recently_used(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"), max_bytes=25)
+    for digest in ("a", "b"):
+        cache.store(digest, write_file(tmp_path / f"{digest}.mid", 10))
+    assert cache.fetch("a", str(tmp_path / "out.mid"))
+    
+    cache.store("c", write_file(tmp_path / "c.mid", 10))
+    
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert not (tmp_path / "cache" / "b.mid").exists()
+    assert (cache.evictions, cache.total_bytes) == (1, 20)
+
+
+def test_output_cache_reloads_index(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    cache.store("a", write_file(tmp_path / "a.mid", 5))
+    cache.store("b", write_file(tmp_path / "b.mid", 7))
+    os.remove(tmp_path / "cache" / "a.mid")
+    
+    reloaded = OutputCache(str(tmp_path / "cache"))
+    
+    assert len(reloaded) == 1 and "b" in reloaded
+    assert reloaded.total_bytes == 7
+
+
+def test_output_cache_fetch_missing_file(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    cache.store("a", write_file(tmp_path / "a.mid", 5))
+    os.remove(tmp_path / "cache" / "a.mid")
+    
+    assert not cache.fetch("a", str(tmp_path / "out.mid"))
+    assert sorted(os.listdir(tmp_path)) == ["a.mid", "cache"]
+    assert "a" not in cache
+    assert (cache.hits, cache.misses, cache.total_bytes) == (0, 1, 0)
+
+
+def test_output_cache_fetch_into_missing_directory_keeps_entry(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    cache.store("a", write_file(tmp_path / "a.mid", 5))
+
+    with pytest.raises(FileNotFoundError):
+        cache.fetch("a", str(tmp_path / "missing" / "out.mid"))
+    assert "a" in cache
+    assert cache.total_bytes == 5
+
+
+def test_output_cache_journals_stores(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"), max_bytes=25)
+    for digest in ("a", "b"):
+        cache.store(digest, write_file(tmp_path / f"{digest}.mid", 10))
+    assert cache.fetch("a", str(tmp_path / "out.mid"))
+    cache.store("c", write_file(tmp_path / "c.mid", 10))
+
+    reloaded = OutputCache(str(tmp_path / "cache"), max_bytes=25)
+
+    assert not (tmp_path / "cache" / "index.json").exists()
+    assert list(reloaded._entries.items()) == [("a", 10), ("c", 10)]
+    assert reloaded.total_bytes == 20
+
+
+def test_output_cache_flushes_journal_into_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "JOURNAL_SLACK", 0)
+    cache = OutputCache(str(tmp_path / "cache"))
+    source = write_file(tmp_path / "a.mid", 1)
+    cache.store("a", source)
+    cache.store("b", source)
+    assert (tmp_path / "cache" / "index.log").read_text() == "+a 1\n+b 1\n"
+
+    # Storing a again outgrows the index
+    cache.store("a", source)
+    cache.store("c", source)
+    reloaded = OutputCache(str(tmp_path / "cache"))
+
+    assert (tmp_path / "cache" / "index.log").read_text() == "+c 1\n"
+    assert list(reloaded._entries) == ["b", "a", "c"]
+
+
+def test_generate_midi_file_from_chord_sequence_uses_cache(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    first = str(tmp_path / "first.mid")
+    second = str(tmp_path / "second.mid")
+    
+    generate_midi_file_from_chord_sequence(first, CHORDS, time_signature=TimeSignature(3, 4), cache=cache)
+    with patch("simplejam.midi.midifile.SingleTrackMidiFile") as mock_single_track_midi_file:
+        generate_midi_file_from_chord_sequence(second, CHORDS, time_signature=TimeSignature(3, 4), cache=cache)
+    
+    mock_single_track_midi_file.assert_not_called()
+    assert open(first, "rb").read() == open(second, "rb").read()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@patch("simplejam.midi.cache._default_cache", None)
+def test_default_output_cache(tmp_path):
+    with patch("simplejam.config.OUTPUT_FILES_DIRECTORY", str(tmp_path), create=True):
+        cache = default_output_cache()
+    
+    assert cache.directory == os.path.join(str(tmp_path), ".cache")
+    assert default_output_cache() is cache
+    assert cache_module._default_cache is cache
+
+
+def test_generate_midi_file_from_chord_sequence_in_memory_uses_cache(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    
+    first = generate_midi_file_from_chord_sequence(None, CHORDS, cache=cache)
+    with patch("simplejam.midi.midifile.SingleTrackMidiFile") as mock_single_track_midi_file:
+        second = generate_midi_file_from_chord_sequence(None, CHORDS, cache=cache)
+    
+    mock_single_track_midi_file.assert_not_called()
+    assert bytes(first) == bytes(second)
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
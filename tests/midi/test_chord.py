@@ -0,0 +1,130 @@
+import copy
+import gc
+import pickle
+
+import pytest
+
+from simplejam.midi import chord as chord_module
+from simplejam.midi.arrangement import generate_arrangement_from_chord_sequence
+from simplejam.midi.cache import render_key
+from simplejam.midi.chord import Chord, as_chord, chord_notes, sevenths, triads
+from simplejam.midi.keys import C_major, D_major
+from simplejam.midi.midifile import (
+    generate_midi_file_from_chord_sequence,
+    stream_midi_file_from_chord_sequence,
+)
+
+ENUM_CHORDS = [
+    C_major.DiatonicTriads["I"],
+    C_major.DiatonicSevenths["V"],
+    D_major.DiatonicTriads["IV"],
+    C_major.DiatonicTriads["I"],
+]
+CHORDS = [Chord(chord) for chord in ENUM_CHORDS]
+
+
+@pytest.mark.parametrize("notes", [
+    pytest.param((60, 64, 67), id="ints"),
+    pytest.param([60, 64, 67], id="list"),
+    pytest.param(b"\x3c\x40\x43", id="bytes"),
+    pytest.param(C_major.DiatonicTriads["I"], id="scale_notes"),
+    pytest.param((C_major.CMajorScale.C4, 64, 67), id="mixed"),
+])
+def test_chord_is_interned(notes):
+    chord = Chord(notes)
+
+    assert chord is Chord((60, 64, 67))
+    assert chord.notes == b"\x3c\x40\x43"
+    assert list(chord) == [60, 64, 67]
+    assert len(chord) == 3
+    assert chord[-1] == 67
+    assert repr(chord) == "Chord(60, 64, 67)"
+
+
+def test_chord_is_immutable():
+    chord = Chord((60, 64, 67))
+
+    with pytest.raises(AttributeError, match="Chord is immutable"):
+        chord.notes = b"\x3e"
+    assert not hasattr(chord, "__dict__")
+
+
+@pytest.mark.parametrize("notes", [
+    pytest.param((60, 128), id="above_127"),
+    pytest.param((-1,), id="negative"),
+])
+def test_chord_invalid_note_raises_value_error(notes):
+    with pytest.raises(ValueError):
+        Chord(notes)
+
+
+def test_chord_stays_interned_through_pickle_and_copy():
+    chord = Chord((62, 66, 69))
+
+    assert pickle.loads(pickle.dumps(chord)) is chord
+    assert copy.copy(chord) is chord
+    assert copy.deepcopy([chord])[0] is chord
+
+
+def test_unused_chords_are_freed():
+    before = len(chord_module._INTERNED)
+    chords = [Chord((i, i + 1)) for i in range(100)]
+    assert len(chord_module._INTERNED) >= before + 90
+
+    del chords
+    gc.collect()
+
+    assert len(chord_module._INTERNED) <= before
+
+
+def test_key_chords_are_cached_per_key():
+    assert triads(" c major") is triads("C")
+    assert sevenths("C ionian") is sevenths("C")
+
+
+def test_key_chords_match_scale_enums():
+    assert [as_chord(chord) for chord in C_major.DiatonicTriads.values()] == list(triads("C").values())
+    assert sevenths("D")["V"] is Chord(D_major.DiatonicSevenths["V"])
+
+
+def test_to_scale_notes_round_trips():
+    assert triads("C")["II"].to_scale_notes(C_major.CMajorScale) == C_major.DiatonicTriads["II"]
+    with pytest.raises(ValueError):
+        # F#4 is not in C major
+        triads("D")["I"].to_scale_notes(C_major.CMajorScale)
+
+
+@pytest.mark.parametrize("chord", [
+    pytest.param(Chord((60, 64, 67)), id="chord"),
+    pytest.param(C_major.DiatonicTriads["I"], id="scale_notes"),
+    pytest.param((60, 64, 67), id="ints"),
+    pytest.param((C_major.CMajorScale.C4, 64, 67), id="mixed"),
+])
+def test_chord_notes(chord):
+    assert list(chord_notes(chord)) == [60, 64, 67]
+
+
+@pytest.mark.parametrize("kwargs", [
+    pytest.param({"encoder": "bytes"}, id="bytes"),
+    pytest.param({"encoder": "mido"}, id="mido"),
+    pytest.param({"encoder": "bytes", "rhythm": "arpeggio"}, id="rhythm"),
+    pytest.param({"encoder": "mido", "durations": [2, 4, 1, 1]}, id="durations"),
+])
+def test_chords_render_like_scale_enums(kwargs):
+    expected = generate_midi_file_from_chord_sequence(None, ENUM_CHORDS, **kwargs)
+
+    assert bytes(generate_midi_file_from_chord_sequence(None, CHORDS, **kwargs)) == bytes(expected)
+
+
+def test_chords_stream_and_arrange_like_scale_enums(tmp_path):
+    stream_midi_file_from_chord_sequence(str(tmp_path / "enums.mid"), iter(ENUM_CHORDS))
+    stream_midi_file_from_chord_sequence(str(tmp_path / "chords.mid"), iter(CHORDS))
+
+    assert (tmp_path / "chords.mid").read_bytes() == (tmp_path / "enums.mid").read_bytes()
+    assert bytes(generate_arrangement_from_chord_sequence(None, CHORDS)) == bytes(
+        generate_arrangement_from_chord_sequence(None, ENUM_CHORDS)
+    )
+
+
+def test_chords_share_render_key_with_scale_enums():
+    assert render_key(CHORDS, 60, 4, 4) == render_key(ENUM_CHORDS, 60, 4, 4)
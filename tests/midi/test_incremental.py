@@ -0,0 +1,216 @@
+import os
+
+import pytest
+
+from simplejam.midi import incremental
+from simplejam.midi.chord import Chord, triads
+from simplejam.midi.incremental import (
+    PatchResult,
+    open_incremental,
+    patch_midi_file,
+    read_bar_index,
+    render_incremental,
+    sidecar_path,
+)
+from simplejam.midi.midifile import TimeSignature, generate_midi_file_from_chord_sequence
+from simplejam.midi.rhythm import RHYTHMS
+
+C = triads("C")
+SONG = [C[numeral] for numeral in ("I", "VI", "IV", "V") * 8]
+SEVENTH = Chord([67, 71, 74, 77])
+
+
+def full_render(tmp_path, chord_sequence, **kwargs):
+    output_file = str(tmp_path / "full.mid")
+    generate_midi_file_from_chord_sequence(output_file, chord_sequence, encoder="bytes", **kwargs)
+    with open(output_file, "rb") as f:
+        return f.read()
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("kwargs", [
+    pytest.param({}, id="block_chords"),
+    *[pytest.param({"rhythm": name}, id=name) for name in RHYTHMS],
+    pytest.param({"rhythm": "arpeggio", "time_signature": TimeSignature(6, 8)}, id="six_eight"),
+    pytest.param({"durations": [1, 2, 0.5, 4] * 8}, id="durations"),
+])
+def test_render_incremental_matches_full_render(tmp_path, kwargs):
+    output_file = str(tmp_path / "song.mid")
+
+    midi = render_incremental(output_file, SONG, **kwargs)
+
+    assert len(midi) == len(SONG)
+    assert read(output_file) == full_render(tmp_path, SONG, **kwargs)
+    assert read_bar_index(output_file) == midi.index
+
+
+@pytest.mark.parametrize("kwargs", [
+    pytest.param({}, id="block_chords"),
+    *[pytest.param({"rhythm": name}, id=name) for name in RHYTHMS],
+    pytest.param({"durations": [1, 2, 0.5, 4] * 8}, id="durations"),
+])
+@pytest.mark.parametrize("edit", [
+    pytest.param(lambda song: song.__setitem__(5, C["II"]), id="same_size"),
+    pytest.param(lambda song: song.__setitem__(5, SEVENTH), id="resize"),
+    pytest.param(lambda song: song.__setitem__(5, ()), id="empty"),
+    pytest.param(lambda song: song.__setitem__(31, ()), id="empty_last"),
+    pytest.param(lambda song: song.extend([SEVENTH, C["I"]]), id="append"),
+    pytest.param(lambda song: song.__delitem__(slice(3, 6)), id="delete"),
+    pytest.param(lambda song: song.clear(), id="clear"),
+])
+def test_patch_midi_file_matches_full_render(tmp_path, kwargs, edit):
+    output_file = str(tmp_path / "song.mid")
+    render_incremental(output_file, SONG, **kwargs)
+    song = list(SONG)
+    edit(song)
+    durations = kwargs.get("durations")
+    if durations is not None:
+        kwargs = {"durations": durations[: len(song)] + [3] * (len(song) - len(durations))}
+
+    patch_midi_file(output_file, song, **kwargs)
+
+    assert read(output_file) == full_render(tmp_path, song, **kwargs)
+
+
+def test_patch_same_size_is_in_place(tmp_path):
+    output_file = str(tmp_path / "song.mid")
+    render_incremental(output_file, SONG)
+    song = list(SONG)
+    song[5] = C["II"]
+
+    result = patch_midi_file(output_file, song)
+
+    assert result == PatchResult(bars=32, encoded=1, in_place=True)
+
+
+def test_patch_encodes_next_bar_when_its_rest_changed(tmp_path):
+    output_file = str(tmp_path / "song.mid")
+    midi = render_incremental(output_file, SONG, rhythm="syncopated")
+
+    result = midi.patch({5: ()})
+
+    assert result.encoded == 2
+    song = list(SONG)
+    song[5] = ()
+    assert read(output_file) == full_render(tmp_path, song, rhythm="syncopated")
+
+
+def test_patch_by_bar(tmp_path):
+    output_file = str(tmp_path / "song.mid")
+    midi = render_incremental(output_file, SONG, rhythm="arpeggio")
+
+    result = midi.patch({0: SEVENTH, 20: C["III"]})
+
+    assert result.encoded == 2
+    song = list(SONG)
+    song[0], song[20] = SEVENTH, C["III"]
+    assert read(output_file) == full_render(tmp_path, song, rhythm="arpeggio")
+    assert open_incremental(output_file, rhythm="arpeggio").index == midi.index
+
+
+def test_patch_bar_out_of_range_raises_index_error(tmp_path):
+    midi = render_incremental(str(tmp_path / "song.mid"), SONG)
+
+    with pytest.raises(IndexError, match="Bar 32 out of range for 32 bars"):
+        midi.patch({32: SEVENTH})
+
+
+def test_patch_file_changed_since_raises_value_error(tmp_path):
+    output_file = str(tmp_path / "song.mid")
+    midi = render_incremental(output_file, SONG)
+    generate_midi_file_from_chord_sequence(output_file, SONG[:4], encoder="bytes")
+
+    with pytest.raises(ValueError, match="was changed since it was indexed"):
+        midi.patch({0: SEVENTH})
+
+
+@pytest.mark.parametrize("setup", [
+    pytest.param(lambda path: os.remove(sidecar_path(path)), id="missing_sidecar"),
+    pytest.param(lambda path: open(path, "ab").close() or os.utime(path, ns=(0, 0)), id="stale_sidecar"),
+    pytest.param(lambda path: open(sidecar_path(path), "wb").close(), id="corrupt_sidecar"),
+])
+def test_patch_without_index_renders_in_full(tmp_path, monkeypatch, setup):
+    # Start from a new process, without the files opened lately
+    monkeypatch.setattr(incremental, "RECENT_FILES", 0)
+    output_file = str(tmp_path / "song.mid")
+    render_incremental(output_file, SONG)
+    setup(output_file)
+    song = list(SONG)
+    song[5] = SEVENTH
+
+    result = patch_midi_file(output_file, song)
+
+    assert result == PatchResult(bars=32, encoded=32, in_place=False)
+    assert read(output_file) == full_render(tmp_path, song)
+
+
+def test_patch_other_variant_renders_in_full(tmp_path):
+    output_file = str(tmp_path / "song.mid")
+    render_incremental(output_file, SONG)
+
+    result = patch_midi_file(output_file, SONG, tempo=90, rhythm="strum")
+
+    assert result.encoded == 32
+    assert read(output_file) == full_render(tmp_path, SONG, tempo=90, rhythm="strum")
+    assert open_incremental(output_file) is None
+
+
+def test_patch_leaves_linked_files_alone(tmp_path):
+    output_file = str(tmp_path / "song.mid")
+    render_incremental(output_file, SONG)
+    linked = str(tmp_path / "linked.mid")
+    os.link(output_file, linked)
+    song = list(SONG)
+    song[5] = C["II"]
+
+    patch_midi_file(output_file, song)
+
+    assert read(output_file) == full_render(tmp_path, song)
+    assert read(linked) == full_render(tmp_path, SONG)
+
+
+def test_generate_midi_file_incremental(tmp_path):
+    output_file = str(tmp_path / "song.mid")
+    generate_midi_file_from_chord_sequence(output_file, SONG, rhythm="arpeggio", incremental=True)
+    song = list(SONG)
+    song[5] = SEVENTH
+
+    generate_midi_file_from_chord_sequence(output_file, song, rhythm="arpeggio", incremental=True)
+
+    assert read(output_file) == full_render(tmp_path, song, rhythm="arpeggio")
+    assert open_incremental(output_file, rhythm="arpeggio") is not None
+
+
+@pytest.mark.parametrize("fsync, calls", [
+    pytest.param(False, 0, id="no_fsync"),
+    pytest.param(True, 2, id="fsync"),
+])
+def test_generate_midi_file_incremental_patch_fsync(tmp_path, monkeypatch, fsync, calls):
+    output_file = str(tmp_path / "song.mid")
+    generate_midi_file_from_chord_sequence(output_file, SONG, incremental=True)
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+    song = list(SONG)
+    song[5] = C["II"]
+
+    generate_midi_file_from_chord_sequence(output_file, song, incremental=True, fsync=fsync)
+
+    # The file and its sidecar are patched in place
+    assert len(synced) == calls
+    assert read(output_file) == full_render(tmp_path, song)
+
+
+@pytest.mark.parametrize("kwargs", [
+    pytest.param({"output_file": None}, id="no_output_file"),
+    pytest.param({"cache": object()}, id="cache"),
+])
+def test_generate_midi_file_incremental_invalid_raises_value_error(tmp_path, kwargs):
+    kwargs = {"output_file": str(tmp_path / "song.mid"), **kwargs}
+
+    with pytest.raises(ValueError, match="incremental requires an output_file and no cache"):
+        generate_midi_file_from_chord_sequence(chord_sequence=SONG, incremental=True, **kwargs)
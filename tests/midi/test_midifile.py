@@ -1,8 +1,18 @@
+import os
+import threading
+import time
+import tracemalloc
+
+import mido
 import pytest
 from enum import Enum
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
 
-from simplejam.midi.midifile import generate_midi_file_from_chord_sequence, TimeSignature, SingleTrackMidiFile
+from simplejam.midi.midifile import generate_midi_file_from_chord_sequence, generate_midi_files_batch, stream_midi_file_from_chord_sequence, TimeSignature, SingleTrackMidiFile, ENCODERS, BatchJob
+from simplejam.midi.cache import render_key
+from simplejam.midi.chord import Chord
+from simplejam.midi.logic.generators import generate_number_chord_sequence
+from simplejam.schemas import KeyChordProgression
 
 
 class MockScale(Enum):
@@ -35,12 +45,8 @@ def test_generate_midi_file_from_chord_sequence(mock_single_track_midi_file, cho
     mock_midi_file_instance = MagicMock()
     mock_single_track_midi_file.return_value = mock_midi_file_instance
     
-    # Mock the MIDI file and track attributes properly
-    mock_mid = MagicMock()
-    mock_track = MagicMock()
-    mock_mid.tracks = [mock_track]
-    mock_mid.ticks_per_beat = 480  # Standard MIDI ticks per beat
-    mock_midi_file_instance.mid = mock_mid
+    # Mock the MIDI file attributes properly
+    mock_midi_file_instance.ticks_per_beat = 480  # Standard MIDI ticks per beat
     
     output_file = "test_output.mid"
     
@@ -52,20 +58,16 @@ def test_generate_midi_file_from_chord_sequence(mock_single_track_midi_file, cho
     generate_midi_file_from_chord_sequence(**kwargs)
     
     # Assertions
-    mock_single_track_midi_file.assert_called_once_with(output_file)
+    mock_single_track_midi_file.assert_called_once_with(output_file, encoder="mido", fsync=False)
     mock_midi_file_instance.set_tempo.assert_called_once_with(tempo)
     if time_signature is not None:
         mock_midi_file_instance.set_time_signature.assert_called_once_with(time_signature)
     mock_midi_file_instance.save.assert_called_once()
     
-    # Verify track.append was called for the expected number of messages
-    if expected_notes:
-        total_notes_events = sum(len(chord) for chord in expected_notes)
-        expected_messages = total_notes_events * 2  # note_on + note_off per note
-        assert mock_track.append.call_count == expected_messages
-    else:
-        # For empty sequence, no note messages should be added
-        assert mock_track.append.call_count == 0
+    # Every chord is held for a whole note
+    assert mock_midi_file_instance.add_chord.call_args_list == [
+        call(notes, 480 * 4) for notes in expected_notes
+    ]
 
 
 @pytest.mark.parametrize("denominator", [
@@ -166,24 +168,302 @@ def test_single_track_midi_file_set_time_signature(mock_midi_track, mock_midi_fi
     pytest.param(True, id="file_exists"),
     pytest.param(False, id="file_does_not_exist")
 ])
-@patch('simplejam.midi.midifile.os.remove')
-@patch('simplejam.midi.midifile.os.path.exists')
+@pytest.mark.parametrize("encoder", [pytest.param(encoder, id=encoder) for encoder in ENCODERS])
+def test_single_track_midi_file_save(tmp_path, file_exists, encoder):
+    output_file = tmp_path / "test.mid"
+    if file_exists:
+        output_file.write_bytes(b"old")
+    midi_file = SingleTrackMidiFile(str(output_file), encoder=encoder)
+    midi_file.add_chord([60, 64, 67], 1920)
+    
+    with patch('simplejam.midi.midifile.os.remove') as mock_remove:
+        midi_file.save()
+    
+    # Replaced, never removed first
+    mock_remove.assert_not_called()
+    assert output_file.read_bytes() == midi_file.to_bytes()
+    assert os.listdir(tmp_path) == ["test.mid"]
+
+
+def test_single_track_midi_file_save_failure_keeps_old_file(tmp_path):
+    output_file = tmp_path / "test.mid"
+    output_file.write_bytes(b"old")
+    midi_file = SingleTrackMidiFile(str(output_file), encoder="bytes")
+    
+    with patch('simplejam.midi.atomic.os.replace', side_effect=OSError("disk full")):
+        with pytest.raises(OSError, match="disk full"):
+            midi_file.save()
+    
+    assert output_file.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["test.mid"]
+
+
+@pytest.mark.parametrize("fsync", [
+    pytest.param(True, id="fsync"),
+    pytest.param(False, id="no_fsync")
+])
+def test_single_track_midi_file_save_fsync(tmp_path, fsync):
+    midi_file = SingleTrackMidiFile(str(tmp_path / "test.mid"), encoder="bytes", fsync=fsync)
+    
+    with patch('simplejam.midi.atomic.os.fsync') as mock_fsync:
+        midi_file.save()
+    
+    # The file, then its directory
+    assert mock_fsync.call_count == (2 if fsync else 0)
+
+
+def test_concurrent_renders_of_the_same_file_are_coalesced(tmp_path):
+    output_file = str(tmp_path / "test.mid")
+    chord_sequence = [(MockScale.C4, MockScale.E4, MockScale.G4)] * 16
+    saves = []
+    keys = []
+    release = threading.Event()
+    save = SingleTrackMidiFile.save
+    
+    def blocking_save(self):
+        saves.append(self)
+        release.wait(5)
+        save(self)
+    
+    def counting_render_key(*args):
+        keys.append(threading.get_ident())
+        return render_key(*args)
+    
+    with patch.object(SingleTrackMidiFile, "save", blocking_save), \
+            patch('simplejam.midi.midifile.render_key', counting_render_key):
+        threads = [
+            threading.Thread(target=generate_midi_file_from_chord_sequence, args=(output_file, chord_sequence))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        # Every thread but the one rendering computes its key to compare it
+        deadline = time.monotonic() + 5
+        while len(set(keys)) < 7 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+    
+    assert len(saves) == 1
+    expected = tmp_path / "expected.mid"
+    generate_midi_file_from_chord_sequence(str(expected), chord_sequence)
+    assert (tmp_path / "test.mid").read_bytes() == expected.read_bytes()
+
+
+def test_concurrent_renders_of_the_same_file_from_other_inputs_run_in_turn(tmp_path):
+    output_file = str(tmp_path / "test.mid")
+    sequences = [[(MockScale.C4,)] * (i + 1) for i in range(6)]
+    active = []
+    overlaps = []
+    save = SingleTrackMidiFile.save
+    
+    def tracking_save(self):
+        active.append(self)
+        overlaps.append(len(active))
+        time.sleep(0.005)
+        save(self)
+        active.remove(self)
+    
+    with patch.object(SingleTrackMidiFile, "save", tracking_save):
+        threads = [
+            threading.Thread(target=generate_midi_file_from_chord_sequence, args=(output_file, sequence))
+            for sequence in sequences
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+    assert len(overlaps) == len(sequences)
+    assert max(overlaps) == 1
+    assert os.listdir(tmp_path) == ["test.mid"]
+
+
+@pytest.mark.parametrize("notes", [
+    pytest.param([60, 64, 67], id="triad"),
+    pytest.param([62], id="single_note")
+])
+@patch('simplejam.midi.midifile.Message')
 @patch('simplejam.midi.midifile.MidiFile')
 @patch('simplejam.midi.midifile.MidiTrack')
-def test_single_track_midi_file_save(mock_midi_track, mock_midi_file, mock_exists, mock_remove, file_exists):
-    mock_midi_file_instance = MagicMock()
+def test_single_track_midi_file_add_chord(mock_midi_track, mock_midi_file, mock_message, notes):
     mock_track_instance = MagicMock()
-    mock_midi_file.return_value = mock_midi_file_instance
     mock_midi_track.return_value = mock_track_instance
-    mock_exists.return_value = file_exists
     
-    output_file = "test.mid"
-    midi_file = SingleTrackMidiFile(output_file)
-    midi_file.save()
+    midi_file = SingleTrackMidiFile("test.mid")
+    midi_file.add_chord(notes, 1920)
     
-    mock_exists.assert_called_once_with(output_file)
-    if file_exists:
-        mock_remove.assert_called_once_with(output_file)
-    else:
-        mock_remove.assert_not_called()
-    mock_midi_file_instance.save.assert_called_once_with(output_file)
+    expected_calls = [call("note_on", note=note, velocity=90, time=0) for note in notes]
+    expected_calls += [
+        call("note_off", note=note, velocity=90, time=1920 if i == 0 else 0)
+        for i, note in enumerate(notes)
+    ]
+    assert mock_message.call_args_list == expected_calls
+    assert mock_track_instance.append.call_count == len(notes) * 2
+
+
+def test_single_track_midi_file_invalid_encoder_raises_value_error():
+    with pytest.raises(ValueError, match="Encoder must be one of: mido, bytes."):
+        SingleTrackMidiFile("test.mid", encoder="wav")
+
+
+@pytest.mark.parametrize("chord_sequence,tempo,time_signature", [
+    pytest.param(
+        [(MockScale.C4, MockScale.E4, MockScale.G4), (MockScale.F4, MockScale.A4, MockScale.C5)],
+        120,
+        TimeSignature(4, 4),
+        id="2 chords as input"
+    ),
+    pytest.param(
+        [(MockScale.C4,), (MockScale.C4,), (MockScale.G4, MockScale.C5)] * 50,
+        93,
+        TimeSignature(3, 8),
+        id="long_sequence"
+    ),
+    pytest.param(
+        [],
+        60,
+        TimeSignature(2, 2),
+        id="empty_sequence"
+    )
+])
+def test_generate_midi_file_from_chord_sequence_encoders_are_byte_identical(tmp_path, chord_sequence, tempo, time_signature):
+    outputs = {}
+    for encoder in ENCODERS:
+        output_file = tmp_path / f"{encoder}.mid"
+        generate_midi_file_from_chord_sequence(
+            str(output_file), chord_sequence, tempo=tempo, time_signature=time_signature, encoder=encoder
+        )
+        outputs[encoder] = output_file.read_bytes()
+    
+    assert outputs["bytes"] == outputs["mido"]
+
+
+@pytest.mark.parametrize("chord_sequence", [
+    pytest.param([Chord((60, 64, 67)), Chord(()), Chord((62, 65, 69))], id="rest_between"),
+    pytest.param([Chord(()), Chord((60, 64, 67)), Chord(())], id="rest_first_and_last"),
+])
+@pytest.mark.parametrize("rhythm", [pytest.param(None, id="no_rhythm"), pytest.param("block", id="block")])
+@pytest.mark.parametrize("encoder", [pytest.param(encoder, id=encoder) for encoder in ENCODERS])
+def test_generate_midi_file_from_chord_sequence_empty_chord_is_a_rest(tmp_path, chord_sequence, rhythm, encoder):
+    output_file = tmp_path / "rest.mid"
+
+    generate_midi_file_from_chord_sequence(str(output_file), chord_sequence, encoder=encoder, rhythm=rhythm)
+
+    assert mido.MidiFile(output_file).length == 12.0
+
+
+@pytest.mark.parametrize("workers,chunksize", [
+    pytest.param(1, None, id="inline"),
+    pytest.param(2, 1, id="process_pool"),
+    pytest.param(2, None, id="process_pool_default_chunksize")
+])
+def test_generate_midi_files_batch(tmp_path, workers, chunksize):
+    good = [KeyChordProgression(key="C", number_chord_sequence=("II", "V", "I"))]
+    bad = [KeyChordProgression(key="H", number_chord_sequence=("I",))]
+    jobs = [
+        BatchJob(str(tmp_path / "a.mid"), good, 120, TimeSignature(3, 4)),
+        (str(tmp_path / "b.mid"), bad, 60, TimeSignature(4, 4)),
+        BatchJob(str(tmp_path / "c.mid"), good),
+    ]
+    
+    results = generate_midi_files_batch(jobs, workers=workers, chunksize=chunksize)
+    
+    assert [r.output_file for r in results] == [job[0] for job in jobs]
+    assert [r.ok for r in results] == [True, False, True]
+    assert results[1].error.startswith("ValueError: Key 'H' is not supported.")
+    assert all(r.elapsed >= 0 for r in results)
+    assert not (tmp_path / "b.mid").exists()
+    
+    expected = tmp_path / "expected.mid"
+    generate_midi_file_from_chord_sequence(
+        str(expected), generate_number_chord_sequence(good), tempo=120, time_signature=TimeSignature(3, 4)
+    )
+    assert (tmp_path / "a.mid").read_bytes() == expected.read_bytes()
+
+
+def test_generate_midi_files_batch_empty():
+    assert generate_midi_files_batch([], workers=4) == []
+
+
+@pytest.mark.parametrize("kwargs,expected_error", [
+    pytest.param({"workers": 0}, "workers must be positive.", id="zero_workers"),
+    pytest.param({"workers": -2}, "workers must be positive.", id="negative_workers"),
+    pytest.param({"chunksize": 0}, "chunksize must be positive.", id="zero_chunksize"),
+])
+def test_generate_midi_files_batch_invalid_arguments_raise_value_error(kwargs, expected_error):
+    jobs = [BatchJob(None, [KeyChordProgression(key="C", number_chord_sequence=("I",))])]
+
+    with pytest.raises(ValueError, match=expected_error):
+        generate_midi_files_batch(jobs, **kwargs)
+
+
+@pytest.mark.parametrize("chord_count,flush_bytes", [
+    pytest.param(0, 64, id="empty_sequence"),
+    pytest.param(300, 64, id="many_flushes"),
+    pytest.param(300, 1 << 20, id="single_flush")
+])
+def test_stream_midi_file_from_chord_sequence_matches_generate(tmp_path, chord_count, flush_bytes):
+    chords = [(MockScale.C4, MockScale.E4, MockScale.G4), (MockScale.F4,), (MockScale.A4, MockScale.C5), ()]
+    expected = tmp_path / "expected.mid"
+    streamed = tmp_path / "streamed.mid"
+    generate_midi_file_from_chord_sequence(
+        str(expected), [chords[i % 4] for i in range(chord_count)], tempo=90, time_signature=TimeSignature(6, 8)
+    )
+    
+    stream_midi_file_from_chord_sequence(
+        str(streamed), (chords[i % 4] for i in range(chord_count)), tempo=90, time_signature=TimeSignature(6, 8), flush_bytes=flush_bytes
+    )
+    
+    assert streamed.read_bytes() == expected.read_bytes()
+
+
+def test_stream_midi_file_from_chord_sequence_bounded_memory(tmp_path):
+    chord = (MockScale.C4, MockScale.E4, MockScale.G4)
+    
+    def peak_bytes(chord_count):
+        tracemalloc.start()
+        stream_midi_file_from_chord_sequence(
+            str(tmp_path / "streamed.mid"), (chord for _ in range(chord_count)), flush_bytes=4096
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    
+    large_peak = peak_bytes(100_000)
+    assert (tmp_path / "streamed.mid").stat().st_size > 100_000 * 20
+    
+    # 100x more chords must not need noticeably more memory
+    assert large_peak < peak_bytes(1_000) + 16 * 1024
+
+
+@pytest.mark.parametrize("encoder", [pytest.param(encoder, id=encoder) for encoder in ENCODERS])
+def test_generate_midi_file_from_chord_sequence_in_memory(tmp_path, encoder):
+    chord_sequence = [(MockScale.C4, MockScale.E4, MockScale.G4), (MockScale.F4, MockScale.A4, MockScale.C5)]
+    output_file = tmp_path / "expected.mid"
+    generate_midi_file_from_chord_sequence(str(output_file), chord_sequence, tempo=100)
+    
+    with patch('simplejam.midi.midifile.os') as mock_os:
+        result = generate_midi_file_from_chord_sequence(None, chord_sequence, tempo=100, encoder=encoder)
+    
+    mock_os.assert_not_called()
+    assert mock_os.method_calls == []
+    assert isinstance(result, memoryview)
+    assert result.tobytes() == output_file.read_bytes()
+
+
+def test_single_track_midi_file_save_without_output_file_raises_value_error():
+    with pytest.raises(ValueError, match="save\\(\\) requires an output_file"):
+        SingleTrackMidiFile(None).save()
+
+
+def test_generate_midi_files_batch_in_memory(tmp_path):
+    progressions = [KeyChordProgression(key="G", number_chord_sequence=("I", "IV", "V"))]
+    expected = tmp_path / "expected.mid"
+    generate_midi_file_from_chord_sequence(str(expected), generate_number_chord_sequence(progressions))
+    
+    results = generate_midi_files_batch([BatchJob(None, progressions)] * 3, workers=2, chunksize=1)
+    
+    assert [r.output_file for r in results] == [None] * 3
+    assert all(r.ok and r.data == expected.read_bytes() for r in results)
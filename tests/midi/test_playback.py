@@ -0,0 +1,123 @@
+import mido
+import pytest
+import io
+import time
+
+from simplejam.midi.keys import C_major
+from simplejam.midi.midifile import generate_midi_file_from_chord_sequence
+from simplejam.midi.playback import NullOutput, Player, Timeline, load_timeline
+
+NOTE_ON_C = bytes((0x90, 60, 100))
+NOTE_OFF_C = bytes((0x80, 60, 100))
+
+
+def _short_file():
+    # Four beats per chord at 6000 bpm: 40 ms per chord
+    chord_sequence = [C_major.DiatonicTriads["I"], C_major.DiatonicTriads["V"]]
+    return bytes(generate_midi_file_from_chord_sequence(None, chord_sequence, tempo=6000, encoder="bytes"))
+
+
+def test_load_timeline_matches_mido():
+    data = _short_file()
+    mid = mido.MidiFile(file=io.BytesIO(data))
+
+    timeline = load_timeline(data)
+
+    assert [message for _, message in timeline.events] == [
+        bytes(message.bytes()) for message in mid if not message.is_meta
+    ]
+    assert timeline.events[0][0] == 0
+    assert timeline.events[-1][0] == pytest.approx(0.08)
+    assert timeline.duration == pytest.approx(mid.length)
+
+
+def test_load_timeline_missing_file_raises_file_not_found_error():
+    with pytest.raises(FileNotFoundError, match="MIDI file not found: /nonexistent/file.mid"):
+        load_timeline("/nonexistent/file.mid")
+
+
+class SimulatedClock:
+    """A clock that only moves when the player sleeps."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        return False
+
+
+def simulated_player():
+    clock = SimulatedClock()
+    output = NullOutput(record=True, clock=clock)
+    return Player(output, spin_seconds=0, clock=clock, sleep=clock.sleep), output
+
+
+def test_player_sends_events_on_time():
+    player, output = simulated_player()
+    timeline = load_timeline(_short_file())
+
+    with player:
+        player.play(timeline)
+        stats = player.stats()
+
+    sent = output.sent[: len(timeline.events)]
+    assert [message for _, message in sent] == [message for _, message in timeline.events]
+    start = sent[0][0]
+    for (sent_at, _), (offset, _) in zip(sent, timeline.events):
+        assert sent_at - start == pytest.approx(offset)
+    assert stats == (len(timeline.events), 1, 0.0, 0.0)
+
+
+def test_player_never_sends_early():
+    output = NullOutput(record=True)
+    timeline = load_timeline(_short_file())
+
+    with Player(output) as player:
+        start = time.perf_counter()
+        player.play(timeline)
+
+    for (sent_at, _), (offset, _) in zip(output.sent, timeline.events):
+        assert sent_at - start >= offset
+    assert player.stats().max_drift >= 0
+
+
+def test_player_queues_files_gaplessly():
+    player, output = simulated_player()
+    first = Timeline(((0.0, NOTE_ON_C), (0.02, NOTE_OFF_C)), 0.05)
+    second = Timeline(((0.0, NOTE_ON_C), (0.01, NOTE_OFF_C)), 0.01)
+
+    with player:
+        player.enqueue(first)
+        player.enqueue(second)
+        assert player.wait(timeout=5)
+
+    times = [sent_at for sent_at, _ in output.sent[:4]]
+    # The second file starts when the first ends, including its trailing rest
+    assert times[2] - times[0] == pytest.approx(0.05)
+    assert times[3] - times[2] == pytest.approx(0.01)
+
+
+def test_player_stop_drops_queue_and_silences_channels():
+    output = NullOutput(record=True)
+    long_timeline = Timeline(((0.0, NOTE_ON_C), (10.0, NOTE_OFF_C)), 10.0)
+
+    player = Player(output)
+    player.enqueue(long_timeline)
+    player.enqueue(long_timeline)
+    player.stop()
+
+    assert player.wait(timeout=1)
+    assert NOTE_OFF_C not in [message for _, message in output.sent]
+    assert [message for _, message in output.sent[-16:]] == [
+        bytes((0xB0 | channel, 123, 0)) for channel in range(16)
+    ]
+
+    # The output stays open and the player can be used again
+    player.play(Timeline(((0.0, NOTE_ON_C),), 0.0))
+    assert output.sent[-1][1] == NOTE_ON_C
+    player.close()
+    assert output.closed
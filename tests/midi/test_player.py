@@ -1,5 +1,9 @@
+import json
+
 import pytest
 from unittest.mock import patch, MagicMock, call
+
+from simplejam.instrumentation import Instrumentation
 from simplejam.midi import player
 
 
@@ -87,7 +91,8 @@ def test_parse_args(mock_argument_parser, file_path_arg):
     result = player.parse_args()
     
     mock_argument_parser.assert_called_once_with(description="Play MIDI files using pygame")
-    mock_parser.add_argument.assert_called_once_with("file_path", help="Path to the MIDI file to play")
+    assert mock_parser.add_argument.call_args_list[0] == call("file_path", help="Path to the MIDI file to play")
+    assert [c.args[0] for c in mock_parser.add_argument.call_args_list[1:]] == ["--profile", "--metrics"]
     mock_parser.parse_args.assert_called_once()
     assert result.file_path == file_path_arg
 
@@ -113,7 +118,7 @@ def test_parse_args(mock_argument_parser, file_path_arg):
 @patch('builtins.print')
 def test_run(mock_print, mock_isfile, mock_realpath, mock_parse_args, mock_play_midi, file_path, file_exists, should_raise):
     # Setup mocks
-    mock_args = MagicMock()
+    mock_args = MagicMock(profile=None, metrics=None)
     mock_args.file_path = file_path
     mock_parse_args.return_value = mock_args
     mock_realpath.return_value = f"/absolute/path/{file_path}"
@@ -155,7 +160,7 @@ def test_run(mock_print, mock_isfile, mock_realpath, mock_parse_args, mock_play_
 @patch('builtins.print')
 def test_run_exception_handling(mock_print, mock_isfile, mock_realpath, mock_parse_args, mock_play_midi, exception_type, exception_msg):
     # Setup mocks
-    mock_args = MagicMock()
+    mock_args = MagicMock(profile=None, metrics=None)
     mock_args.file_path = "test.mid"
     mock_parse_args.return_value = mock_args
     mock_realpath.return_value = "/absolute/path/test.mid"
@@ -165,4 +170,20 @@ def test_run_exception_handling(mock_print, mock_isfile, mock_realpath, mock_par
     player.run()
     
     mock_play_midi.assert_called_once_with("/absolute/path/test.mid")
-    mock_print.assert_called_once_with(f"Error: {exception_msg}")
\ No newline at end of file
+    mock_print.assert_called_once_with(f"Error: {exception_msg}")
+
+
+@patch('simplejam.midi.player.play_midi_file__pygame')
+@patch('simplejam.midi.player.instruments', Instrumentation())
+def test_run_writes_metrics(mock_play_midi, tmp_path, monkeypatch, capsys):
+    midi_file = tmp_path / "song.mid"
+    midi_file.write_bytes(b"MThd")
+    metrics_file = tmp_path / "metrics.json"
+    monkeypatch.setattr("sys.argv", ["play_midi_file", str(midi_file), "--metrics", str(metrics_file)])
+
+    with patch('simplejam.instrumentation.instruments', player.instruments):
+        player.run()
+
+    report = json.loads(metrics_file.read_text())
+    assert report["stages"]["play"]["calls"] == 1
+    assert report["counters"] == {"files_played": 1}
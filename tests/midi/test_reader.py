@@ -0,0 +1,165 @@
+import os
+
+import mido
+import pytest
+
+from simplejam.midi.arrangement import generate_arrangement_from_chord_sequence
+from simplejam.midi.logic.generators import generate_number_chord_sequence
+from simplejam.midi.midifile import TimeSignature, generate_midi_file_from_chord_sequence
+from simplejam.midi.reader import (
+    Note,
+    analyze_bytes,
+    analyze_file,
+    index_directory,
+    index_file,
+    read_notes,
+    read_sidecar,
+    sidecar_path,
+)
+from simplejam.schemas import KeyChordProgression
+
+
+def _render(key, numerals, **kwargs):
+    chord_sequence = generate_number_chord_sequence(
+        [KeyChordProgression(key=key, number_chord_sequence=numerals)]
+    )
+    return bytes(generate_midi_file_from_chord_sequence(None, chord_sequence, encoder="bytes", **kwargs))
+
+
+def test_read_notes_matches_mido(tmp_path):
+    chord_sequence = generate_number_chord_sequence(
+        [KeyChordProgression(key="D", number_chord_sequence=("I", "IV", "V"))]
+    )
+    data = bytes(generate_arrangement_from_chord_sequence(None, chord_sequence, time_signature=TimeSignature(3, 4)))
+    output_file = tmp_path / "arrangement.mid"
+    output_file.write_bytes(data)
+
+    expected = []
+    for track in mido.MidiFile(str(output_file)).tracks:
+        tick = 0
+        sounding = {}
+        for message in track:
+            tick += message.time
+            if message.type == "note_on" and message.velocity:
+                sounding[(message.channel, message.note)] = (tick, message.velocity)
+            elif message.type in ("note_on", "note_off"):
+                start, velocity = sounding.pop((message.channel, message.note))
+                expected.append(Note(start, tick, message.channel, message.note, velocity))
+
+    ticks_per_beat, notes = read_notes(data)
+
+    assert ticks_per_beat == 480
+    assert notes == sorted(expected)
+
+
+def test_read_notes_running_status_note_on_zero_velocity(tmp_path):
+    track = mido.MidiTrack([
+        mido.Message("note_on", note=60, velocity=100),
+        mido.Message("note_on", note=64, velocity=100),
+        mido.Message("note_on", note=60, velocity=0, time=480),
+        mido.Message("program_change", program=5),
+        mido.Message("note_on", note=64, velocity=0, time=480),
+        mido.Message("note_on", note=67, velocity=90),
+    ])
+    mid = mido.MidiFile(ticks_per_beat=96)
+    mid.tracks.append(track)
+    path = tmp_path / "running_status.mid"
+    mid.save(str(path))
+
+    ticks_per_beat, notes = read_notes(path.read_bytes())
+
+    assert ticks_per_beat == 96
+    # The last note is still sounding at the end of the track
+    assert notes == [Note(0, 480, 0, 60, 100), Note(0, 960, 0, 64, 100), Note(960, 960, 0, 67, 90)]
+
+
+@pytest.mark.parametrize("key,numerals,kwargs,expected_key", [
+    pytest.param("C", ("I", "IV", "V", "I"), {}, "C", id="c_major"),
+    pytest.param("G", ("I", "VI", "II", "V"), {"rhythm": "syncopated"}, "G", id="g_major_strummed"),
+    pytest.param("Eb", ("II", "V", "I"), {"rhythm": "beats"}, "Eb", id="e_flat_major_ii_v_i"),
+    pytest.param("Bm", ("I", "VI", "III", "VII"), {"time_signature": TimeSignature(6, 8)}, "Bm", id="b_minor")
+])
+def test_analyze_bytes_detects_key_and_numerals(key, numerals, kwargs, expected_key):
+    analysis = analyze_bytes(_render(key, numerals, **kwargs))
+
+    assert analysis.key == expected_key
+    assert analysis.numerals == list(numerals)
+
+
+def test_analyze_bytes_arrangement_ignores_drums_and_bass_doubling():
+    chord_sequence = generate_number_chord_sequence(
+        [KeyChordProgression(key="F", number_chord_sequence=("I", "VI", "IV", "V"))]
+    )
+    data = bytes(generate_arrangement_from_chord_sequence(None, chord_sequence, bass="root_fifth"))
+
+    analysis = analyze_bytes(data)
+
+    assert analysis.key == "F"
+    assert analysis.numerals == ["I", "VI", "IV", "V"]
+    assert any(note.channel == 9 for note in analysis.notes)
+
+
+@pytest.mark.parametrize("data,expected_error", [
+    pytest.param(b"RIFF0000WAVEfmt ", "Not a MIDI file: missing MThd header.", id="not_midi"),
+    pytest.param(b"MThd\x00\x00\x00\x06\x00\x01\x00\x01\x01\xe0MTrk\x00\x00\x00\x05\x00\x90\x3c", "Truncated MIDI track", id="truncated"),
+    pytest.param(b"MThd\x00\x00\x00\x06\x00\x01\x00\x01\x01\xe0XTrk\x00\x00\x00\x00", "expected MTrk", id="bad_track")
+])
+def test_analyze_file_invalid_raises_value_error(tmp_path, data, expected_error):
+    path = tmp_path / "invalid.mid"
+    path.write_bytes(data)
+
+    with pytest.raises(ValueError, match=expected_error):
+        analyze_file(str(path))
+
+
+def test_index_file_reuses_sidecar_until_file_changes(tmp_path):
+    path = str(tmp_path / "song.mid")
+    with open(path, "wb") as f:
+        f.write(_render("A", ("I", "IV")))
+
+    analysis, reused = index_file(path)
+    assert not reused
+    assert os.path.exists(sidecar_path(path))
+    assert read_sidecar(path, os.stat(path)) == analysis
+
+    assert index_file(path) == (analysis, True)
+
+    with open(path, "wb") as f:
+        f.write(_render("A", ("I", "V", "I")))
+    changed, reused = index_file(path)
+    assert not reused
+    assert changed.numerals == ["I", "V", "I"]
+
+
+def test_index_file_sidecar_write_failure_keeps_analysis(tmp_path, monkeypatch, caplog):
+    path = str(tmp_path / "song.mid")
+    with open(path, "wb") as f:
+        f.write(_render("A", ("I", "IV")))
+
+    def replace(src, dst):
+        raise PermissionError("read-only library")
+
+    monkeypatch.setattr(os, "replace", replace)
+    analysis, reused = index_file(path)
+
+    assert not reused
+    assert analysis.numerals == ["I", "IV"]
+    assert os.listdir(tmp_path) == ["song.mid"]
+    assert "Could not write the sidecar of" in caplog.text
+
+
+def test_index_directory(tmp_path):
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "one.mid").write_bytes(_render("C", ("I", "V")))
+    (tmp_path / "nested" / "two.midi").write_bytes(_render("D", ("II", "V", "I")))
+    (tmp_path / "broken.mid").write_bytes(b"not midi")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    first = index_directory(str(tmp_path))
+    second = index_directory(str(tmp_path))
+
+    assert (first.analyzed, first.reused) == (2, 0)
+    assert (second.analyzed, second.reused) == (0, 2)
+    assert second.analyses == first.analyses
+    assert first.analyses[str(tmp_path / "nested" / "two.midi")].key == "D"
+    assert list(first.errors) == [str(tmp_path / "broken.mid")]
@@ -0,0 +1,166 @@
+import io
+
+import mido
+import pytest
+
+from simplejam.midi import rhythm as rhythm_module
+from simplejam.midi.keys import C_major
+from simplejam.midi.midifile import ENCODERS, TimeSignature, generate_midi_file_from_chord_sequence
+from simplejam.midi.rhythm import RHYTHMS, Hit, Rhythm, chord_spans, get_rhythm, meter_ticks
+from simplejam.midi.smf import TrackWriter
+
+CHORDS = [
+    [60, 64, 67],
+    [62, 65, 69, 72],
+    [],
+    [67],
+    [65, 69, 72],
+]
+
+
+@pytest.mark.parametrize("name", list(RHYTHMS))
+@pytest.mark.parametrize("numerator,denominator", [
+    pytest.param(4, 4, id="4/4"),
+    pytest.param(3, 4, id="3/4"),
+    pytest.param(6, 8, id="6/8")
+])
+def test_rhythm_render_matches_events(name, numerator, denominator):
+    rhythm = RHYTHMS[name]
+    beat_ticks, bar_ticks = meter_ticks(numerator, denominator, 480)
+    spans = chord_spans(len(CHORDS), bar_ticks, beat_ticks, [4, 2.5, 1, 3, 6])
+
+    writer = TrackWriter()
+    rest = rhythm.render(writer, CHORDS, spans, beat_ticks, bar_ticks)
+    expected = TrackWriter()
+    tick = expected.events(rhythm.events(CHORDS, spans, beat_ticks, bar_ticks))
+
+    assert writer.data == expected.data
+    assert tick + rest == sum(spans)
+
+
+def test_rhythm_arpeggio_events():
+    rhythm = Rhythm([Hit(0, 1, 80)], style="arpeggio", period=1)
+
+    events = list(rhythm.events([[60, 64, 67]], [1920], 480, 1920))
+
+    assert [(tick, status, note) for tick, _, status, note, _ in events] == [
+        (0, 0x90, 60), (480, 0x80, 60), (480, 0x90, 64), (960, 0x80, 64),
+        (960, 0x90, 67), (1440, 0x80, 67), (1440, 0x90, 60), (1920, 0x80, 60),
+    ]
+
+
+def test_rhythm_strum_events():
+    rhythm = Rhythm([Hit(0, 1)], style="strum", strum_ticks=30)
+
+    events = list(rhythm.events([[60, 64, 67]], [1920], 480, 1920))
+
+    assert [(tick, status, note) for tick, _, status, note, _ in events] == [
+        (0, 0x90, 60), (30, 0x90, 64), (60, 0x90, 67),
+        (480, 0x80, 60), (480, 0x80, 64), (480, 0x80, 67),
+    ]
+
+
+def test_generate_midi_file_block_rhythm_matches_default():
+    chord_sequence = [C_major.DiatonicTriads["I"], C_major.DiatonicSevenths["V"]]
+
+    default = generate_midi_file_from_chord_sequence(None, chord_sequence, encoder="bytes")
+    block = generate_midi_file_from_chord_sequence(None, chord_sequence, encoder="bytes", rhythm="block")
+
+    assert bytes(block) == bytes(default)
+
+
+@pytest.mark.parametrize("rhythm,time_signature,durations", [
+    pytest.param("syncopated", TimeSignature(4, 4), None, id="syncopated"),
+    pytest.param("beats", TimeSignature(3, 4), None, id="waltz"),
+    pytest.param("arpeggio", TimeSignature(6, 8), [6, 3], id="arpeggio_durations"),
+    pytest.param(Rhythm([Hit(0, 1)]), TimeSignature(4, 4), None, id="trailing_rest")
+])
+def test_generate_midi_file_with_rhythm(rhythm, time_signature, durations):
+    chord_sequence = [C_major.DiatonicTriads["I"], C_major.DiatonicTriads["IV"]]
+
+    results = [
+        bytes(generate_midi_file_from_chord_sequence(
+            None, chord_sequence, time_signature=time_signature, encoder=encoder,
+            rhythm=rhythm, durations=durations
+        ))
+        for encoder in ENCODERS
+    ]
+
+    assert results[0] == results[1]
+    mid = mido.MidiFile(file=io.BytesIO(results[0]))
+    beat_ticks, bar_ticks = meter_ticks(time_signature.numerator, time_signature.denominator, 480)
+    expected_ticks = sum(chord_spans(2, bar_ticks, beat_ticks, durations))
+    assert sum(message.time for message in mid.tracks[0]) == expected_ticks
+
+
+def test_generate_midi_file_rhythm_cache_key(tmp_path):
+    from simplejam.midi.cache import OutputCache
+
+    cache = OutputCache(str(tmp_path / "cache"))
+    chord_sequence = [C_major.DiatonicTriads["I"]]
+
+    block = generate_midi_file_from_chord_sequence(None, chord_sequence, encoder="bytes", cache=cache)
+    strum = generate_midi_file_from_chord_sequence(None, chord_sequence, encoder="bytes", cache=cache, rhythm="strum")
+
+    assert bytes(block) != bytes(strum)
+    assert len(cache) == 2
+
+
+def test_rhythm_templates_are_bounded(monkeypatch):
+    monkeypatch.setattr(rhythm_module, "TEMPLATE_CACHE_SIZE", 4)
+    rhythm = Rhythm([Hit(0)])
+    first = rhythm.template(3, 480, 480, 1920)
+
+    for span in range(481, 485):
+        rhythm.template(3, span, 480, 1920)
+
+    assert len(rhythm._templates) == 4
+    assert (3, 480, 480, 1920, 0) not in rhythm._templates
+    assert rhythm.template(3, 484, 480, 1920) is rhythm.template(3, 484, 480, 1920)
+    assert rhythm.template(3, 480, 480, 1920) == first
+
+
+@pytest.mark.parametrize("durations,expected_error", [
+    pytest.param([4], "durations must have one entry per chord.", id="wrong_length"),
+    pytest.param([4, -1], "durations must be positive.", id="negative"),
+    pytest.param([0, 4], "durations must be positive.", id="zero"),
+])
+def test_chord_spans_invalid_durations_raises_value_error(durations, expected_error):
+    with pytest.raises(ValueError, match=expected_error):
+        chord_spans(2, 1920, 480, durations)
+
+
+def test_get_rhythm_invalid_name_raises_value_error():
+    with pytest.raises(ValueError, match="Invalid rhythm 'bossa'"):
+        get_rhythm("bossa")
+
+
+@pytest.mark.parametrize("kwargs,expected_error", [
+    pytest.param({"style": "rasgueado"}, "Style must be one of: block, strum, arpeggio.", id="invalid_style"),
+    pytest.param({"period": 0}, "period must be positive.", id="invalid_period"),
+    pytest.param({"period": -1}, "period must be positive.", id="negative_period"),
+    pytest.param({"strum_ticks": -1}, "strum_ticks must not be negative.", id="negative_strum_ticks"),
+    pytest.param({"hits": [Hit(-1)]}, "Hit start must not be negative.", id="negative_hit_start"),
+    pytest.param({"hits": [Hit(0, -0.5)]}, "Hit length must be positive.", id="negative_hit_length"),
+])
+def test_rhythm_invalid_arguments_raise_value_error(kwargs, expected_error):
+    kwargs = {"hits": [Hit(0)], **kwargs}
+
+    with pytest.raises(ValueError, match=expected_error):
+        Rhythm(**kwargs)
+
+
+@pytest.mark.parametrize("span,expected_error", [
+    pytest.param(-480, "Chord spans must not be negative.", id="negative_span"),
+    pytest.param(480, r"period of 0.0001 beats is shorter than a tick at 480 ticks per beat.", id="period_below_a_tick"),
+])
+def test_rhythm_template_invalid_raises_value_error(span, expected_error):
+    rhythm = Rhythm([Hit(0)], period=0.0001 if span > 0 else None)
+
+    with pytest.raises(ValueError, match=expected_error):
+        rhythm.template(3, span, 480, 1920)
+
+
+def test_generate_midi_file_negative_duration_raises_value_error():
+    with pytest.raises(ValueError, match="durations must be positive."):
+        generate_midi_file_from_chord_sequence(None, [C_major.DiatonicTriads["I"]], durations=[-1])
@@ -0,0 +1,83 @@
+import io
+
+import mido
+import pytest
+
+from simplejam.midi.smf import TrackWriter, encode_file, encode_variable_int, variable_int
+
+
+@pytest.mark.parametrize("value", [
+    pytest.param(0, id="zero"),
+    pytest.param(127, id="one_byte_max"),
+    pytest.param(128, id="two_bytes_min"),
+    pytest.param(1920, id="whole_note"),
+    pytest.param(0x3FFF, id="cache_max"),
+    pytest.param(0x4000, id="uncached"),
+    pytest.param(0x0FFFFFFF, id="four_bytes_max")
+])
+def test_variable_int_matches_mido(value):
+    expected = bytes(mido.midifiles.midifiles.encode_variable_int(value))
+    assert encode_variable_int(value) == expected
+    assert variable_int(value) == expected
+
+
+def test_encode_variable_int_negative_raises_value_error():
+    with pytest.raises(ValueError, match="message time must be non-negative"):
+        encode_variable_int(-1)
+
+
+def test_track_writer_matches_mido_running_status():
+    writer = TrackWriter()
+    writer.tempo(mido.bpm2tempo(90))
+    writer.time_signature(6, 8)
+    writer.note_on(60, 100)
+    writer.note_on(64, 100, delta=10)
+    writer.note_off(60, 0, delta=200)
+    writer.note_on(67, 80, channel=9)
+    writer.chord([48, 55], 960)
+    writer.chord([50], 480, velocity=70)
+    writer.end_of_track()
+
+    track = mido.MidiTrack([
+        mido.MetaMessage("set_tempo", tempo=mido.bpm2tempo(90)),
+        mido.MetaMessage("time_signature", numerator=6, denominator=8),
+        mido.Message("note_on", note=60, velocity=100),
+        mido.Message("note_on", note=64, velocity=100, time=10),
+        mido.Message("note_off", note=60, velocity=0, time=200),
+        mido.Message("note_on", note=67, velocity=80, channel=9),
+        mido.Message("note_on", note=48, velocity=90),
+        mido.Message("note_on", note=55, velocity=90),
+        mido.Message("note_off", note=48, velocity=90, time=960),
+        mido.Message("note_off", note=55, velocity=90),
+        mido.Message("note_on", note=50, velocity=70),
+        mido.Message("note_off", note=50, velocity=70, time=480),
+    ])
+    mid = mido.MidiFile()
+    mid.tracks.append(track)
+    expected = io.BytesIO()
+    mid.save(file=expected)
+
+    assert encode_file([writer.data]) == expected.getvalue()
+
+
+def test_track_writer_events_match_mido():
+    writer = TrackWriter()
+    writer.program_change(33, channel=1)
+    tick = writer.events([(0, 1, 0x91, 36, 100), (960, 0, 0x81, 36, 100), (960, 1, 0x91, 43, 100)])
+    writer.events([(1920, 0, 0x81, 43, 100)], tick)
+    writer.end_of_track()
+
+    track = mido.MidiTrack([
+        mido.Message("program_change", program=33, channel=1),
+        mido.Message("note_on", note=36, velocity=100, channel=1),
+        mido.Message("note_off", note=36, velocity=100, channel=1, time=960),
+        mido.Message("note_on", note=43, velocity=100, channel=1),
+        mido.Message("note_off", note=43, velocity=100, channel=1, time=960),
+    ])
+    mid = mido.MidiFile()
+    mid.tracks.append(track)
+    expected = io.BytesIO()
+    mid.save(file=expected)
+
+    assert tick == 960
+    assert encode_file([writer.data]) == expected.getvalue()
@@ -0,0 +1,98 @@
+import io
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from simplejam.midi.keys import C_major  # noqa: E402
+from simplejam.midi.synth import (  # noqa: E402
+    SynthNote,
+    Voice,
+    envelope,
+    get_voice,
+    note_frequency,
+    render_blocks,
+    synthesize_chord_sequence,
+)
+
+CHORDS = [C_major.DiatonicTriads["I"], C_major.DiatonicTriads["V"]]
+
+
+def _read_wav(data):
+    with wave.open(io.BytesIO(data)) as wav:
+        frames = wav.readframes(wav.getnframes())
+        return wav.getframerate(), wav.getsampwidth(), np.frombuffer(frames, "<i2")
+
+
+@pytest.mark.parametrize("tempo,rhythm,durations,seconds", [
+    pytest.param(120, None, None, 4.0, id="block_chords"),
+    pytest.param(60, "arpeggio", None, 8.0, id="rhythm"),
+    pytest.param(120, None, [2, 1], 1.5, id="durations"),
+])
+def test_synthesize_chord_sequence_length(tempo, rhythm, durations, seconds):
+    result = synthesize_chord_sequence(
+        None, CHORDS, tempo=tempo, rhythm=rhythm, durations=durations,
+        voice="sine", sample_rate=8000,
+    )
+
+    rate, width, samples = _read_wav(result.data)
+    # Notes ring on for the release after the last chord
+    assert (rate, width) == (8000, 2)
+    assert len(samples) == result.samples == round((seconds + 0.2) * 8000)
+    assert result.duration == pytest.approx(seconds + 0.2)
+    assert np.abs(samples).max() > 1000
+    assert abs(int(samples[-1])) < 0.01 * np.abs(samples).max()
+
+
+def test_synthesize_chord_sequence_writes_file(tmp_path):
+    output_file = str(tmp_path / "chords.wav")
+
+    result = synthesize_chord_sequence(output_file, CHORDS, sample_rate=8000)
+
+    assert result.data is None
+    assert result.real_time_factor > 0
+    assert result.renders_per_core == pytest.approx(1 / result.real_time_factor)
+    with open(output_file, "rb") as f:
+        assert _read_wav(f.read())[2].size == result.samples
+
+
+def test_render_blocks_do_not_depend_on_block_size():
+    notes = [SynthNote(0, 3000, 60, 100), SynthNote(1000, 5000, 64, 80)]
+
+    whole = np.concatenate(list(render_blocks(notes, "organ", 8000, block_size=10**6)))
+    blocks = list(render_blocks(notes, "organ", 8000, block_size=256))
+
+    assert [len(block) for block in blocks[:-1]] == [256] * (len(blocks) - 1)
+    assert np.allclose(np.concatenate(blocks), whole)
+
+
+def test_render_blocks_pitch():
+    # One second of A4 sine has 440 upward zero crossings
+    notes = [SynthNote(0, 8000, 69, 127)]
+    signal = np.concatenate(list(render_blocks(notes, "sine", 8000)))[:8000]
+
+    crossings = np.count_nonzero((signal[:-1] < 0) & (signal[1:] >= 0))
+
+    assert crossings == pytest.approx(440, abs=1)
+    assert note_frequency(60) == pytest.approx(261.63, abs=0.01)
+
+
+@pytest.mark.parametrize("t,held,expected", [
+    pytest.param(0.0, 1.0, 0.0, id="onset"),
+    pytest.param(0.1, 1.0, 1.0, id="attack_peak"),
+    pytest.param(0.5, 1.0, 0.5, id="sustain"),
+    pytest.param(1.5, 1.0, 0.25, id="release"),
+    pytest.param(3.0, 1.0, 0.0, id="released"),
+    pytest.param(0.05, 0.05, 0.5, id="released_during_attack"),
+    pytest.param(0.55, 0.05, 0.25, id="release_from_attack_level"),
+])
+def test_envelope(t, held, expected):
+    voice = Voice((1.0,), attack=0.1, decay=0.1, sustain=0.5, release=1.0)
+
+    assert envelope(np.array([t]), held, voice)[0] == pytest.approx(expected)
+
+
+def test_get_voice_invalid_name():
+    with pytest.raises(ValueError, match="Invalid voice 'kazoo'. Available voices"):
+        get_voice("kazoo")
@@ -0,0 +1,162 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from simplejam.midi.keys import C_major  # noqa: E402
+from simplejam.midi.midifile import TimeSignature, generate_midi_file_from_chord_sequence  # noqa: E402
+from simplejam.midi.smf import NOTE_OFF, NOTE_ON, TrackWriter  # noqa: E402
+from simplejam.midi.timeline import (  # noqa: E402
+    chord_timeline,
+    delta_ticks,
+    empty_timeline,
+    encode_events,
+    encode_timeline,
+    humanize,
+    quantize,
+    sort_timeline,
+    transpose,
+)
+
+
+def _triads(count):
+    triads = list(C_major.DiatonicTriads.values()) + list(C_major.DiatonicSevenths.values())
+    return [triads[i % len(triads)] for i in range(count)]
+
+
+@pytest.mark.parametrize("chord_count,tempo,time_signature", [
+    pytest.param(0, 60, TimeSignature(4, 4), id="empty"),
+    pytest.param(3, 120, TimeSignature(3, 4), id="few_chords"),
+    pytest.param(500, 90, TimeSignature(6, 8), id="many_chords")
+])
+def test_encode_timeline_matches_generate(chord_count, tempo, time_signature):
+    chord_sequence = _triads(chord_count)
+    expected = generate_midi_file_from_chord_sequence(
+        None, chord_sequence, tempo=tempo, time_signature=time_signature, encoder="bytes"
+    )
+
+    events = sort_timeline(chord_timeline(chord_sequence, 1920))
+
+    assert encode_timeline(events, tempo, time_signature) == bytes(expected)
+
+
+@pytest.mark.parametrize("deltas", [
+    pytest.param([0, 1, 127], id="one_byte"),
+    pytest.param([128, 0x3FFF], id="two_bytes"),
+    pytest.param([0x4000, 0x1FFFFF], id="three_bytes"),
+    pytest.param([0x200000, 0x0FFFFFFF], id="four_bytes")
+])
+def test_encode_events_matches_track_writer(deltas):
+    events = empty_timeline(len(deltas))
+    events["tick"] = np.cumsum(deltas)
+    events["note"] = np.arange(len(deltas)) + 60
+    events["velocity"] = 64
+    events["type"] = [NOTE_ON, NOTE_OFF, NOTE_OFF, NOTE_ON][: len(deltas)]
+    events["channel"] = 2
+
+    writer = TrackWriter()
+    for delta, event in zip(deltas, events):
+        writer.message(int(event["type"]) | 2, int(event["note"]), 64, delta)
+
+    assert encode_events(events) == bytes(writer.data)
+
+
+def test_encode_events_unsorted_raises_value_error():
+    events = empty_timeline(2)
+    events["tick"] = [10, 5]
+
+    with pytest.raises(ValueError, match="events must be sorted"):
+        encode_events(events)
+
+
+def test_delta_ticks():
+    events = empty_timeline(3)
+    events["tick"] = [100, 100, 580]
+
+    assert delta_ticks(events, start=40).tolist() == [60, 0, 480]
+
+
+def test_transpose():
+    events = chord_timeline([C_major.DiatonicTriads["I"]], 480)
+
+    result = transpose(events, 2)
+
+    assert result["note"].tolist() == [62, 66, 69, 62, 66, 69]
+    assert events["note"].tolist() == [60, 64, 67, 60, 64, 67]
+
+
+@pytest.mark.parametrize("semitones", [
+    pytest.param(-61, id="below_zero"),
+    pytest.param(61, id="above_127")
+])
+def test_transpose_out_of_range_raises_value_error(semitones):
+    events = chord_timeline([C_major.DiatonicTriads["I"]], 480)
+
+    with pytest.raises(ValueError, match="out of MIDI range"):
+        transpose(events, semitones)
+
+
+def test_humanize_only_varies_note_on_velocities():
+    events = chord_timeline(_triads(100), 480, velocity=120)
+
+    result = humanize(events, spread=10, seed=1)
+
+    on = result["type"] == NOTE_ON
+    assert result["velocity"][~on].tolist() == events["velocity"][~on].tolist()
+    assert set(result["velocity"][on].tolist()) <= set(range(110, 128))
+    assert len(set(result["velocity"][on].tolist())) > 1
+    assert np.array_equal(result, humanize(events, spread=10, seed=1))
+
+
+def test_quantize():
+    events = empty_timeline(4)
+    events["tick"] = [0, 130, 200, 470]
+    events["type"] = [NOTE_ON, NOTE_OFF, NOTE_ON, NOTE_OFF]
+    events["note"] = [60, 60, 62, 62]
+
+    result = quantize(events, 240)
+
+    assert result["tick"].tolist() == [0, 240, 240, 480]
+    assert result["type"].tolist() == [NOTE_ON, NOTE_OFF, NOTE_ON, NOTE_OFF]
+
+
+@pytest.mark.parametrize("ticks,types,expected_ticks,expected_types", [
+    pytest.param([0, 100], [NOTE_ON, NOTE_OFF], [0, 480], [NOTE_ON, NOTE_OFF], id="short_note"),
+    pytest.param(
+        [0, 100, 480, 960], [NOTE_ON, NOTE_OFF, NOTE_ON, NOTE_OFF],
+        [0, 480, 480, 960], [NOTE_ON, NOTE_OFF, NOTE_ON, NOTE_OFF],
+        id="short_note_before_same_note"
+    ),
+    pytest.param(
+        [700, 710, 960, 1440], [NOTE_ON, NOTE_OFF, NOTE_ON, NOTE_OFF],
+        [480, 960, 960, 1440], [NOTE_ON, NOTE_OFF, NOTE_ON, NOTE_OFF],
+        id="short_note_rounded_down"
+    ),
+])
+def test_quantize_keeps_short_notes(ticks, types, expected_ticks, expected_types):
+    events = empty_timeline(len(ticks))
+    events["tick"] = ticks
+    events["type"] = types
+    events["note"] = 60
+
+    result = quantize(events, 480)
+
+    assert result["tick"].tolist() == expected_ticks
+    assert result["type"].tolist() == expected_types
+
+
+def test_quantize_pairs_notes_by_channel_and_note():
+    events = empty_timeline(4)
+    events["tick"] = [0, 0, 100, 1000]
+    events["type"] = [NOTE_ON, NOTE_ON, NOTE_OFF, NOTE_OFF]
+    events["note"] = [60, 64, 60, 64]
+
+    result = quantize(events, 480)
+
+    assert list(zip(result["tick"].tolist(), result["type"].tolist(), result["note"].tolist())) == [
+        (0, NOTE_ON, 60), (0, NOTE_ON, 64), (480, NOTE_OFF, 60), (960, NOTE_OFF, 64),
+    ]
+
+
+def test_quantize_invalid_grid_raises_value_error():
+    with pytest.raises(ValueError, match="grid must be at least 1 tick."):
+        quantize(empty_timeline(), 0)
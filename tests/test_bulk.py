@@ -0,0 +1,92 @@
+import json
+import os
+
+import mido
+import pytest
+
+from simplejam.bulk import read_records, render_lines, validate_lines
+from simplejam.schemas import RenderSpec
+
+SPEC = {"key": "C", "number_chord_sequence": ["II", "V", "I"]}
+
+
+def _lines(*records):
+    return [record if isinstance(record, str) else json.dumps(record) for record in records]
+
+
+@pytest.mark.parametrize("lines,expected", [
+    pytest.param(_lines(SPEC, dict(SPEC, tempo=90)), [True, True], id="valid_batch"),
+    pytest.param(_lines(SPEC, {"key": "C"}, SPEC), [True, False, True], id="missing_field"),
+    pytest.param(_lines(SPEC, "not json", SPEC), [True, False, True], id="invalid_json"),
+    pytest.param(_lines(SPEC, dict(SPEC, tempo=0), SPEC), [True, False, True], id="invalid_tempo"),
+    pytest.param(
+        _lines(SPEC, dict(SPEC, time_signature=[256, 4]), SPEC), [True, False, True], id="invalid_time_signature"
+    ),
+    pytest.param(
+        [json.dumps(SPEC) + "," + json.dumps(SPEC), json.dumps(SPEC)], [False, True],
+        id="two_objects_on_one_line"
+    ),
+])
+def test_validate_lines(lines, expected):
+    results = validate_lines(enumerate(lines, start=1))
+
+    assert [number for number, _ in results] == list(range(1, len(lines) + 1))
+    assert [isinstance(spec, RenderSpec) for _, spec in results] == expected
+
+
+def test_read_records_names_files_and_skips_blank_lines(tmp_path):
+    lines = _lines(SPEC, "", dict(SPEC, output_file="named.mid"), {"key": "C"})
+
+    records = list(read_records(lines, str(tmp_path), batch_size=2))
+
+    assert [(number, output_file) for number, output_file, _ in records] == [
+        (1, str(tmp_path / "progression_0000001.mid")),
+        (3, str(tmp_path / "named.mid")),
+        (4, str(tmp_path / "progression_0000004.mid")),
+    ]
+    assert records[2][2] == "number_chord_sequence: Field required"
+
+
+@pytest.mark.parametrize("workers", [
+    pytest.param(1, id="inline"),
+    pytest.param(2, id="process_pool"),
+])
+def test_render_lines(tmp_path, workers):
+    lines = _lines(*[dict(SPEC, tempo=60 + i) for i in range(20)], {"key": "H", "number_chord_sequence": ["I"]})
+
+    results = list(render_lines(lines, str(tmp_path), workers=workers, batch_size=8, chunksize=3))
+
+    assert [result.line for result in results] == list(range(1, 22))
+    assert all(result.ok for result in results[:20])
+    assert results[20].error.startswith("ValueError: Key 'H' is not supported.")
+    mid = mido.MidiFile(results[5].output_file)
+    assert mid.tracks[0][0].tempo == mido.bpm2tempo(65)
+    assert json.loads(results[20].summary())["line"] == 21
+
+
+def test_render_lines_failed_write_keeps_old_file(tmp_path, monkeypatch):
+    output_file = tmp_path / "song.mid"
+    output_file.write_bytes(b"old")
+
+    def replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", replace)
+    results = list(render_lines(_lines(dict(SPEC, output_file="song.mid")), str(tmp_path), workers=1))
+
+    assert results[0].error == "OSError: disk full"
+    assert output_file.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["song.mid"]
+
+
+def test_render_lines_voice_leading(tmp_path):
+    lines = _lines(dict(SPEC, output_file="root.mid"), dict(SPEC, output_file="voiced.mid", voice_leading=True))
+
+    results = list(render_lines(lines, str(tmp_path), workers=1))
+
+    def chords(result):
+        notes = [message.note for message in mido.MidiFile(result.output_file) if message.type == "note_on"]
+        return [notes[i:i + 3] for i in range(0, len(notes), 3)]
+
+    assert chords(results[0]) == [[62, 65, 69], [67, 71, 74], [60, 64, 67]]
+    assert chords(results[1]) == [[62, 65, 69], [62, 67, 71], [64, 67, 72]]
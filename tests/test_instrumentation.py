@@ -0,0 +1,127 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from simplejam import main
+from simplejam.instrumentation import Instrumentation, instrumented_run, instruments
+from simplejam.midi.keys import C_major
+from simplejam.midi.midifile import generate_midi_file_from_chord_sequence
+
+CHORDS = [C_major.DiatonicTriads["I"], C_major.DiatonicTriads["V"]]
+
+
+@pytest.fixture
+def enabled():
+    instruments.reset()
+    instruments.enable()
+    yield instruments
+    instruments.disable()
+    instruments.reset()
+
+
+def test_disabled_instrumentation_records_nothing():
+    registry = Instrumentation()
+
+    with registry.timer("stage"):
+        registry.count("events", 10)
+
+    assert registry.report() == {"stages": {}, "counters": {}, "rates": {}}
+
+
+def test_report_and_merge():
+    registry = Instrumentation()
+    registry.enable()
+    registry.record("build_events", 0.5)
+    registry.record("build_events", 1.5)
+    registry.count("events", 100)
+    other = Instrumentation()
+    other.enable()
+    other.record("build_events", 2.0)
+    other.count("events", 300)
+
+    registry.merge(other.snapshot())
+    report = registry.report()
+
+    assert report["stages"]["build_events"] == {
+        "calls": 3, "total_seconds": 4.0, "mean_seconds": 4.0 / 3, "max_seconds": 2.0
+    }
+    assert report["counters"] == {"events": 400}
+    assert report["rates"] == {"events_per_second": 100.0}
+
+
+def test_to_prometheus():
+    registry = Instrumentation()
+    registry.enable()
+    registry.record("save", 0.25)
+    registry.count("bytes_written", 1000)
+
+    assert registry.to_prometheus().splitlines() == [
+        "# TYPE simplejam_stage_seconds summary",
+        'simplejam_stage_seconds_count{stage="save"} 1',
+        'simplejam_stage_seconds_sum{stage="save"} 0.25',
+        "# TYPE simplejam_stage_seconds_max gauge",
+        'simplejam_stage_seconds_max{stage="save"} 0.25',
+        "# TYPE simplejam_bytes_written_total counter",
+        "simplejam_bytes_written_total 1000",
+        "# TYPE simplejam_bytes_per_second gauge",
+        "simplejam_bytes_per_second 4000.0",
+    ]
+
+
+@pytest.mark.parametrize("output_file,rhythm,stages,events", [
+    pytest.param(None, None, {"build_events", "encode"}, 12, id="in_memory"),
+    pytest.param("chords.mid", None, {"build_events", "save"}, 12, id="saved"),
+    pytest.param(None, "beats", {"build_events", "encode"}, 48, id="rhythm"),
+])
+def test_generate_midi_file_stages(tmp_path, enabled, output_file, rhythm, stages, events):
+    if output_file is not None:
+        output_file = str(tmp_path / output_file)
+
+    generate_midi_file_from_chord_sequence(output_file, CHORDS, encoder="bytes", rhythm=rhythm)
+
+    report = enabled.report()
+    assert set(report["stages"]) == stages
+    assert report["counters"]["events"] == events
+    if output_file is not None:
+        assert report["counters"]["bytes_written"] == os.path.getsize(output_file)
+
+
+def test_instrumented_run_writes_profile_and_metrics(tmp_path, capsys):
+    profile = str(tmp_path / "run.prof")
+    metrics = str(tmp_path / "metrics.json")
+
+    with instrumented_run(profile, metrics):
+        generate_midi_file_from_chord_sequence(None, CHORDS, encoder="bytes")
+    instruments.disable()
+    instruments.reset()
+
+    assert os.path.getsize(profile) > 0
+    assert "function calls" in capsys.readouterr().err
+    with open(metrics) as f:
+        assert json.load(f)["counters"]["events"] == 12
+
+
+@pytest.mark.parametrize("workers", [
+    pytest.param("1", id="inline"),
+    pytest.param("2", id="process_pool"),
+])
+def test_main_render_metrics(tmp_path, workers):
+    specs = tmp_path / "specs.jsonl"
+    specs.write_text('{"key": "C", "number_chord_sequence": ["I", "V"]}\n' * 5)
+    metrics = tmp_path / "metrics.prom"
+    argv = [
+        "simplejam", "render", str(specs), "--output-dir", str(tmp_path),
+        "--workers", workers, "--metrics", str(metrics),
+    ]
+
+    with patch("sys.argv", argv):
+        main.main()
+    instruments.disable()
+    instruments.reset()
+
+    text = metrics.read_text()
+    assert 'simplejam_stage_seconds_count{stage="save"} 5' in text
+    assert "simplejam_files_written_total 5" in text
+    assert "simplejam_events_total 60" in text
@@ -0,0 +1,48 @@
+import pytest
+import io
+import json
+from unittest.mock import patch, MagicMock
+from simplejam import main
+
+
+@pytest.mark.parametrize("argv,expected", [
+    pytest.param([], dict(host="127.0.0.1", port=8000, workers=None, max_concurrency=8, max_pending=64), id="defaults"),
+    pytest.param(["serve", "--port", "9000"], dict(host="127.0.0.1", port=9000, workers=None, max_concurrency=8, max_pending=64), id="serve_command"),
+    pytest.param(
+        ["--host", "0.0.0.0", "--port", "9000", "--workers", "4", "--max-concurrency", "2", "--max-pending", "10"],
+        dict(host="0.0.0.0", port=9000, workers=4, max_concurrency=2, max_pending=10),
+        id="custom"
+    )
+])
+@patch('simplejam.main.asyncio.run')
+@patch('simplejam.main.JamService')
+def test_main(mock_jam_service, mock_asyncio_run, argv, expected):
+    mock_service = MagicMock()
+    mock_jam_service.return_value = mock_service
+
+    with patch('sys.argv', ["simplejam"] + argv):
+        main.main()
+
+    mock_jam_service.assert_called_once_with(**expected)
+    mock_asyncio_run.assert_called_once_with(mock_service.serve_forever.return_value)
+
+
+@pytest.mark.parametrize("records,exit_code", [
+    pytest.param([{"key": "C", "number_chord_sequence": ["I", "IV"]}], None, id="ok"),
+    pytest.param([{"key": "C", "number_chord_sequence": ["I"]}, {"key": "C"}], 1, id="invalid_record"),
+])
+def test_main_render_from_stdin(tmp_path, capsys, records, exit_code):
+    stdin = io.StringIO("".join(json.dumps(record) + "\n" for record in records))
+    argv = ["simplejam", "render", "--output-dir", str(tmp_path), "--workers", "1"]
+
+    with patch("sys.argv", argv), patch("sys.stdin", stdin):
+        if exit_code is None:
+            main.main()
+        else:
+            with pytest.raises(SystemExit) as e:
+                main.main()
+            assert e.value.code == exit_code
+
+    summaries = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [summary["line"] for summary in summaries] == list(range(1, len(records) + 1))
+    assert (tmp_path / "progression_0000001.mid").exists()
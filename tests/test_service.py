@@ -0,0 +1,243 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from pydantic import ValidationError
+
+from simplejam.instrumentation import instruments
+from simplejam.midi.logic.generators import generate_number_chord_sequence
+from simplejam.midi.midifile import TimeSignature, generate_midi_file_from_chord_sequence
+from simplejam.schemas import KeyChordProgression
+from simplejam.service import JamService, LatencyMetrics, parse_render_request
+
+
+async def http_request(port, method, path, body=b""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), payload
+
+
+def run_with_service(client, **kwargs):
+    async def main():
+        service = JamService(port=0, **kwargs)
+        await service.start()
+        try:
+            return await client(service)
+        finally:
+            await service.stop()
+
+    return asyncio.run(main())
+
+
+def expected_midi(progressions, tempo=60, time_signature=(4, 4)):
+    data = generate_midi_file_from_chord_sequence(
+        None, generate_number_chord_sequence(progressions), tempo=tempo, time_signature=TimeSignature(*time_signature)
+    )
+    return bytes(data)
+
+
+@pytest.mark.parametrize("body,progressions,tempo,time_signature", [
+    pytest.param(
+        {"key": "C", "number_chord_sequence": ["II", "V", "I"]},
+        [KeyChordProgression(key="C", number_chord_sequence=("II", "V", "I"))],
+        60,
+        (4, 4),
+        id="single_progression"
+    ),
+    pytest.param(
+        {"key": "C", "number_chord_sequence": ["II", "V", "I"], "tempo": 120, "time_signature": [3, 4]},
+        [KeyChordProgression(key="C", number_chord_sequence=("II", "V", "I"))],
+        120,
+        (3, 4),
+        id="single_progression_with_settings"
+    ),
+    pytest.param(
+        [{"key": "C", "number_chord_sequence": ["I"]}, {"key": "D", "number_chord_sequence": ["IV", "V"]}],
+        [KeyChordProgression(key="C", number_chord_sequence=("I",)), KeyChordProgression(key="D", number_chord_sequence=("IV", "V"))],
+        60,
+        (4, 4),
+        id="list_of_progressions"
+    ),
+    pytest.param(
+        {"progressions": [{"key": "G", "number_chord_sequence": ["I", "IV"]}], "tempo": 120, "time_signature": [3, 4]},
+        [KeyChordProgression(key="G", number_chord_sequence=("I", "IV"))],
+        120,
+        (3, 4),
+        id="render_request"
+    )
+])
+def test_parse_render_request(body, progressions, tempo, time_signature):
+    request = parse_render_request(json.dumps(body).encode())
+
+    assert request.progressions == progressions
+    assert request.tempo == tempo
+    assert request.time_signature == time_signature
+
+
+def test_parse_render_request_single_progression_voice_leading():
+    body = {"key": "C", "number_chord_sequence": ["I"], "voice_leading": True}
+
+    assert parse_render_request(json.dumps(body).encode()).voice_leading
+
+
+@pytest.mark.parametrize("time_signature", [
+    pytest.param([300, 4], id="numerator_too_large"),
+    pytest.param([-1, 4], id="negative_numerator"),
+    pytest.param([4, 3], id="not_a_power_of_two"),
+    pytest.param([4, 32], id="note_value_too_short"),
+])
+def test_parse_render_request_invalid_time_signature(time_signature):
+    body = {"progressions": [], "time_signature": time_signature}
+
+    with pytest.raises(ValidationError, match="time_signature"):
+        parse_render_request(json.dumps(body).encode())
+
+
+def test_render_endpoint():
+    body = {"progressions": [{"key": "C", "number_chord_sequence": ["II", "V", "I"]}], "tempo": 90}
+
+    async def client(service):
+        status, payload = await http_request(service.port, "POST", "/render", json.dumps(body).encode())
+        metrics_status, metrics = await http_request(service.port, "GET", "/metrics")
+        return status, payload, metrics_status, json.loads(metrics)
+
+    status, payload, metrics_status, metrics = run_with_service(client, workers=1)
+
+    assert status == 200
+    assert payload == expected_midi(
+        [KeyChordProgression(key="C", number_chord_sequence=("II", "V", "I"))], tempo=90
+    )
+    assert metrics_status == 200
+    assert metrics["requests"] == 1
+    assert metrics["bytes_sent"] == len(payload)
+    assert metrics["latency_seconds"]["count"] == 1
+
+
+@pytest.mark.parametrize("method,path,body,expected_status", [
+    pytest.param("POST", "/render", b"not json", 400, id="invalid_json"),
+    pytest.param("POST", "/render", b'{"key": "C"}', 400, id="schema_error"),
+    pytest.param("POST", "/render", b'{"key": "H", "number_chord_sequence": ["I"]}', 400, id="unsupported_key"),
+    pytest.param("POST", "/render", b'{"progressions": [], "time_signature": [4, 3]}', 400, id="invalid_time_signature"),
+    pytest.param("POST", "/render", b'{"progressions": [], "time_signature": [300, 4]}', 400, id="numerator_too_large"),
+    pytest.param("POST", "/render", b'{"progressions": [], "time_signature": [0, 4]}', 400, id="zero_numerator"),
+    pytest.param("POST", "/render", b'{"progressions": [], "time_signature": [4, 32]}', 400, id="note_value_too_short"),
+    pytest.param("POST", "/render", b'{"progressions": [], "tempo": 0}', 400, id="zero_tempo"),
+    pytest.param("POST", "/render", b'{"progressions": [], "tempo": -60}', 400, id="negative_tempo"),
+    pytest.param("POST", "/render", b'{"progressions": [], "tempo": 3}', 400, id="tempo_too_slow"),
+    pytest.param("POST", "/render", b'{"progressions": [], "tempo": 100000}', 400, id="tempo_too_fast"),
+    pytest.param("GET", "/render", b"", 405, id="wrong_method"),
+    pytest.param("GET", "/missing", b"", 404, id="not_found"),
+    pytest.param("GET", "/health", b"", 200, id="health")
+])
+def test_error_responses(method, path, body, expected_status):
+    async def client(service):
+        return await http_request(service.port, method, path, body)
+
+    status, _ = run_with_service(client, executor=ThreadPoolExecutor(1))
+
+    assert status == expected_status
+
+
+@pytest.mark.parametrize("content_length", [
+    pytest.param(b"-5", id="negative"),
+    pytest.param(b"five", id="not_a_number"),
+])
+def test_invalid_content_length(content_length):
+    async def client(service):
+        reader, writer = await asyncio.open_connection("127.0.0.1", service.port)
+        writer.write(b"POST /render HTTP/1.1\r\nContent-Length: " + content_length + b"\r\n\r\n")
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    response = run_with_service(client, executor=ThreadPoolExecutor(1))
+
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert response.endswith(b'{"error": "Invalid Content-Length"}')
+
+
+def test_concurrent_requests():
+    bodies = [
+        json.dumps({"key": key, "number_chord_sequence": ["I", "V"]}).encode()
+        for key in ("C", "D", "E", "F", "G", "A", "B", "Bb")
+    ]
+
+    async def client(service):
+        return await asyncio.gather(*(http_request(service.port, "POST", "/render", b) for b in bodies))
+
+    results = run_with_service(client, executor=ThreadPoolExecutor(4), max_concurrency=2)
+
+    for (status, payload), key in zip(results, ("C", "D", "E", "F", "G", "A", "B", "Bb")):
+        assert status == 200
+        assert payload == expected_midi([KeyChordProgression(key=key, number_chord_sequence=("I", "V"))])
+
+
+def test_back_pressure_rejects_when_queue_is_full():
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking_render(request):
+        started.set()
+        release.wait(5)
+        return b"MThd"
+
+    body = b'{"key": "C", "number_chord_sequence": ["I"]}'
+
+    async def client(service):
+        first = asyncio.ensure_future(http_request(service.port, "POST", "/render", body))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        rejected = await http_request(service.port, "POST", "/render", body)
+        release.set()
+        return await first, rejected, service.metrics.snapshot()
+
+    with patch("simplejam.service.render_request", blocking_render):
+        first, rejected, metrics = run_with_service(
+            client, executor=ThreadPoolExecutor(2), max_concurrency=1, max_pending=0
+        )
+
+    assert first == (200, b"MThd")
+    assert rejected[0] == 503
+    assert metrics["rejected"] == 1
+
+
+def test_render_merges_worker_metrics():
+    body = b'{"key": "C", "number_chord_sequence": ["II", "V", "I"]}'
+
+    async def client(service):
+        return await http_request(service.port, "POST", "/render", body)
+
+    instruments.reset()
+    instruments.enable()
+    try:
+        status, _ = run_with_service(client, workers=1)
+        timers, counters = dict(instruments.timers), dict(instruments.counters)
+    finally:
+        instruments.disable()
+        instruments.reset()
+
+    assert status == 200
+    assert set(timers) >= {"generate_chord_sequence", "build_events", "encode"}
+    # The warm-up render before forking is left out
+    assert counters["progressions"] == 1
+    assert counters["chords"] == 3
+
+
+def test_latency_metrics_snapshot():
+    metrics = LatencyMetrics(window=4)
+    for seconds in (5.0, 1.0, 2.0, 3.0, 4.0):
+        metrics.record(seconds)
+
+    latency = metrics.snapshot()["latency_seconds"]
+
+    assert latency == {"count": 4, "mean": 2.5, "p50": 3.0, "p95": 4.0, "p99": 4.0}
@@ -0,0 +1,116 @@
+"""Import time budgets of the console scripts, measured with -X importtime."""
+
+import os
+import subprocess
+import sys
+import tomllib
+
+import pytest
+
+PYPROJECT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "pyproject.toml")
+
+# Cumulative import time budget of each entry point module, in milliseconds.
+# Locally they import in about a quarter of their budget.
+BUDGETS_MS = {
+    "simplejam": 100,
+    "diatonic_demo": 300,
+    "chord_progression_demo": 1000,
+    "play_midi_file": 100,
+    "play_midi_files": 100,
+    "render_wav": 600,
+}
+
+# Packages an entry point must not import before it needs them.
+DEFERRED = ("pygame", "environs", "mido", "pydantic")
+DEFERRED_EXCEPT = {
+    "chord_progression_demo": ("pydantic",),
+}
+
+
+def _scripts():
+    with open(PYPROJECT, "rb") as f:
+        return tomllib.load(f)["project"]["scripts"]
+
+
+def _import_times(module):
+    """Return {module name: cumulative microseconds} for importing module."""
+    env = dict(os.environ)
+    env.pop("OUTPUT_FILES_DIRECTORY", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_every_entry_point_has_a_budget():
+    assert set(_scripts()) == set(BUDGETS_MS)
+
+
+@pytest.mark.parametrize("script", [
+    pytest.param(script, id=script) for script in BUDGETS_MS
+])
+def test_entry_point_import_time(script):
+    module = _scripts()[script].split(":")[0]
+
+    # Best of three, the first run may also be compiling bytecode.
+    runs = [_import_times(module) for _ in range(3)]
+    best_ms = min(times[module] for times in runs) / 1000
+
+    assert best_ms < BUDGETS_MS[script], f"{module} imports in {best_ms:.1f} ms"
+    imported = {name.split(".")[0] for name in runs[0]}
+    deferred = set(DEFERRED) - set(DEFERRED_EXCEPT.get(script, ()))
+    assert not imported & deferred
+
+
+def test_play_midi_file_help_does_not_print_pygame_banner():
+    env = dict(os.environ)
+    env.pop("PYGAME_HIDE_SUPPORT_PROMPT", None)
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from simplejam.midi.player import run; "
+            "sys.argv = ['play_midi_file', '--help']; run()",
+        ],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+
+    assert result.returncode == 0
+    assert "usage: play_midi_file" in result.stdout
+    assert "Hello from the pygame community" not in result.stdout + result.stderr
+
+
+@pytest.mark.parametrize("module,code", [
+    pytest.param(
+        "simplejam.midi.midifile",
+        "generate_midi_file_from_chord_sequence(None, [Chord((60, 64, 67))], encoder='bytes')",
+        id="bytes_encoder",
+    ),
+    pytest.param(
+        "simplejam.midi.timeline",
+        "encode_timeline(chord_timeline([Chord((60, 64, 67))], 1920))",
+        id="timeline",
+    ),
+])
+def test_rendering_without_mido(module, code):
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from simplejam.midi.chord import Chord; "
+            f"from {module} import *; {code}; assert 'mido' not in sys.modules",
+        ],
+        check=True,
+    )